@@ -0,0 +1,30 @@
+"""
+Regenerate every figure of the analysis from the declarative plan
+plot_plan.json (instead of running the generated script_to_convert.py).
+
+Identical merges are computed once, merges and renders run in parallel
+and finished figures are recorded in outputs/.plot_plan_state.json:
+run the script again after a failure to only render the missing figures.
+
+Usage: python run_plot_plan.py [plan_file] [--no-restart]
+"""
+
+import sys
+
+from wonder_utils import SuicideData, PlotPlan, PlanRunner
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    plan_file = args[0] if args else "plot_plan.json"
+
+    sd = SuicideData()
+    runner = PlanRunner(sd, PlotPlan.from_file(plan_file))
+    timings = runner.run(restart="--no-restart" not in sys.argv)
+
+    print(timings.groupby(["kind", "status"]).seconds.agg(["count", "sum"]))
+    print(timings.sort_values("seconds", ascending=False).head(10))
+
+
+if __name__ == "__main__":
+    main()
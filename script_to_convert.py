@@ -36,7 +36,7 @@ plotly.offline.init_notebook_mode()
 
 #-------------------------------
 
-from wonder_utils import SuicideData
+from wonder_utils import SuicideData, wait_for_exports
 
 sd = SuicideData()  # or? reject_list=["More than one race", "Not Stated"]
 
@@ -65,7 +65,9 @@ def plot_func(color, by, age_cat, age_cat_name,
               "hide_title": True,
               "second_y_title_text": "% of the population in this age group",
               "legend_text": legend_text,
-              "additional_subplot_title": additional_subplot_title}
+              "additional_subplot_title": additional_subplot_title,
+              # write the png files in the background
+              "async_save": True}
 
     plot_params["y"] = "deaths"
     kwargs["y_title_text"] = f"Absolute count of suicides among {age_cat_name} ({age_cat})"
@@ -918,3 +920,7 @@ plot_func(color="ethno_race_4_cat", by="age_strat",
                                                  "Non-hispanic Black",
                                                  "Non-hispanic White"]},
           additional_subplot_title=" - Gender=Female")
+
+#| Wait for the figures still being written in outputs/
+
+wait_for_exports()
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from wonder_utils import SuicideData, age_adjust, STANDARD_POPULATION_2000
+
+AGES = ["20-24 years", "25-29 years", "85-89 years", "90-94 years"]
+
+
+def test_implementation() -> None:
+    """Check if directly standardized rates match a hand computation."""
+
+    df = pd.DataFrame({
+        "year": ["2020"] * 4 + ["2021"] * 4,
+        "age_group": AGES * 2,
+        "deaths": [10, 20, 5, 5, 30, 20, 1, np.nan],
+        "population": [1000, 4000, 500, 500, 1000, 1000, 100, 100],
+    })
+    res = age_adjust(df, ["year"], age_range="20plus")
+
+    w = np.array([STANDARD_POPULATION_2000[band] for band in ("20-24", "25-29", "85+")])
+    w = w / w.sum()
+    # 85-89 and 90-94 are pooled in the 85+ band
+    assert res.year.tolist() == ["2020", "2021"]
+    assert np.isclose(res.age_adjusted_rate[0], 100_000 * w @ [10 / 1000, 20 / 4000, 10 / 1000])
+    assert np.isclose(res.crude_rate[0], 100_000 * 40 / 6000)
+    # the 90-94 deaths are missing: the 85+ band, and the 2021 rates, too
+    assert res.iloc[1][["deaths", "population", "crude_rate", "age_adjusted_rate"]].isna().all()
+
+    # the range keeps only 20-24 and 25-29
+    res = age_adjust(df, ["year"], age_range=(20, 64))
+    assert np.allclose(res.age_adjusted_rate[0], 100_000 * w[:2] @ [0.01, 0.005] / w[:2].sum())
+
+
+def test_fill_age_adjusted_rate() -> None:
+    """Check if SuicideData fills the missing rates of the age bands only."""
+
+    sd = SuicideData()
+    strata = ["hhs", "gender", "year", "race", "ethnicity"]
+    keys = sd.data["20plus"][strata].drop_duplicates()
+    fine_data = pd.concat(
+        [keys.assign(age_group=age, deaths=10.0, population=1e5) for age in AGES]
+    )
+    before = sd.data.bands.age_adjusted_rate.copy()
+    sd.fill_age_adjusted_rate(fine_data)
+    after = sd.data.bands.age_adjusted_rate
+
+    # 20-24 is derived (20-64 - 25-64), its rate comes from the fine data
+    assert np.allclose(sd.data["20-24"].age_adjusted_rate, 10.0)
+    # no fine age group in 10-19 (and no rate from CDC Wonder): missing
+    assert sd.data["10-19"].age_adjusted_rate.isna().all()
+    # rates from CDC Wonder are kept
+    assert after[before.notna()].equals(before[before.notna()])
+    assert np.allclose(after[before.isna() & after.notna()], 10.0)
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from wonder_utils import SuicideData, STANDARD_POPULATION_2000
+from wonder_utils.data_loader.age_strata import AgeStrata, elementary_intervals
+from wonder_utils.stats.age_adjustment import parse_ages
+
+
+def export(rows, label):
+    """CDC Wonder like export of an age_strat, rows: (cell, deaths, rate)."""
+    return pd.DataFrame({
+        "hhs": [cell for cell, _, _ in rows],
+        "deaths": [deaths for _, deaths, _ in rows],
+        "population": [100.0 * deaths for _, deaths, _ in rows],
+        "age_adjusted_rate": [rate for _, _, rate in rows],
+        "age_strat": label,
+    })
+
+
+def test_implementation() -> None:
+    """Check the disjoint bands and the derived unions."""
+
+    assert elementary_intervals(["Overall", "10-19", "20-64", "25plus"]).tolist() == [
+        [0, 9], [10, 19], [20, 24], [25, 64], [65, np.inf]
+    ]
+    # HHS1 has every export, 65plus of HHS2 is suppressed: recovered from
+    # 20plus - 20-64, 25-64 of HHS3 is suppressed: 20-64 is a single band
+    data = {
+        "20-64": export([("HHS1", 30, 1.0), ("HHS2", 40, 2.0), ("HHS3", 50, 3.0)], "20-64"),
+        "25-64": export([("HHS1", 20, 1.0), ("HHS2", 35, 2.0)], "25-64"),
+        "65plus": export([("HHS1", 15, 4.0), ("HHS3", 12, 5.0)], "65plus"),
+        "20plus": export([("HHS1", 45, 2.0), ("HHS2", 46, 3.0), ("HHS3", 62, 3.0)], "20plus"),
+    }
+    strata = AgeStrata(data)
+    assert list(strata) == ["20-64", "20plus", "25-64", "65plus"]
+    # the exports are given back
+    for label, df in data.items():
+        derived = strata[label].set_index("hhs").deaths
+        assert derived.loc[df.hhs].tolist() == df.deaths.tolist()
+    assert strata["65plus"].set_index("hhs").deaths.to_dict() == {"HHS1": 15, "HHS2": 6, "HHS3": 12}
+    # 20-24 = 20-64 - 25-64, unknown in HHS3
+    assert strata["20-24"].set_index("hhs").deaths.to_dict() == {"HHS1": 10, "HHS2": 5}
+    assert strata.partition("20plus") == ["20-24", "25-64", "65plus"]
+    with pytest.raises(KeyError):
+        strata["30-64"]
+    # every age of the exports
+    assert strata.total() == "20plus"
+    # cached
+    assert strata["20plus"] is strata["20plus"]
+
+    # rates of the unions: weighted by the standard population of the bands
+    w = {
+        band: sum(STANDARD_POPULATION_2000[b] for b in bands)
+        for band, bands in [
+            ("20-24", ["20-24"]),
+            ("25-64", ["25-29", "30-34", "35-39", "40-44", "45-49", "50-54", "55-59", "60-64"]),
+            ("65plus", ["65-69", "70-74", "75-79", "80-84", "85+"]),
+        ]
+    }
+    # 25plus is not exported
+    expected = (w["25-64"] * 1.0 + w["65plus"] * 4.0) / (w["25-64"] + w["65plus"])
+    assert np.isclose(strata["25plus"].set_index("hhs").age_adjusted_rate["HHS1"], expected)
+    # the exported rate of 20plus is kept
+    hhs1 = strata["20plus"].set_index("hhs").loc["HHS1"]
+    assert hhs1.age_adjusted_rate == 2.0
+    assert hhs1.population == 4500
+    # 20-24 of HHS1 has no rate: a union with it has none either
+    assert np.isnan(strata["20-24"].set_index("hhs").age_adjusted_rate["HHS1"])
+
+    # a suppressed export is kept, missing
+    data["25-64"] = export([("HHS1", 20, 1.0), ("HHS2", np.nan, np.nan)], "25-64")
+    strata = AgeStrata(data)
+    assert np.isnan(strata["25-64"].set_index("hhs").deaths["HHS2"])
+    assert strata["20-64"].set_index("hhs").deaths["HHS2"] == 40
+    # unions with the suppressed band: missing, 20-24 is outside
+    assert np.isnan(strata["25plus"].set_index("hhs").deaths["HHS2"])
+    assert "HHS2" not in strata["20-24"].hhs.tolist()
+
+
+def test_suicide_data() -> None:
+    """Check if the derived strata give back the exports of CDC Wonder."""
+
+    sd = SuicideData()
+    keys = ["hhs", "gender", "year", "race", "ethnicity"]
+    assert sd.data.partition("25plus") == ["25-64", "65plus"]
+    assert sd.data.total() == "Overall"
+    # 20plus = 20-64 + 65plus
+    union = sd.data["20plus"].set_index(keys).deaths
+    parts = sum(sd.data[label].set_index(keys).deaths for label in ("20-64", "65plus"))
+    common = union.index.intersection(parts.dropna().index)
+    assert len(common) > 0.9 * len(union)
+    assert (union.loc[common] == parts.loc[common]).all()
+    # every band of a cell adds up to Overall
+    bands = sd.data.bands.groupby("cell").deaths.sum()
+    overall, cells = sd.data.cache["Overall"]
+    split = np.isin(cells, bands.index)
+    assert np.allclose(bands.loc[cells[split]], overall.deaths[split])
+    # the other cells keep their export (e.g. API with a suppressed NHOPI row)
+    pos = sd.data.exports.find(overall[~split])
+    assert (pos >= 0).all() and (~split).any()
+    assert (overall.deaths[~split].to_numpy() == sd.data.exports.measures["deaths"][pos]).all()
+    rows = sd.validation.set_index(["check", "target"]).checked
+    assert len(overall) == rows[("unique_keys", "Overall")]
+
+
+def test_five_year_bands() -> None:
+    """Check the bands of many strata (no enumeration of the subsets)."""
+
+    labels = [f"{age}-{age + 4}" for age in range(0, 85, 5)] + ["85plus", "Overall"]
+    elements = elementary_intervals(labels)
+    members = np.array([
+        [(lo <= e_lo) & (e_hi <= hi) for e_lo, e_hi in elements]
+        for lo, hi in map(parse_ages, labels)
+    ])
+    # 20-24 is suppressed: Overall minus the other bands
+    known = members[[label != "20-24" for label in labels]]
+    projector = np.linalg.pinv(known.astype(float)) @ known
+    bands = AgeStrata.identified_bands(known, projector)
+    assert len(bands) == 18
+    assert (bands.sum(axis=0) == 1).all()
@@ -0,0 +1,79 @@
+import os
+from concurrent.futures import Future
+
+import plotly.graph_objects as go
+import pytest
+
+from wonder_utils import SuicideData, wait_for_exports
+from wonder_utils.plots import blueprint
+from wonder_utils.plots.export import normalize_targets
+
+
+def test_implementation(tmp_path, monkeypatch) -> None:
+    """Check if figures are exported in the background."""
+
+    sd = SuicideData()
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("outputs")
+
+    fig, future = sd.plot(
+        x="year",
+        y="deaths",
+        color="gender",
+        by="age_strat",
+        rows=1,
+        data_slice={"age_strat": "10-19"},
+        save_file=True,
+        show_fig=False,
+        async_save=True,
+        plot_filename="adolescents_gender_deaths",
+    )
+    assert isinstance(fig, go.Figure)
+    assert isinstance(future, Future)
+    assert future.result() == ["outputs/adolescents_gender_deaths.png"]
+    assert wait_for_exports() == ["outputs/adolescents_gender_deaths.png"]
+    assert os.path.exists("outputs/adolescents_gender_deaths.png")
+    assert wait_for_exports() == []
+
+
+def test_export_formats(tmp_path, monkeypatch) -> None:
+    """Check if several formats and a thumbnail are written at once."""
+
+    sd = SuicideData()
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("outputs")
+
+    sd.plot(
+        x="year",
+        y="deaths",
+        color="gender",
+        by="age_strat",
+        rows=1,
+        data_slice={"age_strat": "10-19"},
+        save_file=True,
+        show_fig=False,
+        export_formats=["png", "svg", {"thumbnail": 140}],
+    )
+    assert sorted(os.listdir("outputs")) == [
+        "deaths_year_by_age_strat_color_gender.png",
+        "deaths_year_by_age_strat_color_gender.svg",
+        "deaths_year_by_age_strat_color_gender_thumb.png",
+    ]
+    with pytest.raises(ValueError):
+        normalize_targets([{"format": "svg", "thumbnail": 140}])
+
+
+def test_failed_export() -> None:
+    """Check if a failed export does not lose the files of the others."""
+
+    def fail() -> list:
+        raise OSError("no kaleido")
+
+    executor = blueprint.export_executor()
+    with blueprint.EXPORT_LOCK:
+        blueprint.PENDING_EXPORTS.append(executor.submit(fail))
+        blueprint.PENDING_EXPORTS.append(executor.submit(lambda: ["outputs/a.png"]))
+    with pytest.raises(RuntimeError, match="outputs/a.png") as error:
+        wait_for_exports()
+    assert isinstance(error.value.__cause__, OSError)
+    assert wait_for_exports() == []
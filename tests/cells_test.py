@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from wonder_utils import SuicideData
+from wonder_utils.data_loader.cells import CellStore, PARTIAL, SUPPRESSED, UNRELIABLE
+
+
+def test_implementation() -> None:
+    """Check the suppressed cells of the sums."""
+
+    df = pd.DataFrame({
+        "hhs": ["HHS1", "HHS1", "HHS2", "HHS2", "HHS3"],
+        "year": ["2018", "2019", "2018", "2019", "2018"],
+        "deaths": [30, 12, np.nan, 50, 25],
+        "population": [1e5, 1e5, 2e5, 2e5, 3e5],
+    })
+    cells = CellStore.from_frame(df, ["hhs", "year"])
+    assert cells.shape == (3, 2)
+    assert cells.flags.tolist() == [0, UNRELIABLE, SUPPRESSED | UNRELIABLE, 0, 0]
+
+    res = cells.sum(["hhs"]).set_index("hhs")
+    # HHS1 is exact, HHS2 has a suppressed row, HHS3 2019 is hidden
+    assert res.deaths.tolist() == [42, 50, 25]
+    assert res.suppressed_cells.tolist() == [0, 1, 1]
+    assert res.deaths_high.tolist() == [42, 59, 34]
+    assert res.status.tolist() == [0, SUPPRESSED, SUPPRESSED]
+
+    res = cells.sum(["year"], where={"hhs": slice("HHS1", "HHS2")}).set_index("year")
+    assert res.deaths.tolist() == [30, 62]
+    assert res.suppressed_cells.tolist() == [1, 0]
+    total = cells.sum([], where={"year": "2019"})
+    assert total.deaths.tolist() == [62]
+    assert total.suppressed_cells.tolist() == [1]
+
+    # a collapsed cell with a suppressed row: known deaths, one more child
+    cells = CellStore.from_frame(df.assign(suppressed_rows=[1, 0, 1, 0, 0]), ["hhs", "year"])
+    assert cells.flags.tolist() == [PARTIAL, UNRELIABLE, SUPPRESSED | UNRELIABLE, 0, 0]
+    res = cells.sum(["hhs"]).set_index("hhs")
+    assert res.deaths.tolist() == [42, 50, 25]
+    assert res.suppressed_cells.tolist() == [1, 1, 1]
+
+    # Overall overlaps 10-19: one of them is selected, or both are groups
+    df["age_strat"] = ["Overall", "Overall", "Overall", "10-19", "10-19"]
+    cells = CellStore.from_frame(df, ["hhs", "year", "age_strat"], overlapping=["age_strat"])
+    with pytest.raises(ValueError):
+        cells.sum(["year"])
+    assert cells.sum(["year"], where={"age_strat": "Overall"}).deaths.tolist() == [30, 12]
+    assert len(cells.sum(["year", "age_strat"])) == 4
+
+
+def test_suppression_metric() -> None:
+    """Check the suppressed cells of merge and the memory of the store."""
+
+    sd = SuicideData()
+    frames = pd.concat(sd.data.values())
+    assert sd.cells.nbytes < frames[sd.cells.dims + ["deaths", "population"]].memory_usage(
+        deep=True).sum() / 10
+
+    # the cells are the exports: API cells without their NHOPI rows
+    api = sd.cells.sum(["year"], {"race": "API", "age_strat": "Overall"}).set_index("year")
+    assert (api.loc[["2018", "2019", "2020", "2021"]].status & SUPPRESSED).all()
+    assert (sd.cells.flags & PARTIAL).any()
+
+    params = dict(x="year", color="gender", by="race",
+                  data_slice={"hhs": ["HHS1", "HHS2"], "age_strat": "10-19"})
+    df, _ = sd.merge(**params)
+    assert (df.deaths_high >= df.deaths).all()
+    assert (df.deaths_exact == (df.deaths_high == df.deaths)).all()
+    res = sd.cells.sum(["gender", "year", "race"], params["data_slice"]).set_index(
+        ["gender", "year", "race"])
+    assert (res.deaths.reindex(df.index) == df.deaths).all()
+
+    # without age_strat, the every-age stratum
+    df, _ = sd.merge(x="year", color="gender", by="race",
+                     data_slice={"hhs": ["HHS1", "HHS2"]})
+    res = sd.cells.sum(["gender", "year", "race"], {"hhs": ["HHS1", "HHS2"],
+                                                    "age_strat": sd.data.total()})
+    res = res.set_index(["gender", "year", "race"])
+    assert (res.suppressed_cells.reindex(df.index) == df.suppressed_cells).all()
+
+    # the nation sums every region
+    df, _ = sd.merge(x="year", color="gender", by="race", level="nation",
+                     data_slice={"age_strat": "10-19"})
+    assert (df.suppressed_cells >= 0).all()
+    # ethno_race is not a dimension of the cells
+    df, _ = sd.merge(x="year", color="gender", by="ethno_race")
+    assert "deaths_exact" not in df
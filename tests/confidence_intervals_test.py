@@ -0,0 +1,46 @@
+import numpy as np
+
+from wonder_utils import SuicideData
+from wonder_utils.stats.intervals import (
+    clopper_pearson_interval,
+    poisson_interval,
+    wilson_interval,
+)
+
+
+def test_implementation() -> None:
+    """Check the intervals against tabulated values."""
+
+    low, high = poisson_interval([0, 10, np.nan])
+    assert np.allclose(low[:2], [0.0, 4.7954], atol=1e-4)
+    assert np.allclose(high[:2], [3.6889, 18.3904], atol=1e-4)
+    assert np.isnan(low[2]) and np.isnan(high[2])
+
+    low, high = wilson_interval([5], [10])
+    assert np.allclose([low[0], high[0]], [0.2366, 0.7634], atol=1e-4)
+    # a proportion of 1 (a single category) is inside its interval
+    low, high = wilson_interval([291], [291])
+    assert high[0] == 1.0
+    low, high = clopper_pearson_interval([0, 5], [10, 10])
+    assert np.allclose(low, [0.0, 0.1871], atol=1e-4)
+    assert np.allclose(high, [0.3085, 0.8129], atol=1e-4)
+
+
+def test_error_bands() -> None:
+    """Check if merge adds the intervals and plot draws them."""
+
+    sd = SuicideData()
+    params = dict(x="year", color="gender", by="race",
+                  data_slice={"age_strat": "20plus"})
+    df, _ = sd.merge(**params)
+    for y in ["suicide_per_100k", "suicide_proportion",
+              "suicide_proportion_2", "pop_share"]:
+        assert (df[f"{y}_low"] <= df[y]).all()
+        assert (df[y] <= df[f"{y}_high"]).all()
+
+    fig = sd.plot(y="suicide_per_100k", save_file=False, show_fig=False,
+                  **params)
+    fig_bands = sd.plot(y="suicide_per_100k", save_file=False, show_fig=False,
+                        error_bands=True, **params)
+    assert len(fig_bands.data) == 2 * len(fig.data)
+    assert sum(trace.fill == "toself" for trace in fig_bands.data) == len(fig.data)
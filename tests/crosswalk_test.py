@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from wonder_utils.data_loader.crosswalk import Crosswalk, COLUMNS
+
+
+def export(race_column: str, region_column: str, rows: list) -> pd.DataFrame:
+    """Export of CDC Wonder, as read by read_export."""
+    return pd.DataFrame(
+        [
+            ["HHS Region #1", "HHS1", "Female", "F", "2019", "2019", race, code,
+             "Hispanic Origin", ethnicity, deaths, population, "Unreliable", rate]
+            for race, code, ethnicity, deaths, population, rate in rows
+        ],
+        columns=[region_column, f"{region_column} Code", "Gender", "Gender Code",
+                 "Year", "Year Code", race_column, f"{race_column} Code",
+                 "Hispanic Origin", "Hispanic Origin Code", "Deaths", "Population",
+                 "Crude Rate", "Age Adjusted Rate"],
+    )
+
+
+def test_crosswalk() -> None:
+    """Check the harmonized columns, the collapsed and dropped rows."""
+
+    crosswalk = Crosswalk(reject=["More than one race", "Not Stated"])
+    bridged = export("Race", "HHS Region", [
+        ("Asian or Pacific Islander", "A-PI", "2186-2", "30", "1000", "3.0"),
+        ("White", "2106-3", "NS", "5", "100", "Unreliable"),
+    ])
+    single = export("Single Race 6", "Residence HHS Region", [
+        ("Asian", "A", "2186-2", "30", "3000", "1.0"),
+        ("Native Hawaiian or Other Pacific Islander", "NHOPI", "2186-2", "10", "1000", "5.0"),
+        ("More than one race", "M", "2135-2", "20", "100", "Unreliable"),
+        ("Black or African American", "2054-5", "2135-2", "Suppressed", "100", "Unreliable"),
+    ])
+
+    res = crosswalk.harmonize(bridged, source="bridged")
+    assert list(res.columns) == [*COLUMNS, "suppressed_rows"]
+    assert res.race.tolist() == ["API"]
+    assert res.ethnicity.tolist() == ["Non-Hispanic"]
+
+    # the positions of the columns do not matter
+    res = crosswalk.harmonize(single[single.columns[::-1]], source="single")
+    assert list(res.columns) == [*COLUMNS, "suppressed_rows"]
+    api = res.set_index("race").loc["API"]
+    assert api.deaths == 40 and api.population == 4000 and api.suppressed_rows == 0
+    assert np.isclose(api.age_adjusted_rate, (3000 * 1.0 + 1000 * 5.0) / 4000)
+    black = res.set_index("race").loc["Black"]
+    assert np.isnan(black.deaths) and black.suppressed_rows == 1
+    # a suppressed row is left out of the sums, and counted
+    suppressed = single.assign(Deaths=single.Deaths.replace("10", "Suppressed"))
+    api = Crosswalk().harmonize(suppressed).set_index("race").loc["API"]
+    assert api.deaths == 30 and api.population == 4000 and api.suppressed_rows == 1
+    # so is a hidden row (NHOPI not exported)
+    api = Crosswalk().harmonize(single.iloc[[0, 2, 3]]).set_index("race").loc["API"]
+    assert api.deaths == 30 and api.population == 3000 and api.suppressed_rows == 1
+    assert api.age_adjusted_rate == 1.0
+
+    report = crosswalk.report().set_index(["source", "code"])
+    assert report.loc[("bridged", "NS"), "action"] == "dropped"
+    assert report.loc[("single", "NHOPI"), "action"] == "collapsed"
+    assert report.loc[("single", "M"), "action"] == "dropped"
+    assert ("bridged", "A-PI") not in report.index
+
+    with pytest.raises(ValueError):
+        crosswalk.harmonize(bridged.drop(columns=["Race", "Race Code"]))
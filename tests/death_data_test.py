@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from wonder_utils import Death_Data
+
+ICD = "External causes of morbidity and mortality"
+HEADER = ["Notes", "State", "State Code", "Month", "Month Code",
+          "Ten-Year Age Groups", "ICD Chapter", "ICD Chapter Code", "Deaths"]
+
+
+def write_death_file(folder, states=("Alabama", "Alaska")) -> None:
+    """CDC Wonder like export of monthly deaths, 2018-2020."""
+    lines = ["\t".join(f'"{col}"' for col in HEADER)]
+    for s, state in enumerate(states):
+        for year in (2018, 2019, 2020):
+            for month in range(1, 13):
+                for a, age in enumerate(("15-24 years", "25-34 years")):
+                    deaths = 10 * (s + 1) + a + (year - 2018) * 12 + month
+                    lines.append("\t".join([
+                        "", f'"{state}"', f'"{s:02d}"', f'"{month}, {year}"',
+                        f'"{year}/{month:02d}"', f'"{age}"', f'"{ICD}"',
+                        '"V01-Y89"', str(deaths),
+                    ]))
+    lines += ['"---"', '"Dataset: Underlying Cause of Death"']
+    with open(folder / "death 2018-2020 Overall.txt", "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def test_implementation(tmp_path) -> None:
+    """Check the partitions and the time series queries."""
+
+    write_death_file(tmp_path)
+    dd = Death_Data(data_folder=str(tmp_path))
+
+    assert set(dd.series) == {("Alabama", ICD), ("Alaska", ICD)}
+    alabama = dd.series[("Alabama", ICD)]
+    assert alabama.index.is_monotonic_increasing
+    assert str(alabama.index.dtype) == "datetime64[ns]"
+
+    monthly = dd.resample("Alabama", ICD)
+    assert monthly.shape == (36, 2)
+    assert monthly["15-24 years"].iloc[0] == 11
+
+    quarterly = dd.resample("Alabama", ICD, "quarterly", by=None)
+    assert len(quarterly) == 12
+    assert quarterly.deaths.iloc[0] == sum(10 + a + m for a in (0, 1) for m in (1, 2, 3))
+
+    annual = dd.resample("Alaska", ICD, "annual", start="2019", end="2019")
+    assert len(annual) == 1
+
+    rolling = dd.rolling("Alabama", ICD, window=12, by=None)
+    assert rolling.deaths.isna().sum() == 11
+    assert rolling.deaths.iloc[11] == monthly.iloc[:12].sum().sum()
+
+    yoy = dd.yoy("Alabama", ICD)
+    # every month has 12 more deaths than one year before
+    assert np.allclose(yoy["delta"].iloc[12:], 12)
+    assert yoy["delta"].iloc[:12].isna().all().all()
+
+    # a format mismatch raises instead of dropping every row
+    with pytest.raises(ValueError, match="%m/%Y"):
+        Death_Data(data_folder=str(tmp_path), date_format="%m/%Y")
+
+
+def test_excess(tmp_path) -> None:
+    """Check the seasonal baseline on a series with a known excess."""
+
+    write_death_file(tmp_path)
+    dd = Death_Data(data_folder=str(tmp_path))
+    res = dd.excess("2019-12", harmonics=1)
+
+    assert len(res) == 2 * 36
+    # deaths grow linearly: the baseline extrapolates the trend
+    assert np.allclose(res.expected, res.observed)
+    assert (res.excess_low <= 1e-6).all() and (res.excess_high >= -1e-6).all()
+
+    # 2020 + 100 deaths in Alabama
+    key = ("Alabama", ICD)
+    in_2020 = dd.series[key].index.year == 2020
+    dd.series[key].loc[in_2020, "deaths"] += 50
+    res = dd.excess("2019-12", icd=ICD).set_index(["state", "date"])
+    alabama = res.loc["Alabama"]
+    assert np.allclose(alabama.loc["2020", "excess"], 100)
+    assert np.allclose(alabama.loc[:"2019", "excess"], 0)
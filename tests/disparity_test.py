@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from wonder_utils import SuicideData, disparities
+
+
+def test_implementation() -> None:
+    """Check representation and rate ratios on a small table."""
+
+    df = pd.DataFrame({
+        "year": ["2020"] * 3 + ["2021"] * 3,
+        "race": ["White", "Black", "API"] * 2,
+        "deaths": [790, 200, 10, 900, 50, 50],
+        "population": [7e6, 2e6, 1e6, 7e6, 2e6, 1e6],
+    })
+    res = disparities(df, ["race"], ["year"]).set_index(["year", "group"])
+
+    white = res.loc[("2020", "White")]
+    assert np.isclose(white.death_share, 79.0)
+    assert np.isclose(white.pop_share, 70.0)
+    assert np.isclose(white.representation_ratio, 79 / 70)
+    assert white.representation == "more exacerbated"
+    assert white.reference == "White" and white.rate_ratio == 1.0
+
+    black = res.loc[("2020", "Black")]
+    assert np.isclose(black.rate_ratio, (200 / 2e6) / (790 / 7e6))
+    assert black.rate_ratio_low < black.rate_ratio < black.rate_ratio_high
+    assert black.representation == "in line"
+    assert res.loc[("2021", "Black")].representation == "less exacerbated"
+
+
+def test_disparities() -> None:
+    """Check the disparities of SuicideData."""
+
+    sd = SuicideData()
+    res = sd.disparities(strata=["age_strat", "year", "hhs"])
+    assert set(res.dimension) == {"race", "ethnicity", "ethno_race_4_cat"}
+    shares = res.groupby(["dimension", "age_strat", "year", "hhs"]).death_share.sum()
+    assert np.allclose(shares.dropna(), 100)
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from wonder_utils.stats.excess import fit_baseline
+
+
+def test_implementation() -> None:
+    """Check if the batched baseline finds the simulated seasonality."""
+
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2015-01", "2020-12", freq="MS")
+    angle = 2 * np.pi * (dates.month.to_numpy() - 1) / 12
+    levels = np.linspace(100, 1000, 50)[:, None]
+    truth = levels * (1 + 0.2 * np.cos(angle)) + np.arange(len(dates)) / 12
+    counts = truth + rng.normal(0, 2, truth.shape)
+    # +10% in 2020 and a missing month in the baseline
+    counts[:, dates.year == 2020] *= 1.1
+    counts[0, 3] = np.nan
+
+    res = fit_baseline(counts, dates, "2019-12")
+    assert np.allclose(res["expected"], truth, rtol=0.02)
+    before = dates.year < 2020
+    assert (np.abs(res["excess"][:, before][~np.isnan(counts[:, before])]) < 10).all()
+    assert (res["excess_low"][:, ~before] > 0).mean() > 0.95
+    assert np.isnan(res["observed"][0, 3]) and not np.isnan(res["expected"][0, 3])
+
+    # not enough months to fit
+    short = fit_baseline(counts[:, :30], dates[:30], "2015-03")
+    assert np.isnan(short["expected"]).all()
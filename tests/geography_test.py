@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from wonder_utils import SuicideData, Death_Data
+from wonder_utils.data_loader.geography import GEOGRAPHY, Geography, parse_hhs_label
+
+from .death_data_test import write_death_file
+
+
+def test_implementation() -> None:
+    """Check the hierarchy parsed from the HHS region labels."""
+
+    assert parse_hhs_label("HHS Region #10  AK, ID, OR, WA") == (
+        "HHS10", ("Alaska", "Idaho", "Oregon", "Washington")
+    )
+    with pytest.raises(ValueError):
+        parse_hhs_label("HHS Region #11  XX")
+    # 50 states and DC
+    assert len(GEOGRAPHY.parents["state"]) == 51
+    assert GEOGRAPHY.parents["state"]["District of Columbia"] == "HHS3"
+    assert GEOGRAPHY.parents["hhs"]["HHS1"] == "United States"
+
+
+def test_rollups(tmp_path) -> None:
+    """Check the materialized sums at the coarser levels."""
+
+    sd = SuicideData()
+    assert list(sd.rollups) == ["nation"]
+    params = dict(x="year", color="race", by="gender", data_slice={"age_strat": "Overall"})
+    by_region, _ = sd.merge(**params)
+    national, _ = sd.merge(level="nation", **params)
+    # a cell of the nation is missing unless every region has it
+    assert not (national.deaths > by_region.deaths).any()
+    keys = ["gender", "year", "race", "ethnicity", "age_strat"]
+    nation = sd.rollups["nation"].set_index(keys)
+    regions = sd.select_data().groupby(keys)[["deaths", "population"]].sum()
+    known = nation.deaths.notna()
+    assert known.any() and not known.all()
+    assert np.allclose(nation.deaths[known], regions.deaths.reindex(nation.index)[known])
+    assert np.allclose(nation.population[known],
+                       regions.population.reindex(nation.index)[known])
+    sd.plot(y="suicide_per_100k", x="year", color="race", by="nation",
+            data_slice={"age_strat": "Overall"}, level="nation",
+            save_file=False, show_fig=False)
+
+    # HHS10: AK, ID, OR, WA; two of the eight states of HHS4
+    hhs10 = ("Alaska", "Idaho", "Oregon", "Washington")
+    write_death_file(tmp_path, states=("Alabama", "Florida", *hhs10))
+    dd = Death_Data(data_folder=str(tmp_path))
+    assert list(dd.rollups) == ["hhs", "nation"]
+    region = dd.select_data({"hhs": "HHS10"}, level="hhs")
+    states = dd.select_data({"state": list(hhs10)})
+    assert region.deaths.sum() == states.deaths.sum()
+    # the states left out of the export are missing
+    assert dd.select_data({"hhs": "HHS4"}, level="hhs").deaths.isna().all()
+    assert dd.rollups["nation"].deaths.isna().all()
+    with pytest.raises(KeyError):
+        sd.select_data(level="state")
+
+
+def test_suppressed_rollups(tmp_path) -> None:
+    """Check if a suppressed state makes its region and nation missing."""
+
+    write_death_file(tmp_path, states=("Alabama", "Florida", "Alaska"))
+    path = tmp_path / "death 2018-2020 Overall.txt"
+    lines = [
+        line.rsplit("\t", 1)[0] + "\tSuppressed"
+        if '"Florida"' in line and '"2019/03"' in line and '"15-24 years"' in line else line
+        for line in path.read_text().split("\n")
+    ]
+    path.write_text("\n".join(lines))
+    dd = Death_Data(data_folder=str(tmp_path))
+    # every state of the regions is exported
+    dd.geography = Geography({"HHS4": ("Alabama", "Florida"), "HHS10": ("Alaska",)})
+    dd.materialize_rollups()
+
+    for level, missing in [("hhs", "HHS4"), ("nation", "United States")]:
+        df = dd.rollups[level].set_index([level, "date", "age_group"]).deaths
+        assert df.isna().sum() == 1
+        assert np.isnan(df.loc[(missing, "2019-03-01", "15-24 years")])
+    assert dd.rollups["hhs"].deaths.notna().sum() == 2 * 36 * 2 - 1
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+from wonder_utils import SuicideData, Death_Data
+from wonder_utils.data_loader.geography import Geography
+from wonder_utils.data_loader.join import key_dictionaries, encode, sort_merge
+
+from .death_data_test import write_death_file, ICD
+
+
+def test_implementation() -> None:
+    """Check the integer codes and the sort-merge."""
+
+    left = pd.DataFrame({"year": ["2019", "2018", "2020", None],
+                         "hhs": ["HHS2", "HHS1", "HHS1", "HHS1"]})
+    right = pd.DataFrame({"year": ["2019", "2018", "2019"],
+                          "hhs": ["HHS1", "HHS1", "HHS2"]})
+    dictionaries = key_dictionaries([left, right], ["year", "hhs"])
+    assert list(dictionaries["year"]) == ["2018", "2019", "2020"]
+
+    codes = encode(left, ["year", "hhs"], dictionaries)
+    assert codes[-1] == -1
+    pos = sort_merge(codes, encode(right, ["year", "hhs"], dictionaries))
+    assert pos.tolist() == [2, 1, -1, -1]
+    assert sort_merge(codes, np.array([], dtype=np.int64)).tolist() == [-1] * 4
+
+
+def test_suicide_share(tmp_path) -> None:
+    """Check suicide_share_external of merge and plot."""
+
+    # Alabama: HHS4, Alaska: HHS10
+    write_death_file(tmp_path)
+    dd = Death_Data(data_folder=str(tmp_path))
+    sd = SuicideData()
+    sd.join_deaths(dd, ICD)
+
+    params = dict(x="year", color="gender", by="hhs",
+                  data_slice={"age_strat": "Overall", "hhs": ["HHS4", "HHS10"],
+                              "year": ["2018", "2019", "2020"]})
+    # the other states of the regions are not exported
+    df, _ = sd.merge(**params)
+    assert df.external_deaths.isna().all()
+
+    dd.geography = Geography({"HHS4": ("Alabama",), "HHS10": ("Alaska",)})
+    dd.materialize_rollups()
+    sd.join_deaths(dd, ICD)
+    df, _ = sd.merge(**params)
+    alabama = dd.select_data({"state": "Alabama"})
+    assert np.allclose(
+        df.loc[("Female", "2019", "HHS4"), "external_deaths"],
+        alabama.loc[alabama.date.dt.year == 2019].deaths.sum(),
+    )
+    assert np.allclose(df.suicide_share_external, 100 * df.deaths / df.external_deaths)
+
+    # race is not a key of the deaths: every race gets all the deaths
+    df, _ = sd.merge(x="year", color="gender", by="race",
+                     data_slice={"hhs": ["HHS4", "HHS10"], "year": "2019"})
+    deaths_2019 = dd.select_data().set_index("date").loc["2019"].deaths.sum()
+    assert (df.external_deaths == deaths_2019).all()
+    # ten-year age groups do not tile 10-19
+    df, _ = sd.merge(x="year", color="gender", by="hhs", data_slice={"age_strat": "10-19"})
+    assert df.external_deaths.isna().all()
+
+    sd.plot(y="suicide_share_external", save_file=False, show_fig=False, **params)
+
+
+def test_suppressed_deaths(tmp_path) -> None:
+    """Check if a suppressed state-month makes its denominators missing."""
+
+    write_death_file(tmp_path)
+    path = tmp_path / "death 2018-2020 Overall.txt"
+    lines = path.read_text().split("\n")
+    lines = [
+        line.rsplit("\t", 1)[0] + "\tSuppressed"
+        if '"Alabama"' in line and '"2019/03"' in line and '"15-24 years"' in line else line
+        for line in lines
+    ]
+    path.write_text("\n".join(lines))
+    dd = Death_Data(data_folder=str(tmp_path))
+    dd.geography = Geography({"HHS4": ("Alabama",), "HHS10": ("Alaska",)})
+    dd.materialize_rollups()
+    sd = SuicideData()
+    sd.join_deaths(dd, ICD)
+
+    df, _ = sd.merge(x="year", color="gender", by="hhs",
+                     data_slice={"age_strat": "Overall", "hhs": ["HHS4", "HHS10"],
+                                 "year": ["2018", "2019"]})
+    assert df.external_deaths.isna().tolist() == [False, False, False, True] * 2
+    assert df.suicide_share_external.isna().sum() == 2
+    # summed over the regions: missing too
+    df, _ = sd.merge(x="year", color="gender", by="race",
+                     data_slice={"hhs": ["HHS4", "HHS10"], "year": "2019"})
+    assert df.external_deaths.isna().all()
@@ -0,0 +1,49 @@
+import numpy as np
+
+from wonder_utils import SuicideData
+from wonder_utils.stats.nowcast import completeness_ratios, nowcast
+
+
+def test_implementation() -> None:
+    """Check the ratios of the strata and the pooled ratio."""
+
+    provisional = np.array([90, 45, 80, 5, np.nan])
+    final = np.array([100, 50, 100, 10, 30])
+    groups = [np.array(["a", "a", "b", "c", "c"])]
+    ratios, pooled = completeness_ratios(provisional, final, groups, min_deaths=20)
+
+    assert np.allclose(ratios[:3], [0.9, 0.9, 0.8])
+    # too few deaths in c: pooled ratio
+    assert np.isclose(pooled, 220 / 260)
+    assert np.allclose(ratios[3:], pooled)
+
+    res = nowcast([90, 90, 90], [True, False, True], [0.9, 0.9, np.nan])
+    assert np.allclose(res, [100, 90, 90])
+
+
+def test_nowcast_metric() -> None:
+    """Check deaths_nowcast of merge and plot."""
+
+    sd = SuicideData()
+    overall = sd.data["Overall"]
+    assert overall.provisional.dtype == bool
+    assert set(overall.loc[overall.provisional].year) == {"2021"}
+
+    # an older load where 2020 was provisional, 80% complete
+    previous = {
+        label: df.assign(provisional=df.year.isin(["2020", "2021"]),
+                         deaths=np.where(df.year == "2020", 0.8 * df.deaths, df.deaths))
+        for label, df in sd.data.items()
+    }
+    sd.learn_completeness(previous)
+    assert np.isclose(sd.completeness["pooled"], 0.8)
+    assert np.allclose(sd.completeness["ratios"].ratio, 0.8)
+
+    params = dict(x="year", color="race", by="hhs",
+                  data_slice={"age_strat": "Overall"})
+    df, _ = sd.merge(**params)
+    final = df.index.get_level_values("year") != "2021"
+    assert np.allclose(df.deaths_nowcast[final], df.deaths[final])
+    assert np.allclose(df.deaths_nowcast[~final], df.deaths[~final] / 0.8)
+
+    sd.plot(y="suicide_per_100k_nowcast", save_file=False, show_fig=False, **params)
@@ -0,0 +1,37 @@
+import os
+
+from wonder_utils import SuicideData, PlotPlan, PlanRunner
+
+
+def test_implementation(tmp_path) -> None:
+    """Check if a plan is expanded, deduplicated and restartable."""
+
+    sd = SuicideData()
+    plan = PlotPlan(
+        {
+            "defaults": {"x": "year", "save_file": False, "show_fig": False,
+                         "rows": 1, "by": "age_strat"},
+            "axes": {
+                "category": [{"cat": "gender"}, {"cat": "ethnicity"}],
+                "metric": [{"y": "deaths"}, {"y": "suicide_per_100k"}],
+            },
+            "figures": [
+                {
+                    "product": ["category", "metric"],
+                    "params": {"y": "{y}", "color": "{cat}",
+                               "data_slice": {"age_strat": "10-19"},
+                               "plot_filename": "adolescents_{cat}_{y}"},
+                }
+            ],
+        }
+    )
+    assert len(plan.expand()) == 4
+
+    state_file = os.path.join(tmp_path, "state.json")
+    timings = PlanRunner(sd, plan, state_file=state_file).run()
+    assert (timings.kind == "merge").sum() == 2
+    assert (timings.status == "done").all()
+
+    # second run: every render is already done
+    timings = PlanRunner(sd, plan, state_file=state_file).run()
+    assert (timings.status == "cached").sum() == 4
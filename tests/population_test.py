@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from wonder_utils import PopulationData, SuicideData
+from wonder_utils.data_loader.population import age_strat_label
+
+
+def test_population_data() -> None:
+    """Check the margins, the recodes and the lookup."""
+
+    assert age_strat_label(["10-14 years", "15-19 years"]) == "10-19"
+    assert age_strat_label([]) == "Overall"
+
+    pop = PopulationData()
+    assert not pop.data.duplicated(subset=list(pop.KEYS)).any()
+    # totals of the exports
+    assert pop.index[("2020", "10-19", "All", "All", "United States")] == 41715352
+    assert pop.index[("2020", "Overall", "All", "All", "United States")] == 329484123
+    # margins summed from Race_Eth agree with the race exports
+    assert pop.index[("2020", "Overall", "Black", "All", "United States")] == (
+        pop.index[("2020", "Overall", "Black", "Hispanic", "United States")]
+        + pop.index[("2020", "Overall", "Black", "Non-Hispanic", "United States")]
+    )
+
+    df = pd.DataFrame({"year": ["2020", "2020", "2019"],
+                       "race": ["API", "White", "API"],
+                       "nation": ["United States"] * 3})
+    res = pop.lookup(df, {"age_strat": "10-19"})
+    assert res[0] == 2708592
+    assert res[1] == 31314155
+    assert np.isnan(res[2])
+
+
+def test_join_population() -> None:
+    """Check the population of merge for strata without population."""
+
+    sd = SuicideData()
+    pop = PopulationData()
+    nation = sd.rollups["nation"]
+    missing = (nation.age_strat == "10-19") & (nation.year == "2020")
+    nation.loc[missing, "population"] = np.nan
+    sd.join_population(pop)
+
+    params = dict(x="year", color="race", by="ethnicity", level="nation",
+                  data_slice={"age_strat": "10-19", "year": "2020"})
+    df, _ = sd.merge(**params)
+    expected = pop.lookup(df.index.to_frame(index=False), {"age_strat": "10-19"})
+    assert np.allclose(df.population, expected)
+    assert np.allclose(df.suicide_per_100k, 100000.0 * df.deaths / expected, equal_nan=True)
+    # the derived rates too
+    assert np.allclose(df.suicide_per_100k_eb, 100000.0 * df.eb_deaths / expected,
+                       equal_nan=True)
+    assert np.isfinite(df.pop_share).all()
+
+    # there is no population by gender
+    df, _ = sd.merge(x="year", color="gender", by="ethnicity", level="nation",
+                     data_slice={"age_strat": "10-19", "year": "2020"})
+    assert not (df.population > 0).any()
+
+    sd.plot(y="suicide_per_100k", save_file=False, show_fig=False, **params)
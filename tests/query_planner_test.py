@@ -0,0 +1,70 @@
+import copy
+
+from wonder_utils import QueryPlanner, xml2df
+
+PARAMETERS = {
+    "b_parameters": {"B_1": "D76.V1-level1", "B_2": "D76.V7",
+                     "B_3": "*None*", "B_4": "*None*", "B_5": "*None*"},
+    "m_parameters": {"M_1": "D76.M1", "M_2": "D76.M2", "M_3": "D76.M3"},
+    "f_parameters": {},
+    "i_parameters": {},
+    "o_parameters": {"O_age": "D76.V5"},
+    "vm_parameters": {},
+    "v_parameters": {"V_D76.V51": "*All*"},
+    "misc_parameters": {"stage": "request"},
+}
+COLUMNS = ["Year", "Gender", "Deaths", "Population", "Crude Rate"]
+
+RESPONSE = """<page><response><data-table>
+<r><c l="2020" r="4"/><c l="Female" r="2"/><c l="20-24 years"/>
+<c v="10"/><c v="1,000"/><c v="1000.0"/></r>
+<r><c l="25-29 years"/><c v="30"/><c v="1,000"/><c v="3000.0"/></r>
+<r><c l="Male" r="2"/><c l="20-24 years"/><c v="20"/><c v="2,000"/>
+<c v="1000.0"/></r>
+<r><c l="25-29 years"/><c v="40"/><c v="2,000"/><c v="2000.0"/></r>
+</data-table></response></page>"""
+
+
+class RecordedClient:
+    """Answer with a recorded response, keep the requests."""
+
+    def __init__(self):
+        self.requests = []
+
+    def query(self, xml_request):
+        self.requests.append(xml_request)
+        return RESPONSE
+
+
+def test_implementation() -> None:
+    """Check if strata are folded into one request and split back."""
+
+    planner = QueryPlanner(PARAMETERS, COLUMNS)
+    strata = {"20-24": ["20-24"], "20-29": ["20-24", "25-29"]}
+    client = RecordedClient()
+    frames = planner.run(client, strata)
+
+    assert len(client.requests) == 1
+    assert "<name>B_3</name>\n<value>D76.V51</value>" in client.requests[0]
+    assert "<value>20-24</value>\n<value>25-29</value>" in client.requests[0]
+    # base parameters are not modified
+    assert PARAMETERS["b_parameters"]["B_3"] == "*None*"
+
+    assert frames["20-24"].columns.tolist() == COLUMNS
+    assert frames["20-24"].Deaths.tolist() == [10.0, 20.0]
+    assert frames["20-29"].Deaths.tolist() == [40.0, 60.0]
+    assert frames["20-29"]["Crude Rate"].tolist() == [2000.0, 1500.0]
+
+    # a suppressed code makes the sum of the stratum missing
+    suppressed = RESPONSE.replace('<c v="30"/>', '<c v="Suppressed"/>')
+    frames = planner.split(xml2df(suppressed, planner.plan(strata)[1]), strata)
+    assert frames["20-24"].Deaths.tolist() == [10.0, 20.0]
+    assert frames["20-29"].Deaths.isna().tolist() == [True, False]
+    assert frames["20-29"].Population.tolist() == [2000.0, 4000.0]
+
+    # a free B_ parameter before a used one: the strata are the second column
+    parameters = copy.deepcopy(PARAMETERS)
+    parameters["b_parameters"].update({"B_2": "*None*", "B_3": "D76.V7"})
+    xml_request, columns = QueryPlanner(parameters, COLUMNS).plan(strata)
+    assert "<name>B_2</name>\n<value>D76.V51</value>" in xml_request
+    assert columns[:3] == ["Year", "Age Group", "Gender"]
@@ -0,0 +1,35 @@
+import os
+
+from wonder_utils import SuicideData, HtmlReport
+
+
+def test_implementation(tmp_path) -> None:
+    """Check if a batch of plots is written as a lightweight html report."""
+
+    sd = SuicideData()
+    report = HtmlReport(output_folder=str(tmp_path))
+
+    plot_params = {
+        "save_file": False,
+        "show_fig": False,
+        "x": "year",
+        "color": "ethnicity",
+        "by": "age_strat",
+        "rows": 1,
+        "data_slice": {"age_strat": "10-19"},
+        "report": report,
+    }
+    for y in ["deaths", "suicide_per_100k"]:
+        sd.plot(y=y, plot_filename=f"adolescents_{y}", **plot_params)
+
+    index = report.write()
+
+    assert os.path.exists(os.path.join(tmp_path, "plotly.min.js"))
+    assert sorted(os.listdir(os.path.join(tmp_path, "figures"))) == [
+        "adolescents_deaths.js",
+        "adolescents_suicide_per_100k.js",
+    ]
+    with open(index) as f:
+        assert f.read().count("<script src=") == 1
+    with open(os.path.join(tmp_path, "figures", "adolescents_deaths.js")) as f:
+        assert '"bdata"' in f.read()
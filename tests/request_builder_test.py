@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from wonder_utils import QueryPlanner, QuerySpec, RequestBuilder
+from wonder_utils.query.cache import canonical_request
+
+SPEC = QuerySpec(
+    group_by=["D76.V1-level1", "D76.V7"],
+    filters={"D76.V2": ["X60-X84"], "D76.V1": ["2018", "2019"]},
+    title="Suicides & self-harm",
+)
+
+
+def test_implementation() -> None:
+    """Check if specs are hashable and serialized into valid requests."""
+
+    same = QuerySpec(
+        group_by=("D76.V1-level1", "D76.V7"),
+        filters=(("D76.V1", ("2018", "2019")), ("D76.V2", "X60-X84")),
+        title="Suicides & self-harm",
+    )
+    assert SPEC == same and hash(SPEC) == hash(same)
+    assert len({SPEC, same, SPEC.where("D76.V51", ["20-24"])}) == 2
+    assert SPEC.by("D76.V17").group_by[-1] == "D76.V17"
+    assert SPEC.filter_values("D76.V51") is None
+
+    builder = RequestBuilder()
+    xml_request = builder.to_xml(SPEC)
+    assert builder.to_xml(same) is xml_request
+    # valid xml, escaped, no duplicated parameter
+    names = [name for name, _ in json.loads(canonical_request(xml_request))]
+    assert len(names) == len(set(names))
+    assert "<value>Suicides &amp; self-harm</value>" in xml_request
+    assert "<name>B_3</name>\n<value>*None*</value>" in xml_request
+    assert "<name>F_D76.V1</name>\n<value>2018</value>\n<value>2019</value>" in xml_request
+
+    parameters = builder.parameters(SPEC.where("D76.V51", ["20-24"]))
+    assert parameters["v_parameters"]["V_D76.V51"] == ["20-24"]
+    assert parameters["o_parameters"]["O_age"] == "D76.V51"
+    parameters = builder.parameters(QuerySpec(age_adjusted=True))
+    assert parameters["m_parameters"]["M_4"] == "D76.M4"
+    assert parameters["o_parameters"]["O_aar"] == "aar_std"
+
+
+def test_validation() -> None:
+    """Check if invalid specs are rejected."""
+
+    builder = RequestBuilder()
+    invalid = [
+        QuerySpec(group_by=["D76.V99"]),
+        QuerySpec(group_by=["D76.V1-level1", "D76.V7", "D76.V8",
+                            "D76.V17", "D76.V9", "D76.V27"]),
+        QuerySpec(measures=["D76.M1", "D76.M2"]),
+        QuerySpec(filters={"D76.V5": ["15-24"], "D76.V51": ["20-24"]}),
+        QuerySpec(group_by=["D76.V51"], age_adjusted=True),
+    ]
+    for spec in invalid:
+        with pytest.raises(ValueError):
+            builder.to_xml(spec)
+
+    planner = QueryPlanner(SPEC, ["Year", "Gender", "Deaths", "Population",
+                                  "Crude Rate"])
+    xml_request, columns = planner.plan({"20-29": ["20-24", "25-29"]})
+    assert columns[2] == "Age Group"
+    assert "<name>B_3</name>\n<value>D76.V51</value>" in xml_request
+    assert "<name>V_D76.V51</name>\n<value>20-24</value>\n<value>25-29</value>" in xml_request
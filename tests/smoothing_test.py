@@ -0,0 +1,40 @@
+import numpy as np
+
+from wonder_utils import SuicideData
+from wonder_utils.stats.smoothing import eb_rates
+
+
+def test_implementation() -> None:
+    """Check if small cells are shrunk more than large ones."""
+
+    deaths = np.array([1, 30, 1000, 2000, np.nan, 5])
+    population = np.array([1e4, 1e5, 1e7, 1e7, 1e5, 1e5])
+    groups = [np.array(["a", "a", "a", "a", "a", "b"])]
+    rates, w = eb_rates(deaths, population, groups)
+
+    parent = 3031 / (1e4 + 1e5 + 2e7)
+    raw = deaths / population
+    # every smoothed rate is between the raw rate and the parent rate
+    for i in range(4):
+        assert min(raw[i], parent) <= rates[i] <= max(raw[i], parent)
+    assert w[0] < w[1] < w[2]
+    # missing count: parent rate, single cell group: its own rate
+    assert np.isclose(rates[4], parent)
+    assert np.isclose(rates[5], 5e-5)
+
+
+def test_smoothed_metric() -> None:
+    """Check the suicide_per_100k_eb metric of merge and plot."""
+
+    sd = SuicideData()
+    params = dict(x="year", color="race", by="hhs",
+                  data_slice={"age_strat": "10-19"})
+    df, _ = sd.merge(**params)
+    assert df.suicide_per_100k_eb.notna().all()
+    # the smoothing keeps the total number of deaths
+    assert np.isclose(
+        (df.suicide_per_100k_eb * df.population).sum() / 100_000,
+        df.deaths.sum(),
+        rtol=0.05,
+    )
+    sd.plot(y="suicide_per_100k_eb", save_file=False, show_fig=False, **params)
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from wonder_utils import SuicideData, trend_tests
+from wonder_utils.stats.trends import fdr_bh
+
+
+def test_implementation() -> None:
+    """Check if batched fits find the simulated trends."""
+
+    rng = np.random.default_rng(0)
+    years = np.arange(2010, 2021)
+    slopes = np.repeat([0.1, 0.0, -0.1], 20)
+    population = 1e6
+    df = pd.DataFrame([
+        {"series": i, "year": str(year), "population": population,
+         "deaths": rng.poisson(population * 1e-3 * np.exp(slope * (year - 2015)))}
+        for i, slope in enumerate(slopes) for year in years
+    ])
+    # two batches, sent to the process pool
+    res = trend_tests(df, ["series"], chunk_size=30, max_workers=2)
+    assert res.series.tolist() == list(range(len(slopes)))
+    assert np.allclose(res.slope, slopes, atol=0.015)
+    assert (res.slope_low < res.slope).all() and (res.slope < res.slope_high).all()
+    assert (res.direction[:20] == "increase").all()
+    assert (res.direction[40:] == "decrease").all()
+    assert (res.direction[20:40] == "none").mean() > 0.8
+
+    nb = trend_tests(df, ["series"], family="negative-binomial")
+    assert np.allclose(nb.slope, res.slope, atol=0.01)
+
+    # an empty selection has the columns and no row
+    empty = trend_tests(df.iloc[:0], ["series"])
+    assert empty.empty and empty.columns.equals(res.columns)
+
+    assert np.allclose(fdr_bh([0.01, 0.04, np.nan, 0.03]), [0.03, 0.04, np.nan, 0.04],
+                       equal_nan=True)
+
+
+def test_trends() -> None:
+    """Check the trends of SuicideData."""
+
+    sd = SuicideData()
+    res = sd.trends(["age_strat", "race", "ethnicity"], "proportion",
+                    data_slice={"age_strat": "10-19"})
+    assert set(res.direction) <= {"increase", "decrease", "none"}
+    assert res.p_adjusted.dropna().between(0, 1).all()
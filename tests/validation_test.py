@@ -0,0 +1,58 @@
+import pandas as pd
+
+from wonder_utils import SuicideData
+from wonder_utils.data_loader.validation import partitions, validate
+
+
+def export(rows: list) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["hhs", "year", "deaths", "population"])
+
+
+def test_implementation() -> None:
+    """Check every check on exports with known inconsistencies."""
+
+    assert partitions(["20-64", "20plus", "65plus", "Overall"]) == [
+        ("20plus", ("20-64", "65plus"))
+    ]
+
+    exports = {
+        ("20-64", "2018-2019"): export([("HHS1", "2018", 10, 100), ("HHS1", "2019", 12, 100),
+                                        ("HHS3", "2018", None, 60)]),
+        # suppressed deaths of HHS3 (NaN): not checked
+        ("65plus", "2018-2019"): export([("HHS1", "2018", 5, 50), ("HHS1", "2019", -1, 50),
+                                         ("HHS3", "2018", 4, 30)]),
+        # suppressed 65plus row: HHS2 is not checked
+        ("20plus", "2018-2019"): export([("HHS1", "2018", 15, 150), ("HHS1", "2019", 13, 150),
+                                         ("HHS2", "2018", 15, 150), ("HHS3", "2018", 9, 90)]),
+        ("20plus", "2019-2020"): export([("HHS1", "2019", 11, 150), ("HHS1", "2020", 9, 150)]),
+    }
+    report = validate(exports, ["hhs", "year"]).set_index(["check", "target"])
+
+    # 2019 in both periods of 20plus
+    assert report.loc[("unique_keys", "20plus"), "failed"] == 2
+    assert report.loc[("period_overlap", "20plus"), "failed"] == 1
+    assert report.loc[("period_overlap", "20plus"), "example"] == "2019"
+    assert report.loc[("period_overlap", "20-64"), "failed"] == 0
+    assert report.loc[("non_negative", "65plus deaths"), "failed"] == 1
+    assert report.loc[("non_negative", "65plus deaths"), "example"] == "HHS1, 2019"
+    additive = report.loc[("additive", "20plus = 20-64 + 65plus")]
+    # 13 != 12 - 1 (the cell duplicated in 20plus is checked once)
+    assert additive.failed == 1
+    assert additive.checked == 2
+    assert additive.example == "HHS1, 2019"
+
+    # a collapsed cell with a suppressed row is a lower bound: not checked
+    exports[("65plus", "2018-2019")] = exports[("65plus", "2018-2019")].assign(
+        suppressed_rows=[0, 1, 0])
+    report = validate(exports, ["hhs", "year"]).set_index(["check", "target"])
+    additive = report.loc[("additive", "20plus = 20-64 + 65plus")]
+    assert additive.failed == 0
+    assert additive.checked == 1
+
+
+def test_suicide_data() -> None:
+    """Check the report of the current exports."""
+
+    sd = SuicideData()
+    assert (sd.validation.failed == 0).all()
+    assert (sd.validation.loc[sd.validation.check == "additive"].checked > 0).all()
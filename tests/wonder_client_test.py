@@ -0,0 +1,99 @@
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from wonder_utils import WonderClient, WonderQueryError, ResponseCache
+
+
+class StandInWonder(BaseHTTPRequestHandler):
+    """Local stand-in for the CDC Wonder datarequest endpoint: answers
+    slowly, echoes the request and fails once on "flaky" requests."""
+
+    failed = set()
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        request_xml = parse_qs(self.rfile.read(length).decode())["request_xml"][0]
+        time.sleep(0.3)
+        if request_xml == "bad":
+            status = 400
+        elif request_xml.startswith("flaky") and request_xml not in self.failed:
+            self.failed.add(request_xml)
+            status = 503
+        else:
+            status = 200
+        self.send_response(status)
+        self.end_headers()
+        self.wfile.write(f"<response>{request_xml}</response>".encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInWonder)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def test_implementation(server) -> None:
+    """Check if queries run concurrently, in order, with retries."""
+
+    pytest.importorskip("requests")
+
+    client = WonderClient(url=server, max_concurrency=8,
+                          min_interval=0.01, backoff=0.05)
+    requests = [f"query {i}" for i in range(8)] + ["flaky 8"]
+
+    start = time.perf_counter()
+    results = client.query_many(requests)
+    duration = time.perf_counter() - start
+
+    assert results == [f"<response>{r}</response>" for r in requests]
+    # about the slowest query (one retry), far from 9 x 0.3 s
+    assert duration < 1.5
+
+    with pytest.raises(WonderQueryError):
+        client.query("bad")
+
+
+def test_cache(server, tmp_path) -> None:
+    """Check if identical requests are served from the cache, offline."""
+
+    pytest.importorskip("requests")
+
+    cache = ResponseCache(str(tmp_path))
+    client = WonderClient(url=server, min_interval=0.01, cache=cache)
+    request = ("<request-parameters><parameter><name>B_1</name>"
+               "<value>D76.V1-level1</value></parameter><parameter>"
+               "<name>M_1</name><value>D76.M1</value></parameter>"
+               "</request-parameters>")
+    # same parameters, different order
+    reordered = ("<request-parameters><parameter><name>M_1</name>"
+                 "<value>D76.M1</value></parameter><parameter><name>B_1</name>"
+                 "<value>D76.V1-level1</value></parameter>"
+                 "</request-parameters>")
+    response = client.query(request)
+
+    offline = WonderClient(url="http://127.0.0.1:9", cache=cache, offline=True)
+    assert offline.query(reordered) == response
+    with pytest.raises(WonderQueryError):
+        offline.query("<request-parameters/>")
+
+    # eviction when the cache is too large
+    ResponseCache(str(tmp_path), max_size=0).evict()
+    assert cache.get(request) is None
+
+
+def test_without_requests() -> None:
+    """Check if the package imports without the requests library."""
+
+    code = "import sys; sys.modules['requests'] = None; import wonder_utils"
+    subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,48 @@
+import numpy as np
+
+from wonder_utils import xml2df
+
+# shape of a D76 response grouped by year, gender and hispanic origin
+RESPONSE = """<?xml version="1.0" encoding="UTF-8"?>
+<page><response><data-table>
+<r><c l="2018" r="4"/><c l="Female" r="2"/><c l="Hispanic or Latino"/>
+<c v="1,021"/><c v="29,433,187"/><c v="3.5"/></r>
+<r><c l="Not Hispanic or Latino"/><c v="8,099"/><c v="134,434,419"/>
+<c v="6.0"/></r>
+<r><c l="Male" r="2"/><c l="Hispanic or Latino"/><c v="3,740"/>
+<c v="30,100,410"/><c v="12.4"/></r>
+<r><c l="Not Hispanic or Latino"/><c v="Suppressed"/><c v="130,012,000"/>
+<c v="Unreliable"/></r>
+</data-table></response></page>"""
+
+
+def test_implementation() -> None:
+    """Check if rowspans and values are parsed into typed columns."""
+
+    columns = ["Year", "Gender", "Ethnicity", "Deaths", "Population",
+               "Crude Rate"]
+    # also streamed in tiny chunks
+    for chunk_size in [2 ** 16, 7]:
+        df = xml2df(RESPONSE, columns=columns, chunk_size=chunk_size)
+
+        assert df.Year.tolist() == ["2018"] * 4
+        assert df.Gender.tolist() == ["Female", "Female", "Male", "Male"]
+        assert df.Population.dtype == np.float64
+        assert df.Population.tolist()[0] == 29433187.0
+        assert df.Deaths.tolist()[1:] == [8099.0, 3740.0, "Suppressed"]
+        assert df["Crude Rate"].tolist()[-1] == "Unreliable"
+
+
+def test_label_in_value_column() -> None:
+    """Check if a label row over a value column keeps the row order."""
+
+    response = RESPONSE.replace(
+        "</data-table>",
+        '<r><c l="Total"/><c l="Total"/><c l="Total"/><c l="Total"/>'
+        '<c v="323,979,016"/><c l="Total"/></r></data-table>',
+    )
+    df = xml2df(response)
+    assert len(df) == 5
+    assert df[3].tolist() == [1021.0, 8099.0, 3740.0, "Suppressed", "Total"]
+    assert df[4].dtype == np.float64
+    assert df[5].tolist()[-2:] == ["Unreliable", "Total"]
@@ -1 +1,14 @@
-from .data_loader.cdc_wonder import SuicideData, Death_Data
\ No newline at end of file
+from .data_loader.cdc_wonder import SuicideData, Death_Data
+from .data_loader.population import PopulationData
+from .plots.report import HtmlReport
+from .plots.plan import PlotPlan, PlanRunner
+from .plots.blueprint import wait_for_exports
+from .plots.export import export_figure
+from .query.client import WonderClient, WonderQueryError
+from .query.cache import ResponseCache
+from .query.parser import xml2df
+from .query.request import create_xml, QuerySpec, RequestBuilder
+from .query.planner import QueryPlanner
+from .stats.age_adjustment import age_adjust, STANDARD_POPULATION_2000
+from .stats.trends import trend_tests
+from .stats.disparity import disparities
@@ -0,0 +1,384 @@
+from typing import Any, Dict, Iterator, List, Mapping, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..stats.age_adjustment import STANDARD_POPULATION_2000, parse_ages
+from .cells import CellStore, PARTIAL, SUPPRESSED
+
+
+# summed over the age bands, age_adjusted_rate is recomputed
+ADDITIVE = ("deaths", "population")
+
+
+def elementary_intervals(labels: List[str]) -> np.ndarray:
+    """Finest disjoint age intervals tiling every label.
+
+    Example:
+        ["Overall", "10-19", "20-64", "25plus"]
+        -> [[0, 9], [10, 19], [20, 24], [25, 64], [65, inf]]
+
+    Args:
+        labels (List[str]): age strata, see parse_ages
+
+    Returns:
+        np.ndarray: (intervals, 2) first and last age
+    """
+    bounds = [parse_ages(label) for label in labels]
+    starts = sorted({lo for lo, _ in bounds} | {hi + 1 for _, hi in bounds if np.isfinite(hi)})
+    ends = [start - 1 for start in starts[1:]] + [np.inf]
+    return np.array(list(zip(starts, ends)), dtype=float)
+
+
+def interval_label(lo: float, hi: float) -> str:
+    """(65, inf) -> "65plus", (25, 64) -> "25-64"."""
+    return f"{lo:.0f}plus" if np.isinf(hi) else f"{lo:.0f}-{hi:.0f}"
+
+
+def popcount(masks: np.ndarray, n_bits: int) -> np.ndarray:
+    """Number of bits set in every mask."""
+    return sum((masks >> j) & 1 for j in range(n_bits))
+
+
+class AgeStrata(Mapping):
+    """Age strata stored as disjoint age bands, unions derived on demand.
+
+    CDC Wonder exports overlap (Overall, 20plus, 20-64, 25-64 ...). They
+    are split once into the disjoint bands of every cell (e.g. 10-19,
+    20-24 = 20-64 - 25-64, 25-64, 65plus), then any union is a sum of
+    bands, computed for every cell at once and cached:
+        strata = AgeStrata(load_data(...))
+        strata["20plus"]  # 20-24 + 25-64 + 65plus
+        strata["20-64"]   # also works if it was not downloaded
+
+    A band missing from a cell (suppressed rows) is recovered from the
+    other exports when possible (65plus = 20plus - 20-64), otherwise the
+    unknown bands of an export are merged into one coarser band. A union
+    splitting a band, or not covered by the bands of a cell, is left out
+    for this cell, unless an export of the cell inside the union is
+    suppressed (or a lower bound): the cell is kept with NaN deaths
+    (missing, not outside the cube). The exports are kept in a CellStore
+    (exports).
+
+    An exported stratum keeps the age-adjusted rates of CDC Wonder. The
+    rates of the other unions are recomputed from the bands: direct
+    standardization is linear, the rate of a union is the mean of the
+    age-adjusted rates of its bands weighted by their standard
+    populations, missing if a band has no rate (e.g. a derived one, see
+    set_band_rates).
+
+    Behaves like the former Dict[str, pd.DataFrame] of load_data: keys
+    are the exported strata, values the derived dataframes (do not
+    replace their rows, columns can be added).
+    """
+
+    def __init__(
+        self,
+        data: Dict[str, pd.DataFrame],
+        age_column: str = "age_strat",
+        standard: Dict[str, int] = STANDARD_POPULATION_2000,
+        dims: List[str] = None,
+    ) -> None:
+        """
+        Args:
+            data (Dict[str, pd.DataFrame]): age_strat -> dataframe, rows
+                identified by their non-numeric columns
+            age_column (str, optional): column of the age strata.
+                Defaults to "age_strat".
+            standard (Dict[str, int], optional): standard population of
+                the age-adjusted rates. Defaults to STANDARD_POPULATION_2000.
+            dims (List[str], optional): columns identifying a cell in the
+                store of the exports (with age_column). Defaults to None
+                (every key column).
+        """
+        self.age_column = age_column
+        self.labels = sorted(data)
+        self.elements = elementary_intervals(self.labels)
+        self.masks = {label: self.mask(label) for label in self.labels}
+        # union -> (dataframe, cells), see derive
+        self.cache: Dict[str, Tuple[pd.DataFrame, np.ndarray]] = dict()
+
+        # standard population of every elementary interval
+        standard_bounds = np.array([parse_ages(band) for band in standard])
+        self.element_weights = np.array([
+            sum(w for (lo, _), w in zip(standard_bounds, standard.values())
+                if e_lo <= lo <= e_hi)
+            for e_lo, e_hi in self.elements
+        ], dtype=float)
+
+        frames = [data[label] for label in self.labels]
+        self.columns = list(frames[0].columns) if frames else []
+        data_ = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        values = [age_column, *ADDITIVE, "age_adjusted_rate"]
+        self.keys = [col for col in self.columns
+                     if col not in values and col not in data_.select_dtypes("number")]
+        self.exports = CellStore.from_frame(
+            data_, [*(dims or self.keys), age_column], overlapping=[age_column]
+        ) if frames else None
+        self.cells, self.bands = self.split(data_)
+
+    def mask(self, label: Any) -> int:
+        """Bitmask of the elementary intervals of a label.
+
+        Raises:
+            KeyError: label splitting an elementary interval
+        """
+        lo, hi = parse_ages(label) if isinstance(label, str) else label
+        inside = (self.elements[:, 0] >= lo) & (self.elements[:, 1] <= hi)
+        overlap = (self.elements[:, 0] <= hi) & (self.elements[:, 1] >= lo)
+        if (overlap & ~inside).any() or not inside.any():
+            raise KeyError(f"{label!r} is not a union of the age bands")
+        return int(sum(1 << int(j) for j in np.flatnonzero(inside)))
+
+    def split(self, data_: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Disjoint bands of every cell from the overlapping exports.
+
+        Returns:
+            Tuple[pd.DataFrame, pd.DataFrame]: cells (key columns) and
+                bands (cell, mask, deaths, population, age_adjusted_rate
+                of the band if exported, weight)
+        """
+        n_elem, n_labels = len(self.elements), len(self.labels)
+        if data_.empty:
+            return (pd.DataFrame(columns=self.keys),
+                    pd.DataFrame(columns=["cell", "mask", *ADDITIVE,
+                                          "age_adjusted_rate", "weight"]))
+        codes = data_.groupby(self.keys, sort=True, dropna=False).ngroup().to_numpy()
+        cells = (data_[self.keys].assign(cell=codes)
+                 .drop_duplicates("cell").sort_values("cell")
+                 .set_index("cell"))
+        n_cells = len(cells)
+        label_codes = pd.Index(self.labels).get_indexer(data_[self.age_column])
+
+        # exported values: (cells, labels, deaths / population)
+        exported = np.full((n_cells, n_labels, len(ADDITIVE)), np.nan)
+        for i, col in enumerate(ADDITIVE):
+            exported[codes, label_codes, i] = pd.to_numeric(data_[col], errors="coerce")
+        if "suppressed_rows" in data_:
+            # lower bounds (see Crosswalk.collapse) are not split
+            partial = data_.suppressed_rows.to_numpy() > 0
+            exported[codes[partial], label_codes[partial], 0] = np.nan
+        rates = np.full((n_cells, n_labels), np.nan)
+        if "age_adjusted_rate" in data_:
+            rates[codes, label_codes] = pd.to_numeric(
+                data_.age_adjusted_rate, errors="coerce")
+        members = np.array([[(self.masks[label] >> j) & 1 for j in range(n_elem)]
+                            for label in self.labels], dtype=bool)
+
+        # cells sharing the same exports share the same bands
+        known = ~np.isnan(exported[:, :, 0])
+        patterns = known @ (1 << np.arange(n_labels))
+        tables = []
+        for pattern in np.unique(patterns):
+            rows = np.flatnonzero(patterns == pattern)
+            labels = np.flatnonzero(known[rows[0]])
+            if not len(labels):
+                continue
+            design = members[labels].astype(float)
+            pinv = np.linalg.pinv(design)
+            chosen = self.identified_bands(members[labels], pinv @ design)
+            # least squares solution (exact for the identified sets)
+            solution = np.einsum("nm,rmc->rnc", pinv, exported[rows][:, labels])
+            band_values = np.einsum("bn,rnc->rbc", chosen.astype(float), solution)
+            band_masks = chosen @ (1 << np.arange(n_elem))
+            band_rates = np.full((len(rows), len(chosen)), np.nan)
+            for b, mask in enumerate(band_masks):
+                for k in labels:
+                    if self.masks[self.labels[k]] == mask:
+                        band_rates[:, b] = rates[rows, k]
+            tables.append(pd.DataFrame({
+                "cell": np.repeat(rows, len(chosen)),
+                "mask": np.tile(band_masks, len(rows)).astype(np.int64),
+                **{col: band_values[:, :, i].ravel() for i, col in enumerate(ADDITIVE)},
+                "age_adjusted_rate": band_rates.ravel(),
+                "weight": np.tile(chosen @ self.element_weights, len(rows)),
+            }))
+        bands = pd.concat(tables, ignore_index=True)
+        return cells.reset_index(drop=True), bands
+
+    @staticmethod
+    def identified_bands(members: np.ndarray, projector: np.ndarray) -> np.ndarray:
+        """Fine disjoint bands whose sums are known from some exports.
+
+        The sum of a set of elements is known if its indicator is in the
+        row space of the exports (fixed by the projector). The bands start
+        as the largest disjoint exports (and the rest of the covered
+        elements if known), then a band is split by an export, a band or
+        a class of elements in the same exports, whenever the part inside
+        is known too: polynomial in the number of elements and exports,
+        instead of testing the 2 ** elements subsets.
+
+        Args:
+            members (np.ndarray): (exports, elements) elements of each export
+            projector (np.ndarray): (elements, elements) projector on the
+                row space of members
+
+        Returns:
+            np.ndarray: (bands, elements) elements of each band, by bitmask
+        """
+        n_elem = members.shape[1]
+
+        def identified(subset: np.ndarray) -> bool:
+            return np.allclose(projector @ subset, subset)
+
+        covered = members.any(axis=0)
+        # elements in the same exports are never split
+        classes = [np.all(members == members[:, [j]], axis=0) for j in np.flatnonzero(covered)]
+        chosen, used = [], np.zeros(n_elem, dtype=bool)
+        for export in members[np.argsort(-members.sum(axis=1), kind="stable")]:
+            if not (export & used).any():
+                chosen.append(export)
+                used |= export
+        rest = covered & ~used
+        if rest.any() and identified(rest):
+            chosen.append(rest)
+
+        split = True
+        while split:
+            split = False
+            for i, band in enumerate(chosen):
+                for cut in [*members, *classes, *chosen]:
+                    part = band & cut
+                    if part.any() and (band & ~cut).any() and identified(part):
+                        chosen[i: i + 1] = [part, band & ~cut]
+                        split = True
+                        break
+                if split:
+                    break
+        chosen = np.array(chosen, dtype=bool).reshape(-1, n_elem)
+        return chosen[np.argsort(chosen @ (1 << np.arange(n_elem)))]
+
+    def derive(self, label: Any) -> Tuple[pd.DataFrame, np.ndarray]:
+        """Sum the bands of a union, for every cell at once. The cells of
+        an exported stratum keep the values of the export when the bands
+        do not cover them (e.g. suppressed deaths), and its rates.
+
+        Returns:
+            Tuple[pd.DataFrame, np.ndarray]: dataframe of the union and
+                its cells
+        """
+        union = self.mask(label)
+        n_elem, n_cells = len(self.elements), len(self.cells)
+        cell = self.bands.cell.to_numpy()
+        masks = self.bands["mask"].to_numpy()
+        inside = (masks & ~union) == 0
+        split = ((masks & union) != 0) & ~inside
+        covered = np.bincount(cell, weights=inside * popcount(masks, n_elem),
+                              minlength=n_cells)
+        valid = (covered == popcount(np.int64(union), n_elem)) & ~(
+            np.bincount(cell, weights=split, minlength=n_cells) > 0)
+
+        sums = {
+            col: np.where(valid, np.bincount(
+                cell, weights=np.where(inside, self.bands[col], 0.0), minlength=n_cells
+            ), np.nan)
+            for col in ADDITIVE
+        }
+        rate = self.bands.age_adjusted_rate.to_numpy(dtype=float)
+        # a band without rate leaves the rate of the union missing
+        unrated = np.bincount(cell, weights=inside & np.isnan(rate), minlength=n_cells) > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weight = np.where(inside, self.bands.weight, 0.0)
+            adjusted = np.bincount(cell, weights=weight * np.nan_to_num(rate),
+                                   minlength=n_cells) / np.bincount(
+                cell, weights=weight, minlength=n_cells)
+        adjusted[unrated | ~valid] = np.nan
+
+        # exports of the cells inside the union
+        kept = valid.copy()
+        for other in self.labels:
+            if self.masks[other] & ~union:
+                continue
+            pos = self.exports.find(self.cells.assign(**{self.age_column: other}))
+            stored = pos >= 0
+            suppressed = np.zeros(n_cells, dtype=bool)
+            suppressed[stored] = (self.exports.flags[pos[stored]] & SUPPRESSED) > 0
+            partial = np.zeros(n_cells, dtype=bool)
+            partial[stored] = (self.exports.flags[pos[stored]] & PARTIAL) > 0
+            if self.masks[other] == union:
+                export = {col: np.full(n_cells, np.nan) for col in (*ADDITIVE, "rate")}
+                export["deaths"][stored] = np.where(
+                    suppressed[stored], np.nan, self.exports.measures["deaths"][pos[stored]])
+                export["population"][stored] = self.exports.measures["population"][pos[stored]]
+                if "age_adjusted_rate" in self.exports.measures:
+                    export["rate"][stored] = (
+                        self.exports.measures["age_adjusted_rate"][pos[stored]])
+                for col in ADDITIVE:
+                    sums[col] = np.where(valid, sums[col], export[col])
+                # the rate of CDC Wonder, else the rate of the bands
+                adjusted = np.where(np.isnan(export["rate"]), adjusted, export["rate"])
+                kept |= stored
+            else:
+                kept |= suppressed | partial
+
+        cells = np.flatnonzero(kept)
+        deaths = np.round(sums["deaths"][cells])
+        res = self.cells.iloc[cells].reset_index(drop=True).assign(
+            deaths=deaths if np.isnan(deaths).any() else deaths.astype(np.int64),
+            population=np.round(sums["population"][cells]),
+            age_adjusted_rate=adjusted[cells],
+            **{self.age_column: label},
+        )
+        return res[[col for col in self.columns if col in res]], cells
+
+    def __getitem__(self, label: Any) -> pd.DataFrame:
+        if label not in self.cache:
+            self.cache[label] = self.derive(label)
+        return self.cache[label][0]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.labels)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def partition(self, label: Any) -> List[str]:
+        """Disjoint elementary strata of a union.
+
+        Example:
+            strata.partition("25plus") -> ["25-64", "65plus"]
+        """
+        union = self.mask(label)
+        return [interval_label(lo, hi) for j, (lo, hi) in enumerate(self.elements)
+                if (union >> j) & 1]
+
+    def total(self) -> str:
+        """Exported stratum of every age (e.g. "Overall").
+
+        Raises:
+            KeyError: no export covers every age band
+        """
+        every = (1 << len(self.elements)) - 1
+        for label in self.labels:
+            if self.masks[label] == every:
+                return label
+        raise KeyError("no age stratum covers every age band")
+
+    def set_band_rates(
+        self, label: Any, rates: pd.Series, strata: List[str]
+    ) -> None:
+        """Fill the missing age-adjusted rates of a band (e.g. computed
+        from finer age groups), the derived dataframes are updated.
+
+        Args:
+            label (Any): band (e.g. "20-24" or (20, 24))
+            rates (pd.Series): rates indexed by the strata
+            strata (List[str]): key columns of the rates
+        """
+        is_band = (self.bands["mask"] == self.mask(label)).to_numpy()
+        missing = is_band & self.bands.age_adjusted_rate.isna().to_numpy()
+        keys = self.cells.iloc[self.bands.cell.to_numpy()[missing]][strata]
+        self.bands.loc[missing, "age_adjusted_rate"] = rates.reindex(
+            pd.MultiIndex.from_frame(keys)).to_numpy()
+        # recompute the rates in place: added columns (eb_deaths ...) stay
+        for union, (df, _) in self.cache.items():
+            df["age_adjusted_rate"] = self.derive(union)[0].age_adjusted_rate.to_numpy()
+
+    def band_bounds(self) -> List[Tuple[float, float]]:
+        """Age bounds of the contiguous bands of the cells."""
+        res = []
+        for mask in np.unique(self.bands["mask"]):
+            idx = np.flatnonzero([(int(mask) >> j) & 1 for j in range(len(self.elements))])
+            if (np.diff(idx) == 1).all():
+                res.append((self.elements[idx[0], 0], self.elements[idx[-1], 1]))
+        return res
@@ -1,4 +1,4 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 from plotly.subplots import make_subplots
 import plotly.graph_objects as go
 
@@ -7,17 +7,86 @@ import numpy as np
 import os
 
 from ..plots.blueprint import DataPloter
+from ..stats.age_adjustment import age_adjust, parse_ages
+from ..stats.excess import fit_baseline
+from .age_strata import AgeStrata
+from .crosswalk import Crosswalk, CELL
+from .validation import validate
+
+
+# frequencies of Death_Data.resample, bins start on the first day
+FREQUENCIES = {
+    "monthly": pd.offsets.MonthBegin(),
+    "quarterly": pd.offsets.QuarterBegin(startingMonth=1),
+    "annual": pd.offsets.YearBegin(),
+}
+PERIODS_PER_YEAR = {"monthly": 12, "quarterly": 4, "annual": 1}
+
+# labels of CDC Wonder -> labels of the processed data
+RECODES = {
+    "Not Hispanic or Latino": "Non-Hispanic",
+    "Hispanic or Latino": "Hispanic",
+    "Not Applicable": np.nan,
+    "Unreliable": np.nan,
+    "Asian or Pacific Islander": "API",
+    "Asian": "API",
+    "Black or African American": "Black",
+    "Native Hawaiian or Other Pacific Islander": "API",
+}
+
+
+def read_export(
+    path: str, skip_totals: bool = False
+) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """Table and query parameters of a CDC Wonder txt export.
+
+    Args:
+        path (str): exported file
+        skip_totals (bool, optional): drop the lines with "Total" (total
+            lines add a column and break the table). Defaults to False.
+
+    Returns:
+        Tuple[pd.DataFrame, Dict[str, str]]: the table (strings) and the
+            "Key: value" lines after it (e.g. "Age Group", "Group By")
+    """
+    process_line = lambda line: line.strip().replace('"', "").split("\t")
+
+    lines, parameters = [], dict()
+    with open(path, "r") as f:
+        for line in iter(lambda: f.readline().rstrip(), '"---"'):
+            if skip_totals and "Total" in line:
+                continue
+            lines.append(process_line(line))
+        for line in f:
+            key, sep, value = line.strip().strip('"').partition(": ")
+            if sep and key not in parameters:
+                parameters[key] = value
+    # column is on the header, remove corner named notes
+    return pd.DataFrame(lines[1:], columns=lines[0][1:]), parameters
 
 
 class SuicideData(DataPloter):
     """
     Available features to select:
         race, year, hhs, ethnicity population, ethno_race, age_strat,
-        ethno_race_4_cat, gender
+        ethno_race_4_cat, gender, nation (with level="nation", regions
+        rolled up once at load), provisional (year not final yet)
+
+    Age strata are stored as disjoint bands (see AgeStrata), any union is
+    derived on demand: sd.data["20plus"], sd.data["20-24"]
+
+    The exports are checked at load (see validate), failed checks in
+    sd.validation.loc[sd.validation.failed > 0]
 
     Available features to plot:
         deaths, suicide_proportion, suicide_per_100k, age_adjusted_rate,
-        suicide_proportion_2
+        suicide_proportion_2, suicide_per_100k_eb (empirical-Bayes rate,
+        regions smoothed toward the national rate), suicide_share_external
+        (% of the deaths from external causes, after join_deaths),
+        deaths_nowcast and suicide_per_100k_nowcast (provisional counts
+        scaled to their expected final value, after learn_completeness),
+        suppressed_cells, deaths_high and deaths_exact (cells hidden by
+        CDC Wonder, see CellStore)
 
     Differences between suicide_proportion and suicide_proportion_2:
         If color="gender", x="year", by="age_strat"
@@ -54,6 +123,9 @@ class SuicideData(DataPloter):
             "Not Stated",
         ],
     ) -> None:
+        # race coding eras -> the same columns and categories, rows of
+        # reject_list dropped (see crosswalk.report())
+        self.crosswalk = Crosswalk(reject=reject_list)
 
         super(SuicideData, self).__init__(
             data_folder=data_folder,
@@ -61,141 +133,42 @@ class SuicideData(DataPloter):
             drop_cols=drop_cols,
             reject_list=reject_list,
         )
+        # exported cells (before the split into age bands), the hidden
+        # ones are suppressed
+        self.cells = self.data.exports
+
+    def file_to_dataframe(self, data_folder: str, file: str) -> pd.DataFrame:
+        """CDC Wonder txt file into dataframe, harmonized by the crosswalk
+        of its race coding era (see Crosswalk): the columns are matched
+        by name, whatever their position in the export.
 
-    def file_to_dataframe(
-        self,
-        data_folder: str,
-        file: str,
-        rename_mapper: Dict[str, str] = {
-            "Single Race 6": "race",
-            "Race": "race",
-            "Gender": "gender",
-            "Residence HHS Region Code": "hhs",
-            "HHS Region Code": "hhs",
-            "Population": "population",
-            "Year": "year",
-            "Deaths": "deaths",
-            "Hispanic Origin": "ethnicity",
-            "Age Adjusted Rate": "age_adjusted_rate",
-        },
-    ) -> pd.DataFrame:
-        """CDC Wonder txt file into dataframe
         Args:
             data_folder (str): where the data files are stored
             file (str): file that we want to process
-            rename_mapper (_type_, optional): dictionnary to rename
-                the columns.
-                Defaults to {"Single Race 6": "race",
-                             "Race": "race",
-                             "Gender": "gender",
-                             "Residence HHS Region Code": "hhs",
-                             "HHS Region Code": "hhs",
-                             "Population": "population",
-                             "Year": "year", "Deaths": "deaths",
-                             "Hispanic Origin": "ethnicity",
-                             "Age Adjusted Rate": "age_adjusted_rate",}.
 
         Returns:
             pd.DataFrame: converted file into a pandas dataframe
         """
-        process_line = lambda line: line.strip().replace('"', "").split("\t")
-
-        lines = []
-        with open(f"{data_folder}/{file}", "r") as f:
-            for line in iter(lambda: f.readline().rstrip(), '"---"'):
-                lines.append(process_line(line))
-        # column is on the header, remove corner named notes
-        res = pd.DataFrame(lines[1:], columns=lines[0][1:]).rename(
-            columns=rename_mapper
-        )
-        # If Age Adjusted Rate is missing, fill with NaN
-        if "age_adjusted_rate" not in res.columns:
-            res["age_adjusted_rate"] = np.nan
-        return res
+        table, _ = read_export(f"{data_folder}/{file}")
+        return self.crosswalk.harmonize(table, source=file)
 
-    def processor(
-        self,
-        x: pd.DataFrame,
-        force_numeric: List[str] = ["population", "Crude Rate"],
-    ) -> pd.DataFrame:
-        """Process dataframes: convert columns dtype, compute new features.
+    def processor(self, x: pd.DataFrame) -> pd.DataFrame:
+        """Process dataframes: compute new features.
         Args:
-            x (pd.DataFrame): dataframe that we want to process
-            force_numeric (List[str], optional): force these columns
-                into numerical columns.
-                Defaults to ["population", "Crude Rate"].
+            x (pd.DataFrame): harmonized dataframe that we want to process
 
         Returns:
             pd.DataFrame: processed dataframe
 
         """
-
-        # Automatically convert numeric columns to float/int type
-        if self.numeric_columns.empty:
-            self.numeric_columns = x.apply(
-                lambda s: pd.to_numeric(s.replace(np.nan, 0), errors="coerce")
-                .notnull()
-                .all()
-            )
-
-            # compare with the force numeric and prevent numeric columns
-            self.convert_cols = [
-                col
-                for col, bool_ in self.numeric_columns.items()
-                if (bool_ or col in force_numeric)  # and col != "year"
-                # keep year as str to prevent unexpected ticks on plots
-            ]
-
-        x.columns = self.numeric_columns.index
-
-        x.year = x.year.str.extract("(\d+)")
-        x = x.replace(
-            {
-                "Not Hispanic or Latino": "Non-Hispanic",
-                "Hispanic or Latino": "Hispanic",
-                "Not Applicable": np.nan,
-                "Unreliable": np.nan,
-                "Asian or Pacific Islander": "API",
-                "Asian": "API",
-                "Black or African American": "Black",
-                "Native Hawaiian or Other Pacific Islander": "API",
-            }
+        # based on ethinicty and race, ethno-race feature with only 4
+        # categories (or 3 if the only races are Black and White)
+        x["ethno_race_4_cat"] = np.select(
+            [x.ethnicity == "Hispanic", x.race.isin(["Black", "White"])],
+            ["Hispanic", "Non-hispanic " + x.race],
+            "Non-hispanic Others",
         )
 
-        x[self.convert_cols] = x[self.convert_cols].apply(
-            pd.to_numeric, errors="coerce"
-        )
-
-        x = x.loc[
-            ~pd.concat(
-                [x.eq(forbidden).any(axis=1)
-                 for forbidden in self.reject_list], axis=1
-            ).any(axis=1)
-        ]
-
-        def create_ethno_4_cat(
-            y: pd.Series
-        ) -> str:
-            """based on ethinicty and race, create a ethno-race feature
-            with only 4 categories (or 3 if the only races are Black and White)
-
-            Args:
-                y (pd.Series): single line series to create
-                the feature
-
-            Returns:
-                str: ethno-race feature
-            """
-            if y.ethnicity == "Hispanic":
-                return "Hispanic"
-            if y.race in ("Black", "White"):
-                return f"Non-hispanic {y.race}"
-            return "Non-hispanic Others"
-
-        x["ethno_race_4_cat"] = (x[["race", "ethnicity"]]
-                                 .apply(lambda y: create_ethno_4_cat(y),
-                                        axis=1))
-
         return x.assign(ethno_race=lambda x: x.race + " " + x.ethnicity)
 
     def load_data(
@@ -224,27 +197,135 @@ class SuicideData(DataPloter):
             for entry in raw_data
         }
 
-        age_strats = set(
-            key[0] for key in data.keys()
-        )  # {'10-19', 'Overall', ...}
+        age_strats = sorted(
+            set(key[0] for key in data.keys())
+        )  # ['10-19', 'Overall', ...]
+
+        exports = {
+            key_tuple: self.processor(
+                self.file_to_dataframe(self.data_folder, file).assign(
+                    age_strat=key_tuple[0]
+                )
+            )
+            for key_tuple, file in sorted(data.items())
+        }
+        # additive identities, unique keys ... checked on every load
+        self.validation = validate(exports, list(CELL))
 
         dataframes = {
             age_strat: pd.concat(
-                map(
-                    self.processor,
-                    [
-                        self.file_to_dataframe(self.data_folder, file).assign(
-                            age_strat=age_strat
-                        )
-                        for key_tuple, file in data.items()
-                        if key_tuple[0] == age_strat
-                    ],
-                ),
+                [df for key_tuple, df in exports.items() if key_tuple[0] == age_strat],
                 axis=0,
             )
             for age_strat in age_strats
         }
-        return {key: df.drop(df.filter(drop_cols), axis=1) for key, df in dataframes.items()}
+        # overlapping exports stored as disjoint age bands
+        return AgeStrata(
+            {key: df.drop(df.filter(drop_cols), axis=1) for key, df in dataframes.items()},
+            dims=list(CELL),
+        )
+
+    def fill_age_adjusted_rate(
+        self,
+        fine_data: pd.DataFrame,
+        age_column: str = "age_group",
+        strata: List[str] = ["hhs", "gender", "year", "race", "ethnicity"],
+    ) -> None:
+        """Fill the age_adjusted_rate missing from CDC Wonder in the age
+        bands (e.g. 10-19, 20-24 which is derived) by direct
+        standardization on the 2000 U.S. standard population,
+        renormalized to each band. The rates of the age_strat are
+        recomputed from their bands (see AgeStrata).
+
+        Args:
+            fine_data (pd.DataFrame): deaths and population by strata and
+                fine age group (e.g. five-year age groups), with the labels
+                of the processed data ("Non-Hispanic", "API" ...)
+            age_column (str, optional): column of the age groups.
+                Defaults to "age_group".
+            strata (List[str], optional): columns identifying a row of
+                the data. Defaults to ["hhs", "gender", "year", "race",
+                "ethnicity"].
+        """
+        for bounds in self.data.band_bounds():
+            try:
+                adjusted = age_adjust(
+                    fine_data, strata, age_column, age_range=bounds
+                ).set_index(strata).age_adjusted_rate
+            except ValueError:
+                # no fine age group inside this band
+                continue
+            self.data.set_band_rates(bounds, adjusted, strata)
+        # merged data are computed again
+        self.processed_data.clear()
+
+    def join_deaths(
+        self,
+        death_data: "Death_Data",
+        icd: Any = "External causes of morbidity and mortality",
+        name: str = "external",
+    ) -> None:
+        """Join the deaths of a Death_Data on year, hhs and age_strat
+        (states are summed into their HHS region, months into years, age
+        groups into the age_strat they tile), then plot the share of
+        these deaths that are suicides:
+            sd.join_deaths(dd)
+            sd.plot(y="suicide_share_external", x="year", color="gender")
+
+        Args:
+            death_data (Death_Data): deaths by state, month and age group
+            icd (Any, optional): ICD chapter (or list of chapters), None
+                for every cause.
+                Defaults to "External causes of morbidity and mortality".
+            name (str, optional): name of the joined columns
+                ({name}_deaths, suicide_share_{name}).
+                Defaults to "external".
+        """
+        # states already summed into their region
+        deaths = death_data.rollups["hhs"].dropna(subset=["date"])
+        if icd is not None:
+            icds = [icd] if isinstance(icd, str) else list(icd)
+            deaths = deaths.loc[deaths.icd.isin(icds)]
+        deaths = deaths.assign(year=deaths.date.dt.year.astype(str))
+
+        # ages of every age group, parsed once per label
+        if "age_group" in deaths:
+            age_groups = deaths.age_group.fillna("").astype(str)
+            bounds = dict()
+            for label in age_groups.unique():
+                try:
+                    bounds[label] = parse_ages(label)
+                except ValueError:
+                    # e.g. "Not Stated", only in Overall
+                    bounds[label] = (np.nan, np.nan)
+            ages = np.array(age_groups.map(bounds).tolist(), dtype=float).reshape(-1, 2)
+        else:
+            ages = np.tile([0.0, np.inf], (len(deaths), 1))
+
+        tables = []
+        for age_strat in self.data:
+            low, high = parse_ages(age_strat)
+            if (low, high) == (0, np.inf):
+                inside = np.ones(len(deaths), dtype=bool)
+            else:
+                inside = (ages[:, 0] >= low) & (ages[:, 1] <= high)
+                # the age groups must tile the age_strat (e.g. ten-year
+                # groups can not give 10-19)
+                groups = np.unique(ages[inside], axis=0)
+                if (not len(groups) or groups[0, 0] != low or groups[-1, 1] != high
+                        or (groups[1:, 0] != groups[:-1, 1] + 1).any()):
+                    continue
+            # missing if a state-month or an age group is suppressed
+            grouped = deaths.loc[inside].groupby(["year", "hhs"]).deaths
+            tables.append(
+                grouped.sum().where(grouped.count() == grouped.size())
+                .reset_index()
+                .assign(age_strat=age_strat)
+            )
+        denominators = pd.concat(tables, ignore_index=True) if tables else (
+            pd.DataFrame(columns=["year", "hhs", "deaths", "age_strat"])
+        )
+        self.join_denominator(name, denominators, ["year", "hhs", "age_strat"])
 
 class Death_Data(DataPloter):
     """
@@ -259,6 +340,17 @@ class Death_Data(DataPloter):
         suicide_proportion: among 10-19's suicide, proportion of female
         suicide_proportion_2: for women, % of suicide occuring among 10-19
 
+    States are rolled up into HHS regions and the nation once, at load:
+        dd.select_data({"hhs": "HHS4"}, level="hhs")
+
+    Time series are stored partitioned by (state, icd), each partition
+    with a sorted DatetimeIndex: a query on a state and a chapter only
+    reads its partition, and date ranges are binary searches.
+        dd.resample("Alabama", icd, "quarterly")
+        dd.rolling("Alabama", icd, window=12)
+        dd.yoy("Alabama", icd)
+        dd.excess("2019-12")  # excess deaths against a seasonal baseline
+
     The data pipeline works as following:"""
 
     def __init__(
@@ -279,7 +371,10 @@ class Death_Data(DataPloter):
             "Crude Rate",
         ],
         reject_list: List[str] = ["test"],
+        date_format: str = "%Y/%m",
     ) -> None:
+        # format of the Month Code column (e.g. 2018/01)
+        self.date_format = date_format
 
         super(Death_Data, self).__init__(
             data_folder=data_folder,
@@ -287,6 +382,8 @@ class Death_Data(DataPloter):
             drop_cols=drop_cols,
             reject_list=reject_list,
         )
+        # (state, icd) -> time series
+        self.series = self.partition()
 
     def file_to_dataframe(
         self,
@@ -297,6 +394,10 @@ class Death_Data(DataPloter):
             "ICD Chapter": "icd",
             "UCD - ICD Chapter": "icd",
             "Deaths": "deaths",
+            "State": "state",
+            "Residence State": "state",
+            "Ten-Year Age Groups": "age_group",
+            "Five-Year Age Groups": "age_group",
         },
     ) -> pd.DataFrame:
         """CDC Wonder txt file into dataframe
@@ -318,18 +419,9 @@ class Death_Data(DataPloter):
         Returns:
             pd.DataFrame: converted file into a pandas dataframe
         """
-        process_line = lambda line: line.strip().replace('"', "").split("\t")
-
-        lines = []
-        with open(f"{data_folder}/{file}", "r") as f:
-            for line in iter(lambda: f.readline().rstrip(), '"---"'):
-                #CDC wonder add a total line despite we did not ask, 
-                #ading one column sometime and breaking the pipeline
-                if "Total" in line:
-                    continue
-                lines.append(process_line(line))
-        # column is on the header, remove corner named notes
-        res = pd.DataFrame(lines[1:], columns=lines[0][1:]).rename(
+        #CDC wonder add a total line despite we did not ask,
+        #ading one column sometime and breaking the pipeline
+        res = read_export(f"{data_folder}/{file}", skip_totals=True)[0].rename(
             columns=rename_mapper
         )
         # If Age Adjusted Rate is missing, fill with NaN
@@ -340,14 +432,14 @@ class Death_Data(DataPloter):
     def processor(
         self,
         x: pd.DataFrame,
-        force_numeric: List[str] = ["population", "Crude Rate"],
+        force_numeric: List[str] = ["population", "Crude Rate", "deaths"],
     ) -> pd.DataFrame:
         """Process dataframes: convert columns dtype, compute new features.
         Args:
             x (pd.DataFrame): dataframe that we want to process
             force_numeric (List[str], optional): force these columns
-                into numerical columns.
-                Defaults to ["population", "Crude Rate"].
+                into numerical columns ("Suppressed" deaths are NaN).
+                Defaults to ["population", "Crude Rate", "deaths"].
 
         Returns:
             pd.DataFrame: processed dataframe
@@ -372,7 +464,16 @@ class Death_Data(DataPloter):
 
         x.columns = self.numeric_columns.index
 
-        x.date = pd.to_datetime(x.date)#.str.extract("(\d+)")
+        # explicit format: parsed at once instead of guessed per element,
+        # only the rows without date (e.g. totals) are left missing
+        dates = pd.to_datetime(x.date, format=self.date_format, errors="coerce")
+        unparsed = dates.isna() & x.date.notna() & (x.date.astype(str).str.strip() != "")
+        if unparsed.any():
+            raise ValueError(
+                f"{unparsed.sum()} dates do not match the format {self.date_format!r}, "
+                f"e.g. {x.date[unparsed].iloc[0]!r}"
+            )
+        x.date = dates
         # x = x.replace(
         #     {
         #         "Not Hispanic or Latino": "Non-Hispanic",
@@ -448,3 +549,179 @@ class Death_Data(DataPloter):
         }
         
         return {key: df.drop(df.filter(drop_cols), axis=1) for key, df in dataframes.items()}
+
+    def partition(self) -> Dict[Any, pd.DataFrame]:
+        """Split the data by (state, icd), each part indexed by its sorted
+        dates.
+
+        Returns:
+            Dict[Any, pd.DataFrame]: (state, icd) -> time series
+        """
+        if not self.data:
+            return dict()
+        data_ = pd.concat(self.data.values()).dropna(subset=["date"])
+        return {
+            key: df.drop(columns=["state", "icd"]).set_index("date").sort_index()
+            for key, df in data_.groupby(["state", "icd"], sort=True)
+        }
+
+    def query(
+        self, state: str, icd: str, start: Any = None, end: Any = None
+    ) -> pd.DataFrame:
+        """Rows of a state and an ICD chapter between two dates.
+
+        Args:
+            state (str): state
+            icd (str): ICD chapter
+            start (Any, optional): first date (e.g. "2019-01").
+                Defaults to None.
+            end (Any, optional): last date, included. Defaults to None.
+
+        Raises:
+            KeyError: no data for this state and chapter
+
+        Returns:
+            pd.DataFrame: rows indexed by date (do not modify it inplace)
+        """
+        if (state, icd) not in self.series:
+            raise KeyError(f"no data for state {state!r} and icd {icd!r}")
+        return self.series[(state, icd)].loc[start:end]
+
+    def resample(
+        self,
+        state: str,
+        icd: str,
+        freq: str = "monthly",
+        column: str = "deaths",
+        by: str = "age_group",
+        start: Any = None,
+        end: Any = None,
+    ) -> pd.DataFrame:
+        """Regular time series of a state and an ICD chapter.
+
+        Args:
+            state (str): state
+            icd (str): ICD chapter
+            freq (str, optional): "monthly", "quarterly" or "annual".
+                Defaults to "monthly".
+            column (str, optional): summed column. Defaults to "deaths".
+            by (str, optional): one series per value of this column, None
+                for a single series. Defaults to "age_group".
+            start (Any, optional): first date. Defaults to None.
+            end (Any, optional): last date. Defaults to None.
+
+        Returns:
+            pd.DataFrame: periods x values of by, NaN without data
+        """
+        df = self.query(state, icd, start, end)
+        if by is not None and by in df:
+            df = (
+                df.set_index(by, append=True)[column]
+                .groupby(level=[0, 1])
+                .sum(min_count=1)
+                .unstack(by)
+            )
+        else:
+            df = df[[column]]
+        return df.resample(FREQUENCIES[freq]).sum(min_count=1)
+
+    def rolling(
+        self,
+        state: str,
+        icd: str,
+        window: int = 12,
+        freq: str = "monthly",
+        how: str = "sum",
+        **kwargs,
+    ) -> pd.DataFrame:
+        """Rolling window over the periods (e.g. deaths of the last 12
+        months), see resample for the other arguments.
+
+        Args:
+            state (str): state
+            icd (str): ICD chapter
+            window (int, optional): number of periods. Defaults to 12.
+            freq (str, optional): see resample. Defaults to "monthly".
+            how (str, optional): "sum" or "mean". Defaults to "sum".
+
+        Returns:
+            pd.DataFrame: periods x values of by
+        """
+        df = self.resample(state, icd, freq, **kwargs)
+        return df.rolling(window, min_periods=window).agg(how)
+
+    def yoy(
+        self, state: str, icd: str, freq: str = "monthly", **kwargs
+    ) -> pd.DataFrame:
+        """Year-over-year deltas: each period against the same period
+        one year before, see resample for the other arguments.
+
+        Args:
+            state (str): state
+            icd (str): ICD chapter
+            freq (str, optional): see resample. Defaults to "monthly".
+
+        Returns:
+            pd.DataFrame: "value", "delta" and "pct_change" (in %)
+                column groups, periods x values of by
+        """
+        df = self.resample(state, icd, freq, **kwargs)
+        before = df.shift(PERIODS_PER_YEAR[freq])
+        return pd.concat(
+            {"value": df, "delta": df - before, "pct_change": 100 * (df - before) / before},
+            axis=1,
+        )
+
+    def excess(
+        self,
+        baseline_end: Any = "2019-12",
+        harmonics: int = 2,
+        column: str = "deaths",
+        alpha: float = 0.05,
+        icd: Any = None,
+    ) -> pd.DataFrame:
+        """Excess deaths of every (state, icd) monthly series against a
+        seasonal baseline (harmonics and linear trend) fitted on the
+        periods up to baseline_end, all series at once (see fit_baseline).
+
+        Example:
+            dd.excess("2019-12")  # 2020-2022 against 2018-2019
+
+        Args:
+            baseline_end (Any, optional): last period of the baseline.
+                Defaults to "2019-12".
+            harmonics (int, optional): sine/cosine pairs of the seasonality.
+                Defaults to 2.
+            column (str, optional): counts. Defaults to "deaths".
+            alpha (float, optional): 1 - confidence level. Defaults to 0.05.
+            icd (Any, optional): only this ICD chapter (or list of
+                chapters). Defaults to None (every chapter).
+
+        Raises:
+            KeyError: no data for icd
+
+        Returns:
+            pd.DataFrame: state, icd, date, observed, expected (with its
+                prediction interval) and excess (with its interval)
+        """
+        icds = [icd] if isinstance(icd, str) else icd
+        keys = [key for key in self.series if icds is None or key[1] in icds]
+        if not keys:
+            raise KeyError(f"no data for icd {icd!r}")
+        # one row per series, one column per month
+        wide = pd.concat(
+            {key: self.series[key][column].resample(FREQUENCIES["monthly"]).sum(min_count=1)
+             for key in keys},
+            axis=1,
+        ).T
+        wide.index.names = ["state", "icd"]
+        fit = fit_baseline(
+            wide.to_numpy(dtype=float), wide.columns, baseline_end, harmonics, alpha
+        )
+        n_dates = len(wide.columns)
+        return pd.DataFrame({
+            "state": np.repeat(wide.index.get_level_values("state"), n_dates),
+            "icd": np.repeat(wide.index.get_level_values("icd"), n_dates),
+            "date": np.tile(wide.columns, len(wide)),
+            **{name: values.ravel() for name, values in fit.items()},
+        })
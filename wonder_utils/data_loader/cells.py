@@ -0,0 +1,212 @@
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from .join import key_dictionaries, encode, sort_merge
+
+
+# flags of a cell (bitmask), PARTIAL: known deaths of a collapsed cell
+# with suppressed rows (a lower bound)
+SUPPRESSED = np.uint8(1)
+UNRELIABLE = np.uint8(2)
+PARTIAL = np.uint8(4)
+# CDC Wonder hides the rows with 1-9 deaths (and with 0 death when zero
+# values are not shown), rates of 20 deaths or less are "Unreliable"
+SUPPRESSION_MAX = 9
+UNRELIABLE_MAX = 20
+
+
+class CellStore:
+    """Sparse cube of the cells of CDC Wonder exports (e.g. hhs x gender x
+    year x race x ethnicity x age_strat).
+
+    Only the exported cells are stored: their integer codes (sorted),
+    dense measure arrays and a bitmask of flags (SUPPRESSED, UNRELIABLE,
+    PARTIAL), instead of NaN-filled object frames. A cell of the cube
+    that is not stored was hidden by CDC Wonder: it is suppressed (0 to
+    SUPPRESSION_MAX deaths), as are the suppressed_rows of a collapsed
+    cell (see Crosswalk.collapse). Aggregations count the suppressed
+    children of every group on the masks, a sum is exact only without
+    any:
+        cells = CellStore.from_frame(df, ["hhs", "gender", "year", "age_strat"],
+                                     overlapping=["age_strat"])
+        cells.sum(["year"], where={"age_strat": "10-19", "hhs": "HHS1"})
+        -> year, deaths, deaths_high, population, suppressed_cells, status
+
+    The values of an overlapping dimension (e.g. Overall, 20plus and
+    20-64) are never summed together: a sum selects one of them, or
+    groups by the dimension.
+    """
+
+    def __init__(
+        self,
+        dims: List[str],
+        levels: Dict[str, pd.Index],
+        codes: np.ndarray,
+        measures: Dict[str, np.ndarray],
+        flags: np.ndarray,
+        overlapping: List[str] = [],
+    ) -> None:
+        """
+        Args:
+            dims (List[str]): dimensions of the cube
+            levels (Dict[str, pd.Index]): dimension -> sorted labels
+            codes (np.ndarray): sorted codes of the stored cells, see encode
+            measures (Dict[str, np.ndarray]): measure -> value of every
+                stored cell (0 deaths if suppressed), suppressed_rows:
+                suppressed children inside every stored cell
+            flags (np.ndarray): SUPPRESSED | UNRELIABLE | PARTIAL of every
+                stored cell
+            overlapping (List[str], optional): dimensions whose values
+                overlap (e.g. age_strat). Defaults to [].
+        """
+        self.dims = list(dims)
+        self.overlapping = list(overlapping)
+        self.levels = levels
+        self.shape = tuple(len(levels[dim]) for dim in self.dims)
+        self.codes = codes
+        self.measures = measures
+        self.flags = flags
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        dims: List[str],
+        deaths: str = "deaths",
+        population: str = "population",
+        overlapping: List[str] = [],
+        rate: str = "age_adjusted_rate",
+    ) -> "CellStore":
+        """Store the cells of a long dataframe (one row per cell).
+
+        Args:
+            df (pd.DataFrame): exported cells, NaN deaths are suppressed,
+                suppressed_rows (if any) of the collapsed cells
+            dims (List[str]): dimensions of the cube
+            deaths (str, optional): deaths column. Defaults to "deaths".
+            population (str, optional): population column.
+                Defaults to "population".
+            overlapping (List[str], optional): dimensions whose values
+                overlap (e.g. age_strat). Defaults to [].
+            rate (str, optional): rate column, stored as exported if any.
+                Defaults to "age_adjusted_rate".
+
+        Returns:
+            CellStore: cells of df, the first row of a duplicated cell
+        """
+        levels = key_dictionaries([df], dims)
+        codes = encode(df, dims, levels)
+        codes, first = np.unique(codes, return_index=True)
+        first, codes = first[codes >= 0], codes[codes >= 0]
+
+        d = df[deaths].to_numpy(dtype=float)[first]
+        suppressed = np.isnan(d)
+        rows = (df.suppressed_rows.to_numpy(dtype=float)[first] if "suppressed_rows" in df
+                else np.zeros(len(first)))
+        rows = np.where(suppressed, np.maximum(np.nan_to_num(rows), 1), np.nan_to_num(rows))
+        flags = np.where(suppressed, SUPPRESSED, 0).astype(np.uint8)
+        flags[suppressed | (d <= UNRELIABLE_MAX)] |= UNRELIABLE
+        flags[~suppressed & (rows > 0)] |= PARTIAL
+        measures = {
+            "deaths": np.where(suppressed, 0, d).astype(np.int32),
+            "population": df[population].to_numpy(dtype=float)[first],
+            "suppressed_rows": rows.astype(np.uint8),
+        }
+        if rate in df:
+            measures[rate] = df[rate].to_numpy(dtype=float)[first]
+        return cls(dims, levels, codes, measures, flags, overlapping)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory of the arrays (labels excepted)."""
+        return (self.codes.nbytes + self.flags.nbytes
+                + sum(values.nbytes for values in self.measures.values()))
+
+    def find(self, df: pd.DataFrame) -> np.ndarray:
+        """Position of the stored cell of every row of df (with a column
+        per dimension), -1 if it is not stored."""
+        return sort_merge(encode(df, self.dims, self.levels), self.codes)
+
+    def positions(self, dim: str, value: Any) -> np.ndarray:
+        """Positions of the labels of a dimension selected by a value, a
+        list or a slice (as in select_data)."""
+        labels = self.levels[dim]
+        if isinstance(value, slice):
+            return np.arange(len(labels))[labels.slice_indexer(value.start, value.stop)]
+        values = value if isinstance(value, (list, tuple)) else [value]
+        pos = labels.get_indexer([str(v) for v in values])
+        return np.unique(pos[pos >= 0])
+
+    def sum(self, by: List[str], where: Dict[str, Any] = dict()) -> pd.DataFrame:
+        """Sum the cells selected by where into the groups of by, every
+        group of the cube included (an empty group has only suppressed
+        cells).
+
+        deaths is the sum of the known deaths, deaths_high adds
+        SUPPRESSION_MAX for every suppressed child (a hidden cell or a
+        suppressed row of a stored one): deaths is exact when
+        suppressed_cells is 0. The status (flags) of a group is SUPPRESSED
+        if a child is suppressed, UNRELIABLE if deaths <= UNRELIABLE_MAX.
+
+        Args:
+            by (List[str]): dimensions of the groups
+            where (Dict[str, Any], optional): dimension -> value, list or
+                slice. Defaults to dict().
+
+        Raises:
+            ValueError: several values of an overlapping dimension in a
+                group
+
+        Returns:
+            pd.DataFrame: by, deaths, deaths_high, population,
+                suppressed_cells and status of every group
+        """
+        allowed = {
+            dim: (self.positions(dim, where[dim]) if dim in where
+                  else np.arange(size))
+            for dim, size in zip(self.dims, self.shape)
+        }
+        for dim in self.overlapping:
+            if dim not in by and len(allowed[dim]) != 1:
+                raise ValueError(
+                    f"the values of {dim} overlap, select one or group by {dim}"
+                )
+        position = np.unravel_index(self.codes, self.shape)
+        selected = np.ones(len(self.codes), dtype=bool)
+        for dim, pos in zip(self.dims, position):
+            if dim in where:
+                selected &= np.isin(pos, allowed[dim])
+
+        # group of every selected cell, by-dims as a mixed radix
+        group_shape = tuple(len(allowed[dim]) for dim in by)
+        n_groups = int(np.prod(group_shape, dtype=np.int64))
+        group = np.zeros(int(selected.sum()), dtype=np.int64)
+        for dim, size in zip(by, group_shape):
+            pos = position[self.dims.index(dim)][selected]
+            group = group * size + np.searchsorted(allowed[dim], pos)
+
+        stored = np.bincount(group, minlength=n_groups)
+        # cells of a group in the cube
+        children = int(np.prod([len(allowed[dim]) for dim in self.dims if dim not in by],
+                               dtype=np.int64))
+        suppressed = (children - stored) + np.bincount(
+            group, weights=self.measures["suppressed_rows"][selected],
+            minlength=n_groups).astype(np.int64)
+        deaths = np.bincount(group, weights=self.measures["deaths"][selected],
+                             minlength=n_groups).astype(np.int64)
+        res_flags = np.where(suppressed > 0, SUPPRESSED, 0).astype(np.uint8)
+        res_flags[deaths <= UNRELIABLE_MAX] |= UNRELIABLE
+
+        index = pd.MultiIndex.from_product(
+            [self.levels[dim][allowed[dim]] for dim in by], names=by
+        ) if by else pd.RangeIndex(1)
+        return pd.DataFrame({
+            "deaths": deaths,
+            "deaths_high": deaths + SUPPRESSION_MAX * suppressed,
+            "population": np.bincount(group, weights=self.measures["population"][selected],
+                                      minlength=n_groups),
+            "suppressed_cells": suppressed,
+            "status": res_flags,
+        }, index=index).reset_index(drop=not by)
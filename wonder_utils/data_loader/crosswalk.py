@@ -0,0 +1,299 @@
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# harmonized categories, the code of a label is its position
+CATEGORIES: Dict[str, Tuple[str, ...]] = {
+    "race": (
+        "American Indian or Alaska Native",
+        "API",
+        "Black",
+        "White",
+        "More than one race",
+    ),
+    "ethnicity": ("Hispanic", "Non-Hispanic", "Not Stated"),
+}
+# columns of every harmonized export, in this order
+COLUMNS = (
+    "hhs", "gender", "year", "race", "ethnicity",
+    "deaths", "population", "age_adjusted_rate", "provisional",
+)
+NUMERIC = ("deaths", "population", "age_adjusted_rate")
+# identify a cell, rows of the same cell are collapsed
+CELL = ("hhs", "gender", "year", "race", "ethnicity")
+
+# codes shared by every era
+ETHNICITY_CODES = {
+    "2135-2": "Hispanic",
+    "2186-2": "Non-Hispanic",
+    "2186-5": "Non-Hispanic",
+    "NS": "Not Stated",
+}
+VALUE_COLUMNS = {
+    "Gender": "gender",
+    "Year": "year",
+    "Hispanic Origin Code": "ethnicity",
+    "Deaths": "deaths",
+    "Population": "population",
+    "Age Adjusted Rate": "age_adjusted_rate",
+}
+
+
+class Era:
+    """Coding of the CDC Wonder exports of a period: its header
+    signature, the columns to harmonize and the codes of the categories.
+    The codes are turned into lookup arrays once, an export is then
+    harmonized by indexing them (no row-wise replace).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        signature: Tuple[str, ...],
+        columns: Dict[str, str],
+        codes: Dict[str, Dict[str, str]],
+        parts: Dict[str, Dict[str, Tuple[str, ...]]] = {},
+    ) -> None:
+        """
+        Args:
+            name (str): name of the era
+            signature (Tuple[str, ...]): headers only the exports of the
+                era have (e.g. "Single Race 6 Code")
+            columns (Dict[str, str]): header -> harmonized column
+            codes (Dict[str, Dict[str, str]]): harmonized column -> (code
+                of CDC Wonder -> harmonized label)
+            parts (Dict[str, Dict[str, Tuple[str, ...]]], optional):
+                harmonized column -> (label -> codes whose rows add up to
+                the label, a cell misses the hidden ones). Defaults to {}
+                (one row per label, other codes are aliases).
+        """
+        self.name = name
+        self.signature = signature
+        self.columns = columns
+        self.codes = codes
+        # column -> number of rows of every harmonized code
+        self.n_parts = {
+            column: np.array([len(parts.get(column, {}).get(label, ("",)))
+                              for label in CATEGORIES[column]], dtype=np.int64)
+            for column in codes
+        }
+        # column -> (codes of CDC Wonder, harmonized code of each, -1 last
+        # for the unknown codes of get_indexer)
+        self.lookups = {
+            column: (
+                pd.Index(list(mapping)),
+                np.array([CATEGORIES[column].index(label) for label in mapping.values()]
+                         + [-1], dtype=np.int64),
+            )
+            for column, mapping in codes.items()
+        }
+
+    def matches(self, header: Iterable[str]) -> bool:
+        """Whether an export of this header belongs to the era."""
+        return set(self.signature) <= set(header)
+
+    def categorize(self, column: str, values: pd.Series) -> np.ndarray:
+        """Harmonized codes of the CDC Wonder codes, -1 if unknown."""
+        raw, lookup = self.lookups[column]
+        return lookup[raw.get_indexer(values)]
+
+
+ERAS = (
+    # bridged race, 2010-2017 (Multiple Cause of Death, 1999-2020)
+    Era(
+        "bridged",
+        ("Race", "Race Code"),
+        {"HHS Region Code": "hhs", "Race Code": "race", **VALUE_COLUMNS},
+        {
+            "race": {
+                "1002-5": "American Indian or Alaska Native",
+                "A-PI": "API",
+                "2054-5": "Black",
+                "2106-3": "White",
+            },
+            "ethnicity": ETHNICITY_CODES,
+        },
+    ),
+    # single race, 2018+ (Provisional Mortality Statistics)
+    Era(
+        "single_race_6",
+        ("Single Race 6", "Single Race 6 Code"),
+        {"Residence HHS Region Code": "hhs", "Single Race 6 Code": "race", **VALUE_COLUMNS},
+        {
+            "race": {
+                "1002-5": "American Indian or Alaska Native",
+                "A": "API",
+                "NHOPI": "API",
+                "2054-5": "Black",
+                "2106-3": "White",
+                "M": "More than one race",
+            },
+            "ethnicity": ETHNICITY_CODES,
+        },
+        {"race": {"API": ("A", "NHOPI")}},
+    ),
+)
+
+
+class Crosswalk:
+    """Harmonize the exports of every era into the same columns and
+    categories, e.g. bridged "Asian or Pacific Islander" and single race
+    "Asian" + "Native Hawaiian or Other Pacific Islander" into "API".
+
+    The rows sharing a cell after the crosswalk are collapsed, the rows
+    of a rejected (or unknown) category are dropped, both are recorded:
+        crosswalk = Crosswalk(reject=["Not Stated"])
+        df = crosswalk.harmonize(table, source="Data 2018-2022 Overall.txt")
+        crosswalk.report()  # source, era, column, code, label, action, rows
+    """
+
+    def __init__(self, reject: List[str] = [], eras: Tuple[Era, ...] = ERAS) -> None:
+        """
+        Args:
+            reject (List[str], optional): harmonized labels whose rows are
+                dropped. Defaults to [].
+            eras (Tuple[Era, ...], optional): known codings.
+                Defaults to ERAS.
+        """
+        self.eras = eras
+        # column -> whether each harmonized code is rejected
+        self.rejected = {
+            column: np.array([label in reject for label in labels])
+            for column, labels in CATEGORIES.items()
+        }
+        self.records = []
+
+    def era(self, header: Iterable[str]) -> Era:
+        """Era of an export, from its header.
+
+        Raises:
+            ValueError: no era matches the header
+        """
+        header = list(header)
+        for era in self.eras:
+            if era.matches(header):
+                return era
+        raise ValueError(f"unknown CDC Wonder coding, header {header}")
+
+    def harmonize(self, df: pd.DataFrame, source: str = None) -> pd.DataFrame:
+        """Harmonized columns, categories and dtypes of an export.
+
+        Args:
+            df (pd.DataFrame): export of CDC Wonder (see read_export)
+            source (str, optional): name of the export in the records.
+                Defaults to None.
+
+        Raises:
+            ValueError: unknown header
+
+        Returns:
+            pd.DataFrame: COLUMNS (NaN if not exported) and
+                suppressed_rows, one row per cell (see collapse)
+        """
+        era = self.era(df.columns)
+        exported = [col for col in era.columns if col in df]
+        res = df[exported].rename(columns=era.columns)
+        res = res.reindex(columns=list(COLUMNS)).reset_index(drop=True)
+        # "2021 (provisional)" -> "2021" and a flag
+        res["provisional"] = res.year.str.contains("provisional", case=False, na=False)
+        res["year"] = res.year.str.extract(r"(\d+)", expand=False)
+        # "Suppressed", "Unreliable" ... are missing
+        for col in NUMERIC:
+            res[col] = pd.to_numeric(res[col], errors="coerce")
+
+        keep = np.ones(len(res), dtype=bool)
+        # rows of the export expected in the cell of every row (e.g. 2 for
+        # API: Asian and NHOPI), a hidden row is counted as suppressed
+        expected = np.ones(len(res), dtype=np.int64)
+        for column in era.lookups:
+            if column not in {era.columns[col] for col in exported}:
+                continue
+            raw = res[column]
+            codes = era.categorize(column, raw)
+            self.record(source, era, column, raw)
+            keep &= (codes >= 0) & ~self.rejected[column][codes]
+            expected *= np.where(codes >= 0, era.n_parts[column][codes], 1)
+            labels = np.array(CATEGORIES[column], dtype=object)
+            res[column] = np.where(codes >= 0, labels[codes], None)
+        return self.collapse(res.loc[keep], expected[keep])
+
+    def record(
+        self,
+        source: str,
+        era: Era,
+        column: str,
+        raw: pd.Series,
+    ) -> None:
+        """Record the number of rows of every code collapsed with other
+        codes of the export (e.g. Asian and NHOPI), dropped (rejected) or
+        unknown."""
+        counts = raw.value_counts()
+        harmonized = era.categorize(column, counts.index.to_series())
+        n_codes = np.bincount(harmonized[harmonized >= 0],
+                              minlength=len(CATEGORIES[column]))
+        for code, label_code, rows in zip(counts.index, harmonized, counts.to_numpy()):
+            if label_code < 0:
+                label, action = None, "unknown"
+            else:
+                label = CATEGORIES[column][label_code]
+                if self.rejected[column][label_code]:
+                    action = "dropped"
+                elif n_codes[label_code] > 1:
+                    action = "collapsed"
+                else:
+                    continue
+            self.records.append({
+                "source": source, "era": era.name, "column": column,
+                "code": code, "label": label, "action": action, "rows": int(rows),
+            })
+
+    def collapse(self, df: pd.DataFrame, expected: np.ndarray = None) -> pd.DataFrame:
+        """One row per cell: deaths and population are the sums of the
+        known rows (missing if none is known), the age_adjusted_rate is
+        the population-weighted mean of the known rates (an
+        approximation, see fill_age_adjusted_rate). suppressed_rows
+        counts the rows of the cell left out of the sums: suppressed
+        (e.g. an NHOPI row) or hidden (fewer rows than expected), deaths
+        is then a lower bound (see CellStore).
+
+        Args:
+            df (pd.DataFrame): harmonized rows
+            expected (np.ndarray, optional): rows expected in the cell of
+                every row. Defaults to None (the rows of the cell).
+        """
+        cell = df.groupby(list(CELL), sort=False, dropna=False).ngroup().to_numpy()
+        if len(cell) == 0:
+            return df.reset_index(drop=True).assign(suppressed_rows=np.int64(0))
+        first = np.unique(cell, return_index=True)[1]
+        res = df.iloc[first].reset_index(drop=True)
+        n = len(res)
+        rows = np.bincount(cell, minlength=n)
+        hidden = (rows if expected is None else expected[first]) - rows
+        suppressed = np.bincount(cell, weights=df.deaths.isna(), minlength=n)
+        res["suppressed_rows"] = (np.maximum(hidden, 0) + suppressed).astype(np.int64)
+        if rows.max() == 1:
+            return res
+        for col in ("deaths", "population"):
+            values = df[col].to_numpy(dtype=float)
+            known = np.bincount(cell, weights=~np.isnan(values), minlength=n)
+            total = np.bincount(cell, weights=np.nan_to_num(values), minlength=n)
+            res[col] = np.where(known > 0, total, np.nan)
+        rate = df.age_adjusted_rate.to_numpy(dtype=float)
+        weight = np.where(np.isnan(rate), 0.0, df.population.to_numpy(dtype=float))
+        single = rows == 1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = (
+                np.bincount(cell, weights=weight * np.nan_to_num(rate), minlength=n)
+                / np.bincount(cell, weights=weight, minlength=n)
+            )
+        res["age_adjusted_rate"] = np.where(single, res.age_adjusted_rate, mean)
+        return res
+
+    def report(self) -> pd.DataFrame:
+        """Rows collapsed, dropped or unknown, by source and code."""
+        return pd.DataFrame(
+            self.records,
+            columns=["source", "era", "column", "code", "label", "action", "rows"],
+        )
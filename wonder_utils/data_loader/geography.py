@@ -0,0 +1,162 @@
+from typing import Dict, Iterable, List, Tuple
+import re
+
+import pandas as pd
+
+
+# from the finest to the coarsest level
+LEVELS = ("state", "hhs", "nation")
+NATION = "United States"
+
+# postal codes used in the labels of CDC Wonder
+STATE_NAMES: Dict[str, str] = {
+    "AL": "Alabama", "AK": "Alaska", "AZ": "Arizona", "AR": "Arkansas",
+    "CA": "California", "CO": "Colorado", "CT": "Connecticut",
+    "DE": "Delaware", "DC": "District of Columbia", "FL": "Florida",
+    "GA": "Georgia", "HI": "Hawaii", "ID": "Idaho", "IL": "Illinois",
+    "IN": "Indiana", "IA": "Iowa", "KS": "Kansas", "KY": "Kentucky",
+    "LA": "Louisiana", "ME": "Maine", "MD": "Maryland",
+    "MA": "Massachusetts", "MI": "Michigan", "MN": "Minnesota",
+    "MS": "Mississippi", "MO": "Missouri", "MT": "Montana",
+    "NE": "Nebraska", "NV": "Nevada", "NH": "New Hampshire",
+    "NJ": "New Jersey", "NM": "New Mexico", "NY": "New York",
+    "NC": "North Carolina", "ND": "North Dakota", "OH": "Ohio",
+    "OK": "Oklahoma", "OR": "Oregon", "PA": "Pennsylvania",
+    "RI": "Rhode Island", "SC": "South Carolina", "SD": "South Dakota",
+    "TN": "Tennessee", "TX": "Texas", "UT": "Utah", "VT": "Vermont",
+    "VA": "Virginia", "WA": "Washington", "WV": "West Virginia",
+    "WI": "Wisconsin", "WY": "Wyoming",
+}
+
+# "HHS Region" column of the CDC Wonder exports
+HHS_LABELS = (
+    "HHS Region #1  CT, ME, MA, NH, RI, VT",
+    "HHS Region #2  NJ, NY",
+    "HHS Region #3  DE, DC, MD, PA, VA, WV",
+    "HHS Region #4  AL, FL, GA, KY, MS, NC, SC, TN",
+    "HHS Region #5  IL, IN, MI, MN, OH, WI",
+    "HHS Region #6  AR, LA, NM, OK, TX",
+    "HHS Region #7  IA, KS, MO, NE",
+    "HHS Region #8  CO, MT, ND, SD, UT, WY",
+    "HHS Region #9  AZ, CA, HI, NV",
+    "HHS Region #10  AK, ID, OR, WA",
+)
+
+
+def parse_hhs_label(label: str) -> Tuple[str, Tuple[str, ...]]:
+    """Code and states of an HHS region.
+
+    Example:
+        "HHS Region #2  NJ, NY" -> ("HHS2", ("New Jersey", "New York"))
+
+    Args:
+        label (str): HHS region of CDC Wonder
+
+    Raises:
+        ValueError: not an HHS region, or unknown postal code
+
+    Returns:
+        Tuple[str, Tuple[str, ...]]: code (as in "HHS Region Code") and
+            names of the states
+    """
+    match = re.fullmatch(r"HHS Region #(\d+)\s+(.*)", label.strip())
+    if match is None:
+        raise ValueError(f"can not parse the HHS region {label!r}")
+    codes = [code.strip() for code in match.group(2).split(",")]
+    unknown = [code for code in codes if code not in STATE_NAMES]
+    if unknown:
+        raise ValueError(f"unknown states {unknown} in {label!r}")
+    return f"HHS{match.group(1)}", tuple(STATE_NAMES[code] for code in codes)
+
+
+class Geography:
+    """Hierarchy state -> HHS region -> nation.
+
+    Example:
+        GEOGRAPHY.ancestor(df.state, "state", "hhs")  # "Alaska" -> "HHS10"
+        GEOGRAPHY.rollups(df, "state", ["year", "icd"], ["deaths"])
+        -> {"hhs": deaths by region, "nation": national deaths}
+    """
+
+    def __init__(self, regions: Dict[str, Tuple[str, ...]], nation: str = NATION):
+        """
+        Args:
+            regions (Dict[str, Tuple[str, ...]]): region -> its states
+            nation (str, optional): name of the nation. Defaults to NATION.
+        """
+        self.regions = regions
+        self.nation = nation
+        # level -> (value -> value of the next level)
+        self.parents = {
+            "state": {state: region for region, states in regions.items()
+                      for state in states},
+            "hhs": {region: nation for region in regions},
+        }
+
+    @classmethod
+    def from_labels(cls, labels: Iterable[str], nation: str = NATION) -> "Geography":
+        """Hierarchy of HHS region labels, see parse_hhs_label."""
+        return cls(dict(map(parse_hhs_label, labels)), nation)
+
+    def ancestor(self, values: pd.Series, level: str, to: str) -> pd.Series:
+        """Values of a coarser level (NaN if unknown).
+
+        Args:
+            values (pd.Series): values of level
+            level (str): "state" or "hhs"
+            to (str): coarser level, "hhs" or "nation"
+
+        Returns:
+            pd.Series: values of to
+        """
+        for step in LEVELS[LEVELS.index(level): LEVELS.index(to)]:
+            values = values.map(self.parents[step])
+        return values
+
+    def rollups(
+        self,
+        df: pd.DataFrame,
+        level: str,
+        keys: List[str],
+        additive: List[str],
+    ) -> Dict[str, pd.DataFrame]:
+        """Sums at every level coarser than level, each computed from the
+        previous one (states -> regions -> nation).
+
+        Args:
+            df (pd.DataFrame): data with a level column
+            level (str): level of df ("state" or "hhs")
+            keys (List[str]): other columns identifying a row (year ...)
+            additive (List[str]): summed columns (deaths, population ...)
+
+        Returns:
+            Dict[str, pd.DataFrame]: level -> level, keys and additive
+                columns (missing if a child is, e.g. a suppressed state
+                or a state left out of the export), rows of unknown
+                states or regions are left out
+        """
+        res = dict()
+        for parent in LEVELS[LEVELS.index(level) + 1:]:
+            # number of children of every parent (e.g. 8 states in HHS4)
+            n_children = pd.Series(self.parents[level]).value_counts()
+            grouped = (
+                df.assign(**{parent: self.ancestor(df[level], level, parent)})
+                .dropna(subset=[parent])
+                .groupby([parent] + keys, sort=False, dropna=False)
+            )
+            complete = grouped[additive].count().eq(grouped.size(), axis=0)
+            present = grouped[level].nunique()
+            complete[present.to_numpy() < n_children.reindex(
+                present.index.get_level_values(0)).to_numpy()] = False
+            df = (
+                grouped[additive].sum()
+                .where(complete)
+                .reset_index()
+            )
+            res[parent] = df
+            level = parent
+        return res
+
+
+GEOGRAPHY = Geography.from_labels(HHS_LABELS)
+STATE_TO_HHS: Dict[str, str] = GEOGRAPHY.parents["state"]
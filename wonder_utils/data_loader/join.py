@@ -0,0 +1,73 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+def key_dictionaries(
+    frames: List[pd.DataFrame], keys: List[str]
+) -> Dict[str, pd.Index]:
+    """Sorted labels of each key column, over all the frames to join.
+
+    Args:
+        frames (List[pd.DataFrame]): dataframes sharing the key columns
+        keys (List[str]): key columns
+
+    Returns:
+        Dict[str, pd.Index]: key column -> labels, the code of a label
+            is its position
+    """
+    return {
+        key: pd.Index(
+            pd.unique(np.concatenate([df[key].dropna().astype(str).to_numpy()
+                                      for df in frames]))
+        ).sort_values()
+        for key in keys
+    }
+
+
+def encode(
+    df: pd.DataFrame, keys: List[str], dictionaries: Dict[str, pd.Index]
+) -> np.ndarray:
+    """Integer code of the keys of every row: the codes of the columns
+    are combined into a single int64 (mixed radix).
+
+    Args:
+        df (pd.DataFrame): rows to encode
+        keys (List[str]): key columns
+        dictionaries (Dict[str, pd.Index]): see key_dictionaries
+
+    Returns:
+        np.ndarray: one code per row, -1 if a label is missing or unknown
+    """
+    codes = np.zeros(len(df), dtype=np.int64)
+    unknown = np.zeros(len(df), dtype=bool)
+    for key in keys:
+        labels = dictionaries[key]
+        column = df[key].astype(str).where(df[key].notna())
+        code = labels.get_indexer(column)
+        unknown |= code < 0
+        codes = codes * len(labels) + code
+    codes[unknown] = -1
+    return codes
+
+
+def sort_merge(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Many-to-one join of integer codes: the right codes are sorted once
+    and every left code is found by binary search.
+
+    Args:
+        left (np.ndarray): codes of the left rows
+        right (np.ndarray): unique codes of the right rows
+
+    Returns:
+        np.ndarray: position of the matching right row of every left
+            row, -1 without match
+    """
+    if not len(right):
+        return np.full(len(left), -1)
+    order = np.argsort(right, kind="stable")
+    sorted_right = right[order]
+    pos = np.minimum(np.searchsorted(sorted_right, left), len(right) - 1)
+    found = (left >= 0) & (sorted_right[pos] == left)
+    return np.where(found, order[pos], -1)
@@ -0,0 +1,223 @@
+from itertools import combinations
+from typing import Any, Dict, List
+import os
+
+import numpy as np
+import pandas as pd
+
+from ..stats.age_adjustment import parse_ages
+from .age_strata import interval_label
+from .cdc_wonder import RECODES, read_export
+from .geography import LEVELS, NATION
+from .join import key_dictionaries, encode, sort_merge
+
+
+# keys of the denominator index
+KEYS = ("year", "age_strat", "race", "ethnicity", "geography")
+# dimensions of the exports summed into the "All" margins
+DIMENSIONS = ("race", "ethnicity")
+# value of a dimension summed over
+ALL = "All"
+
+
+def age_strat_label(labels: List[str]) -> str:
+    """age_strat of contiguous CDC Wonder age groups.
+
+    Example:
+        ["10-14 years", "15-19 years"] -> "10-19", [] -> "Overall"
+
+    Args:
+        labels (List[str]): age groups, see parse_ages
+
+    Raises:
+        ValueError: the age groups leave a gap
+
+    Returns:
+        str: age_strat, as in the file names of SuicideData
+    """
+    bounds = sorted(parse_ages(label) for label in labels)
+    if not bounds:
+        return "Overall"
+    for (_, hi), (lo, _) in zip(bounds, bounds[1:]):
+        if lo != hi + 1:
+            raise ValueError(f"age groups {labels} are not contiguous")
+    lo, hi = bounds[0][0], bounds[-1][1]
+    return "Overall" if lo == 0 and np.isinf(hi) else interval_label(lo, hi)
+
+
+class PopulationData:
+    """Bridged-race population estimates of CDC Wonder, as a denominator
+    index keyed by (year, age_strat, race, ethnicity, geography).
+
+    Every export is one age_strat (its "Age Group" parameter) grouped by
+    race and/or ethnicity. The dimensions an export is not grouped by are
+    "All", and the missing margins are summed from the finer rows (e.g.
+    All races from Race_Eth_Pop_2020.txt): exported rows are kept first.
+
+    The keys are encoded once into integer codes, then any dataframe
+    sharing the keys is joined by a sort-merge:
+        pop = PopulationData()
+        pop.lookup(df)  # population of every row of df
+        sd.join_population(pop)  # fills the population of merge
+    """
+
+    KEYS = KEYS
+
+    def __init__(
+        self,
+        data_folder: str = "Data/Population data",
+        identifier: str = "Pop",
+        geography: str = NATION,
+    ) -> None:
+        """
+        Args:
+            data_folder (str, optional): where the exports are stored.
+                Defaults to "Data/Population data".
+            identifier (str, optional): used to identify which files
+                should be processed. Defaults to "Pop".
+            geography (str, optional): area of the exports without a
+                geographic column. Defaults to NATION.
+        """
+        self.data_folder = data_folder
+        self.geography = geography
+        self.data = self.load_data(identifier=identifier, data_folder=data_folder)
+        self.dictionaries = key_dictionaries([self.data], list(KEYS))
+        self.codes = encode(self.data, list(KEYS), self.dictionaries)
+        self.index = self.data.set_index(list(KEYS)).sort_index().population
+
+    def file_to_dataframe(
+        self,
+        data_folder: str,
+        file: str,
+        rename_mapper: Dict[str, str] = {
+            "Race": "race",
+            "Single Race 6": "race",
+            "Ethnicity": "ethnicity",
+            "Hispanic Origin": "ethnicity",
+            "Yearly July 1st Estimates": "year",
+            "Year": "year",
+            "Age Group": "age_strat",
+            "Five-Year Age Groups": "age_strat",
+            "Ten-Year Age Groups": "age_strat",
+            "State": "geography",
+            "HHS Region Code": "geography",
+            "Population": "population",
+        },
+    ) -> pd.DataFrame:
+        """CDC Wonder txt export into dataframe, one column per key.
+
+        Args:
+            data_folder (str): where the data files are stored
+            file (str): file that we want to process
+            rename_mapper (Dict[str, str], optional): dictionnary to
+                rename the columns.
+
+        Returns:
+            pd.DataFrame: keys and population
+        """
+        # the total lines are summed again with the margins
+        table, parameters = read_export(f"{data_folder}/{file}", skip_totals=True)
+        res = table.rename(columns=rename_mapper)
+        if "age_strat" in res:
+            res["age_strat"] = res.age_strat.map(lambda label: age_strat_label([label]))
+        else:
+            res["age_strat"] = age_strat_label(
+                [label for label in parameters.get("Age Group", "").split(";") if label.strip()]
+            )
+        if "year" not in res:
+            res["year"] = parameters.get("Yearly July 1st Estimates")
+        res["year"] = res.year.str.extract(r"(\d+)", expand=False)
+        if "geography" not in res:
+            res["geography"] = self.geography
+        for col in DIMENSIONS:
+            if col not in res:
+                res[col] = ALL
+        res = res.replace(RECODES)
+        res["population"] = pd.to_numeric(res.population, errors="coerce")
+        # several labels may have the same recode (e.g. Asian -> API)
+        return res.groupby(list(KEYS), sort=False).population.sum(min_count=1).reset_index()
+
+    def load_data(
+        self, identifier: str = "Pop", data_folder: str = "Data/Population data"
+    ) -> pd.DataFrame:
+        """Load all files containing identifier, with the margins over
+        race and ethnicity.
+
+        Args:
+            identifier (str, optional): used to identify which files
+                should be processed. Defaults to "Pop".
+            data_folder (str, optional): where the exports are stored.
+
+        Returns:
+            pd.DataFrame: one row per key, exported rows first
+        """
+        raw_data = sorted(file for file in os.listdir(data_folder) if identifier in file)
+        exported = pd.concat(
+            [self.file_to_dataframe(data_folder, file) for file in raw_data]
+            or [pd.DataFrame(columns=[*KEYS, "population"])],
+            ignore_index=True,
+        )
+
+        # sum over every subset of the dimensions, from the rows where
+        # they are not already summed
+        margins = []
+        for n in range(1, len(DIMENSIONS) + 1):
+            for summed in combinations(DIMENSIONS, n):
+                rows = exported.loc[(exported[list(summed)] != ALL).all(axis=1)]
+                margins.append(
+                    rows.assign(**{col: ALL for col in summed})
+                    .groupby(list(KEYS), sort=False)
+                    .population.sum(min_count=1)
+                    .reset_index()
+                )
+        return (
+            pd.concat([exported, *margins], ignore_index=True)
+            .drop_duplicates(subset=list(KEYS), keep="first")
+            .reset_index(drop=True)
+        )
+
+    def key_frame(
+        self, df: pd.DataFrame, defaults: Dict[str, Any] = dict()
+    ) -> pd.DataFrame:
+        """Keys of the rows of df: the geographic column (state, hhs or
+        nation) is the geography, missing keys are taken from defaults
+        or summed over (age_strat "Overall", the whole geography, "All"
+        otherwise).
+
+        Args:
+            df (pd.DataFrame): rows to look up
+            defaults (Dict[str, Any], optional): value of the keys df
+                does not have. Defaults to dict().
+
+        Returns:
+            pd.DataFrame: one column per key, same index as df
+        """
+        level = next((col for col in LEVELS if col in df), None)
+        columns = {}
+        for key in KEYS:
+            if key in df:
+                columns[key] = df[key]
+            elif key == "geography" and level is not None:
+                columns[key] = df[level]
+            else:
+                default = {"age_strat": "Overall", "geography": self.geography}.get(key, ALL)
+                columns[key] = defaults.get(key, default)
+        return pd.DataFrame(columns, index=df.index)
+
+    def lookup(
+        self, df: pd.DataFrame, defaults: Dict[str, Any] = dict()
+    ) -> np.ndarray:
+        """Population of every row of df, joined on the integer codes of
+        the keys (see key_frame).
+
+        Args:
+            df (pd.DataFrame): rows to look up
+            defaults (Dict[str, Any], optional): see key_frame.
+
+        Returns:
+            np.ndarray: population, NaN without estimate
+        """
+        left = encode(self.key_frame(df, defaults), list(KEYS), self.dictionaries)
+        pos = sort_merge(left, self.codes)
+        # position -1 is the appended NaN
+        return np.append(self.data.population.to_numpy(dtype=float), np.nan)[pos]
@@ -0,0 +1,167 @@
+from itertools import combinations
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..stats.age_adjustment import parse_ages
+from .join import key_dictionaries, encode, sort_merge
+
+
+# counts checked for negative values and additive identities
+COUNTS = ("deaths", "population")
+# columns of the report
+REPORT_COLUMNS = ["check", "target", "checked", "failed", "example"]
+
+
+def partitions(labels: List[str]) -> List[Tuple[str, Tuple[str, ...]]]:
+    """Additive identities between the age strata: every way to tile a
+    stratum with other disjoint strata.
+
+    Example:
+        ["20-64", "20plus", "25-64", "25plus", "65plus"]
+        -> [("20plus", ("20-64", "65plus")), ("25plus", ("25-64", "65plus"))]
+
+    Args:
+        labels (List[str]): age strata, see parse_ages
+
+    Returns:
+        List[Tuple[str, Tuple[str, ...]]]: union and its parts
+    """
+    bounds = {label: parse_ages(label) for label in labels}
+    res = []
+    for union, (lo, hi) in bounds.items():
+        others = [label for label in labels if label != union
+                  and lo <= bounds[label][0] and bounds[label][1] <= hi]
+        for n in range(2, len(others) + 1):
+            for parts in combinations(sorted(others, key=bounds.get), n):
+                edges = [bounds[part] for part in parts]
+                if edges[0][0] == lo and edges[-1][1] == hi and all(
+                    b[0] == a[1] + 1 for a, b in zip(edges, edges[1:])
+                ):
+                    res.append((union, parts))
+    return res
+
+
+def validate(
+    exports: Dict[Tuple[str, str], pd.DataFrame],
+    keys: List[str],
+    counts: Tuple[str, ...] = COUNTS,
+    period_column: str = "year",
+) -> pd.DataFrame:
+    """Consistency of the exports of CDC Wonder, checked at once for
+    every stratum: the keys of every row are encoded into integer codes
+    once, then each check is a grouped comparison of arrays.
+
+    Checks:
+        unique_keys: one row per cell in each age stratum
+        non_negative: no negative count
+        additive: union = sum of its parts (e.g. 20plus = 20-64 +
+            65plus), for the cells exported with known counts in the
+            union and every part (suppressed rows are hidden, a collapsed
+            cell with suppressed_rows is a lower bound)
+        period_overlap: a year is exported by one period only
+
+    Example:
+        report = validate({("20plus", "2010-2011"): df, ...}, keys)
+        report.loc[report.failed > 0]
+
+    Args:
+        exports (Dict[Tuple[str, str], pd.DataFrame]): (age_strat,
+            period) -> processed export
+        keys (List[str]): columns identifying a cell (without age_strat)
+        counts (Tuple[str, ...], optional): additive columns.
+            Defaults to COUNTS.
+        period_column (str, optional): column of the years.
+            Defaults to "year".
+
+    Returns:
+        pd.DataFrame: one row per check and target (age stratum,
+            identity or column), with the number of checked and failed
+            cells and an example of failure
+    """
+    items = sorted(exports.items(), key=lambda item: item[0])
+    labels = sorted({age_strat for (age_strat, _), _ in items})
+    data_ = pd.concat([df for _, df in items], ignore_index=True)
+    sizes = [len(df) for _, df in items]
+    # age stratum (position in labels) and period of every row
+    label_of = np.repeat([labels.index(age_strat) for (age_strat, _), _ in items], sizes)
+    period_of = np.repeat([period for (_, period), _ in items], sizes)
+    code = encode(data_, keys, key_dictionaries([data_], keys))
+    values = {col: data_[col].to_numpy(dtype=float) for col in counts if col in data_}
+    # counts of the additive check, lower bounds left out
+    exact = {
+        col: np.where(data_.suppressed_rows.to_numpy() > 0, np.nan, value)
+        if "suppressed_rows" in data_ else value
+        for col, value in values.items()
+    }
+    rows = {label: np.flatnonzero(label_of == i) for i, label in enumerate(labels)}
+    n_rows = np.bincount(label_of, minlength=len(labels))
+
+    def example(failed: np.ndarray) -> List[str]:
+        """Keys of the first failed row of every age stratum."""
+        first = pd.Series(np.flatnonzero(failed)).groupby(label_of[failed]).first()
+        res = [""] * len(labels)
+        for i, row in first.items():
+            res[i] = ", ".join(map(str, data_[keys].iloc[row]))
+        return res
+
+    report = []
+    # a cell twice in an age stratum (or a missing key)
+    duplicated = (
+        pd.Series(label_of * (code.max() + 2) + code).duplicated(keep=False).to_numpy()
+        | (code < 0)
+    )
+    failed = np.bincount(label_of, weights=duplicated, minlength=len(labels))
+    examples = example(duplicated)
+    report += [("unique_keys", label, n_rows[i], int(failed[i]), examples[i])
+               for i, label in enumerate(labels)]
+    for col, value in values.items():
+        negative = value < 0
+        failed = np.bincount(label_of, weights=negative, minlength=len(labels))
+        examples = example(negative)
+        report += [("non_negative", f"{label} {col}", n_rows[i], int(failed[i]), examples[i])
+                   for i, label in enumerate(labels)]
+
+    for union, parts in partitions(labels):
+        right = code[rows[union]]
+        n_cells = len(right)
+        # number of parts and sums of the parts of every cell of the union
+        found = np.zeros(n_cells)
+        sums = {col: np.zeros(n_cells) for col in exact}
+        for part in parts:
+            pos = sort_merge(code[rows[part]], right)
+            matched = pos >= 0
+            found += np.bincount(pos[matched], minlength=n_cells)
+            for col, value in exact.items():
+                sums[col] += np.bincount(pos[matched], weights=value[rows[part]][matched],
+                                         minlength=n_cells)
+        # a missing count (e.g. suppressed) in the union or a part is not
+        # checked
+        complete = found == len(parts)
+        for col, value in exact.items():
+            complete &= ~np.isnan(sums[col]) & ~np.isnan(value[rows[union]])
+        failed = np.zeros(n_cells, dtype=bool)
+        for col, value in exact.items():
+            failed |= complete & ~np.isclose(sums[col], value[rows[union]], rtol=0, atol=0.5)
+        first = np.flatnonzero(failed)[:1]
+        report.append((
+            "additive", f"{union} = {' + '.join(parts)}", int(complete.sum()), int(failed.sum()),
+            ", ".join(map(str, data_[keys].iloc[rows[union][first[0]]])) if len(first) else "",
+        ))
+
+    # periods of every year, by age stratum
+    periods = (
+        pd.DataFrame({"label": label_of, "year": data_[period_column].to_numpy(),
+                      "period": period_of})
+        .drop_duplicates()
+        .groupby(["label", "year"])
+        .period.size()
+    )
+    for i, label in enumerate(labels):
+        by_year = periods.loc[i] if i in periods.index.get_level_values(0) else periods.iloc[:0]
+        shared = by_year.index[by_year > 1]
+        report.append(("period_overlap", label, len(by_year), len(shared),
+                       ", ".join(map(str, shared[:1]))))
+
+    return pd.DataFrame(report, columns=REPORT_COLUMNS)
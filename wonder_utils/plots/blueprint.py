@@ -1,14 +1,108 @@
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any, Tuple, Union
 from plotly.subplots import make_subplots
 import plotly.graph_objects as go
 
 import pandas as pd
 import numpy as np
+import atexit
 import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 
 import abc
 from abc import ABC, abstractmethod
 
+from .export import export_figure
+from ..stats.intervals import PROPORTION_INTERVALS, rate_interval
+from ..stats.trends import trend_tests
+from ..stats.disparity import disparities
+from ..stats.smoothing import eb_rates
+from ..stats.nowcast import completeness_ratios, nowcast
+from ..data_loader.join import key_dictionaries, encode, sort_merge
+from ..data_loader.geography import GEOGRAPHY, LEVELS
+
+
+# summed by the geographic rollups, other numeric columns (rates) are NaN
+ADDITIVE_COLUMNS = ("deaths", "population", "eb_deaths", "deaths_nowcast")
+
+PALETTE = (
+    "#636EFA",
+    "#EF553B",
+    "#00CC96",
+    "#AB63FA",
+    "#FFA15A",
+    "#19D3F3",
+    "#FF6692",
+    "#B6E880",
+    "#FF97FF",
+    "#FECB52",
+)
+
+
+def rgba(hex_color: str, alpha: float) -> str:
+    """"#636EFA" -> "rgba(99,110,250,alpha)"."""
+    r, g, b = (int(hex_color[i: i + 2], 16) for i in (1, 3, 5))
+    return f"rgba({r},{g},{b},{alpha})"
+
+
+# background exports of plot(..., async_save=True), shared by all ploters
+EXPORT_EXECUTOR = None
+PENDING_EXPORTS: List[Future] = []
+EXPORT_LOCK = threading.Lock()
+
+
+def export_executor() -> ThreadPoolExecutor:
+    """Executor for the background exports, created on first use.
+    The image exporter handles one figure at a time, one thread is enough.
+    """
+    global EXPORT_EXECUTOR
+    with EXPORT_LOCK:
+        if EXPORT_EXECUTOR is None:
+            EXPORT_EXECUTOR = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="plot_export"
+            )
+            # never lose an export when the notebook/script ends
+            atexit.register(wait_for_exports)
+    return EXPORT_EXECUTOR
+
+
+def wait_for_exports(timeout: float = None) -> List[str]:
+    """Barrier: wait for every pending background export.
+    Run it at the end of a notebook using async_save.
+
+    Args:
+        timeout (float, optional): maximum number of seconds to wait.
+            Defaults to None (no limit).
+
+    Raises:
+        RuntimeError: an export failed (from its exception), once every
+            finished export is collected; the message lists the files
+            written by the others
+
+    Returns:
+        List[str]: files written since the last call
+    """
+    with EXPORT_LOCK:
+        pending = list(PENDING_EXPORTS)
+    done, not_done = wait(pending, timeout=timeout)
+    with EXPORT_LOCK:
+        for future in done:
+            PENDING_EXPORTS.remove(future)
+    # in submission order
+    files, errors = [], []
+    for future in pending:
+        if future not in done:
+            continue
+        if future.exception() is not None:
+            errors.append(future.exception())
+        else:
+            files += future.result()
+    if errors:
+        raise RuntimeError(
+            f"{len(errors)} background export(s) failed, files written: {files}"
+        ) from errors[0]
+    return files
+
 
 class DataPloter(ABC):
     """BluePrint for ploter class.
@@ -37,6 +131,38 @@ class DataPloter(ABC):
         # will be cached
         self.data = self.load_data(drop_cols=drop_cols, data_folder=data_folder)
         self.processed_data = dict()
+        # figures with the subplots and styling, by grid shape
+        self.skeletons = dict()
+        # category -> color, by set of categories
+        self.color_maps = dict()
+        # confidence intervals computed by merge ({y}_low and {y}_high)
+        self.confidence_level = 0.95
+        self.proportion_interval = "wilson"  # or "clopper-pearson"
+        # deaths of other datasets joined on shared keys
+        # (see join_denominator), name -> keys, dictionaries and cells
+        self.joined = dict()
+        # denominators of the strata without population (see
+        # join_population), None to disable
+        self.population = None
+        # completeness of the provisional counts (see learn_completeness),
+        # strata, ratios and pooled ratio, None to disable
+        self.completeness = None
+        # sparse cube of the cells with suppression flags (see CellStore),
+        # None to disable
+        self.cells = None
+        # rates of the regions are smoothed toward the national rate
+        # (suicide_per_100k_eb), None to disable
+        self.smoothing_region = "hhs" if "hhs" in indexer_columns else None
+        # sums at the coarser geographic levels (e.g. state -> hhs ->
+        # nation), level -> dataframe, see materialize_rollups
+        self.geography = GEOGRAPHY
+        self.geography_column = next(
+            (col for col in indexer_columns if col in LEVELS), None
+        )
+        self.rollups = dict()
+        if self.smoothing_region is not None:
+            self.smooth_rates()
+        self.materialize_rollups()
 
     @abc.abstractproperty
     def load_data(
@@ -47,39 +173,131 @@ class DataPloter(ABC):
         """
         pass
 
-    def relabel_fig(self, fig):
-        color = [
-            "#636EFA",
-            "#EF553B",
-            "#00CC96",
-            "#AB63FA",
-            "#FFA15A",
-            "#19D3F3",
-            "#FF6692",
-            "#B6E880",
-            "#FF97FF",
-            "#FECB52",
-        ] * 10
-        label_color = dict()
-
-        def f(trace):
-            next_color = label_color.get(trace.name, None)
-            if not next_color:
-                next_color = color.pop(0)
-                label_color[trace.name] = next_color
-                trace.line.color = next_color
+    def color_map(self, categories: Iterable[Any]) -> Dict[str, str]:
+        """Stable colors for a set of categories, computed once per set.
 
-            else:
-                trace.line.color = next_color
-                return trace.update(showlegend=False)
-            return trace.update()
+        Args:
+            categories (Iterable[Any]): values of the color column
+
+        Returns:
+            Dict[str, str]: category (as a string) -> color
+        """
+        key = tuple(sorted(set(map(str, categories))))
+        if key not in self.color_maps:
+            self.color_maps[key] = {
+                c: PALETTE[i % len(PALETTE)] for i, c in enumerate(key)
+            }
+        return self.color_maps[key]
+
+    def figure_skeleton(
+        self,
+        rows: int,
+        cols: int,
+        secondary_y: bool,
+        subplot_titles: tuple,
+    ) -> Dict[str, Any]:
+        """Figure with the subplots and the axis styling, without data.
+        Built once per grid shape, plots copy it and only add the traces.
 
-        label_color = dict()
-        fig.for_each_trace(f)
+        Args:
+            rows (int): number of rows
+            cols (int): number of columns
+            secondary_y (bool): add a secondary y-axis to every subplot
+            subplot_titles (tuple): titles of the subplots
+
+        Returns:
+            Dict[str, Any]: "figure", the names of the "primary_axes",
+                "secondary_axes" and "range_axes" (primary axes in the
+                order used by the range_dic argument of plot)
+        """
+        key = (rows, cols, secondary_y, subplot_titles)
+        if key in self.skeletons:
+            return self.skeletons[key]
+
+        specs = (
+            [[{"secondary_y": True} for _ in range(cols)] for _ in range(rows)]
+            if secondary_y
+            else None
+        )
+        fig = make_subplots(
+            rows=rows,
+            cols=cols,
+            subplot_titles=subplot_titles,
+            specs=specs,
+        )
+        fig.update_layout(
+            height=500 * rows,
+            width=700 * cols,
+            plot_bgcolor="rgb(255,255,255)",
+            legend={"x": 1.15},
+        )
+        axis_style = dict(
+            showline=True,
+            linewidth=0.1,
+            linecolor="black",
+            gridwidth=0.1,
+            gridcolor="grey",
+        )
+        fig.update_xaxes(tickangle=-45, **axis_style)
+        fig.update_yaxes(secondary_y=False, **axis_style)
+        if secondary_y:
+            fig.update_yaxes(secondary_y=True, **axis_style)
+
+        # secondary y-axis are the one with the overlaying keyword
+        y_axis_list = [
+            key for key in fig.layout.to_plotly_json() if key.startswith("yaxis")
+        ]
+        primary_axes = [key for key in y_axis_list
+                        if not fig.layout[key].overlaying]
+        self.skeletons[key] = {
+            "figure": fig,
+            "primary_axes": primary_axes,
+            "secondary_axes": [key for key in y_axis_list
+                               if fig.layout[key].overlaying],
+            "range_axes": sorted(primary_axes),
+        }
+        return self.skeletons[key]
+
+    def materialize_rollups(self) -> None:
+        """Sum the data at every geographic level coarser than the one of
+        the data (e.g. hhs -> nation), once: select_data, merge and plot
+        read them with level="nation" instead of summing the regions.
+        """
+        level = self.geography_column
+        if level is None or not self.data:
+            self.rollups = dict()
+            return
+        data_ = pd.concat(self.data.values())
+        keys = [col for col in self.indexer_columns if col != level]
+        if "age_strat" in data_ and "age_strat" not in keys:
+            keys.append("age_strat")
+        additive = [col for col in ADDITIVE_COLUMNS if col in data_]
+        # non additive values (e.g. age_adjusted_rate) are not rolled up
+        rates = {
+            col: np.nan for col in data_.select_dtypes("number")
+            if col not in additive and col not in keys
+        }
+        self.rollups = {
+            parent: df.assign(**rates)
+            for parent, df in self.geography.rollups(data_, level, keys, additive).items()
+        }
+        # merged data are computed again
+        self.processed_data.clear()
+
+    def level_indexer(self, level: str = None) -> List[str]:
+        """indexer_columns of a geographic level (e.g. "nation" instead of
+        "hhs"), see materialize_rollups."""
+        if level is None or level == self.geography_column:
+            return self.indexer_columns
+        if level not in self.rollups:
+            raise KeyError(f"no rollup at level {level!r}, available: {list(self.rollups)}")
+        return [level if col == self.geography_column else col
+                for col in self.indexer_columns]
 
     def select_data(
         self,
         data_slice: Dict[str, Any] = dict(),
+        level: str = None,
     ) -> pd.DataFrame:
         """Will merge and select data from the data attribute.
         User can perform a request with dictionnaries and slice.
@@ -87,6 +305,9 @@ class DataPloter(ABC):
         Args:
             data_slice (Dict[str, Any], optional): slice to filter
                 the dataframe. Defaults to dict().
+            level (str, optional): coarser geographic level (e.g. "hhs" or
+                "nation"), read from the materialized rollups.
+                Defaults to None (level of the data).
 
         Returns:
             pd.DataFrame: merge and filtered dataframe
@@ -99,14 +320,19 @@ class DataPloter(ABC):
         Will take hhs1,hhs2,hhs3 and hss4 for 20-64 age stratification.
         """
 
-        loc_request = [slice(None)] * len(self.indexer_columns)
+        indexer_columns = self.level_indexer(level)
+        loc_request = [slice(None)] * len(indexer_columns)
         for k, v in data_slice.items():
-            loc_request[self.indexer_columns.index(k)] = v
+            loc_request[indexer_columns.index(k)] = v
 
+        data_ = (
+            self.data.values() if indexer_columns is self.indexer_columns
+            else [self.rollups[level]]
+        )
         return (
-            pd.concat(self.data.values())
+            pd.concat(data_)
             .reset_index(drop=True)
-            .set_index(self.indexer_columns)
+            .set_index(indexer_columns)
             .sort_index()
             .loc[tuple(loc_request), :]
             .reset_index()
@@ -124,6 +350,289 @@ class DataPloter(ABC):
         """
         return df.loc[(slice(None), slice(None), subpop)].sort_index().reset_index()
 
+    def merge_key(
+        self,
+        x: str,
+        color: str,
+        by: str,
+        data_slice: Dict[str, Any],
+        level: str = None,
+    ) -> tuple:
+        """Hashable key identifying a merge request, independent of
+        the order of the data_slice dictionnary.
+
+        Args:
+            x (str): filter on x-axis
+            color (str): filter for different plots
+            by (str): filter for multiple subplots
+            data_slice (Dict[str, Any]): restriction on the initial dataset
+            level (str, optional): geographic level. Defaults to None.
+
+        Returns:
+            tuple: key used to cache the merged dataframes
+        """
+
+        def freeze(v: Any) -> Any:
+            if isinstance(v, slice):
+                return ("slice", v.start, v.stop, v.step)
+            if isinstance(v, (list, tuple)):
+                return tuple(map(freeze, v))
+            return v
+
+        return (
+            x,
+            color,
+            by,
+            tuple(sorted((k, freeze(v)) for k, v in data_slice.items())),
+            level,
+        )
+
+    def smooth_rates(self) -> None:
+        """Add eb_deaths to the data: the population times the
+        empirical-Bayes rate of the row, shrunk toward the rate of the
+        same row without region (e.g. the national rate of the same race,
+        gender, year and age_strat, see eb_rates). Summed by merge into
+        suicide_per_100k_eb, a steadier rate for the small cells.
+        """
+        region = self.smoothing_region
+        for df in self.data.values():
+            parent = [col for col in self.indexer_columns
+                      if col != region and col in df]
+            rates, _ = eb_rates(
+                df.deaths, df.population, [df[col] for col in parent]
+            )
+            df["eb_deaths"] = rates * df.population.to_numpy(dtype=float)
+        if self.rollups:
+            self.materialize_rollups()
+        # merged data are computed again
+        self.processed_data.clear()
+
+    def learn_completeness(
+        self,
+        previous: Dict[str, pd.DataFrame],
+        strata: List[str] = None,
+        min_deaths: float = 20,
+    ) -> None:
+        """Learn the completeness of the provisional counts from an older
+        load of the same exports (e.g. the data of
+        SuicideData(data_folder="Data/Old")): the cells provisional then
+        and final now are paired by a sort-merge on their keys, then the
+        ratios are computed for every stratum at once (see
+        completeness_ratios). Adds deaths_nowcast to the data, summed by
+        merge into deaths_nowcast and suicide_per_100k_nowcast.
+
+        Args:
+            previous (Dict[str, pd.DataFrame]): data of the older load,
+                with a provisional column
+            strata (List[str], optional): keys of the ratios.
+                Defaults to None (the indexer columns without year and
+                the geographic column).
+            min_deaths (float, optional): see completeness_ratios.
+                Defaults to 20.
+
+        Raises:
+            ValueError: no cell was provisional then and final now
+        """
+        pairs = []
+        for label, df in self.data.items():
+            if label not in previous or "provisional" not in df:
+                continue
+            old = previous[label]
+            old = old.loc[old.provisional.astype(bool)]
+            new = df.loc[~df.provisional.astype(bool)]
+            keys = [col for col in self.indexer_columns if col in new and col in old]
+            dictionaries = key_dictionaries([old, new], keys)
+            pos = sort_merge(encode(old, keys, dictionaries),
+                             encode(new, keys, dictionaries))
+            matched = pos >= 0
+            pairs.append(old.loc[matched, keys].assign(
+                provisional_deaths=old.deaths.to_numpy(dtype=float)[matched],
+                final_deaths=new.deaths.to_numpy(dtype=float)[pos[matched]],
+            ))
+        if not pairs or not sum(map(len, pairs)):
+            raise ValueError("no cell was provisional then and final now")
+        pairs = pd.concat(pairs, ignore_index=True)
+
+        if strata is None:
+            strata = [col for col in self.indexer_columns if col in pairs
+                      and col not in ("year", self.geography_column)]
+        ratios, pooled = completeness_ratios(
+            pairs.provisional_deaths, pairs.final_deaths,
+            [pairs[col] for col in strata], min_deaths=min_deaths,
+        )
+        self.completeness = {
+            "strata": list(strata),
+            "ratios": pairs[strata].assign(ratio=ratios).drop_duplicates(subset=strata),
+            "pooled": pooled,
+        }
+        self.nowcast_deaths()
+
+    def nowcast_deaths(self) -> None:
+        """Add deaths_nowcast to the data: the provisional deaths divided
+        by the completeness ratio of their stratum (the pooled ratio for
+        the strata not learned), see learn_completeness.
+        """
+        strata = self.completeness["strata"]
+        ratios = self.completeness["ratios"]
+        for df in self.data.values():
+            provisional = (df.provisional.astype(bool) if "provisional" in df
+                           else np.zeros(len(df), dtype=bool))
+            dictionaries = key_dictionaries([ratios, df], strata)
+            pos = sort_merge(encode(df, strata, dictionaries),
+                             encode(ratios, strata, dictionaries))
+            # position -1 is the appended pooled ratio
+            ratio = np.append(ratios.ratio.to_numpy(), self.completeness["pooled"])[pos]
+            df["deaths_nowcast"] = nowcast(df.deaths, provisional, ratio)
+        if self.rollups:
+            self.materialize_rollups()
+        # merged data are computed again
+        self.processed_data.clear()
+
+    def join_denominator(
+        self, name: str, denominators: pd.DataFrame, keys: List[str]
+    ) -> None:
+        """Join the deaths of another dataset on keys shared with the data
+        (e.g. all the deaths from external causes by year, hhs and
+        age_strat), for suicide_share_{name} in merge. The key
+        dictionaries are built once, over both datasets; merge encodes
+        its groups with them and joins the cells by a sort-merge on the
+        integer codes.
+
+        Args:
+            name (str): name of the denominator (e.g. "external")
+            denominators (pd.DataFrame): keys and a deaths column, one row
+                per cell
+            keys (List[str]): columns shared with the data
+
+        Raises:
+            ValueError: denominators with duplicated cells
+        """
+        dictionaries = key_dictionaries([*self.data.values(), denominators], keys)
+        codes = encode(denominators, keys, dictionaries)
+        if pd.Series(codes[codes >= 0]).duplicated().any():
+            raise ValueError(f"{name}: one row per {keys} expected")
+        self.joined[name] = {
+            "keys": list(keys),
+            "dictionaries": dictionaries,
+            "cells": denominators.set_index(keys).sort_index().deaths.astype(float),
+        }
+        # merged data are computed again
+        self.processed_data.clear()
+
+    def joined_deaths(
+        self, name: str, index: pd.MultiIndex, data_slice: Dict[str, Any]
+    ) -> np.ndarray:
+        """Deaths of a joined dataset in each group of a merged dataframe:
+        the cells selected by data_slice are summed by the levels shared
+        with the keys (race, gender ... are not keys: their groups get
+        every death of their cells).
+
+        Args:
+            name (str): name of the denominator, see join_denominator
+            index (pd.MultiIndex): groups of the merged dataframe
+            data_slice (Dict[str, Any]): restriction on the dataset
+
+        Returns:
+            np.ndarray: deaths of each group, NaN without cell or with
+                a missing cell
+        """
+        joined = self.joined[name]
+        keys = joined["keys"]
+        loc_request = [slice(None)] * len(keys)
+        for k, v in data_slice.items():
+            if k in keys:
+                # a list keeps the level of a single value
+                loc_request[keys.index(k)] = v if isinstance(v, (slice, list)) else [v]
+        cells = joined["cells"].loc[tuple(loc_request)]
+
+        # a group with a missing cell (e.g. suppressed) is missing
+        levels = [level for level in index.names if level in keys]
+        if not levels:
+            return np.full(len(index), cells.sum() if cells.notna().all() else np.nan)
+        grouped = cells.groupby(level=levels)
+        totals = grouped.sum().where(grouped.count() == grouped.size())
+        right = encode(totals.index.to_frame(), levels, joined["dictionaries"])
+        left = encode(index.to_frame(), levels, joined["dictionaries"])
+        # position -1 is the appended NaN
+        return np.append(totals.to_numpy(), np.nan)[sort_merge(left, right)]
+
+    def join_population(self, population: Any) -> None:
+        """Use a population index (e.g. PopulationData) for the groups of
+        merge without population: their suicide_per_100k and pop_share
+        are computed from the estimates instead of being missing.
+
+        Args:
+            population (Any): has KEYS (year, age_strat, race, ethnicity,
+                geography) and lookup(df, defaults)
+        """
+        self.population = population
+        # merged data are computed again
+        self.processed_data.clear()
+
+    def joined_population(
+        self, index: pd.MultiIndex, data_slice: Dict[str, Any]
+    ) -> np.ndarray:
+        """Population estimates of the groups of a merged dataframe. The
+        levels of the groups and the single values of data_slice give
+        the keys, the other keys are summed over (see
+        PopulationData.key_frame). Groups restricted on a column the
+        estimates do not have (e.g. gender) get NaN.
+
+        Args:
+            index (pd.MultiIndex): groups of the merged dataframe
+            data_slice (Dict[str, Any]): restriction on the dataset
+
+        Returns:
+            np.ndarray: population of each group, NaN without estimate
+        """
+        keys = set(self.population.KEYS) | set(LEVELS)
+        missing = np.full(len(index), np.nan)
+        if any(name not in keys for name in index.names):
+            return missing
+        defaults = dict()
+        for k, v in data_slice.items():
+            if k in index.names:
+                continue
+            if k not in keys or isinstance(v, (slice, list)):
+                return missing
+            defaults["geography" if k in LEVELS else k] = v
+        return self.population.lookup(index.to_frame(index=False), defaults)
+
+    def suppression(
+        self, index: pd.MultiIndex, data_slice: Dict[str, Any]
+    ) -> pd.DataFrame:
+        """Suppressed cells of the groups of a merged dataframe, summed on
+        the masks of the cell store (see CellStore.sum). A coarser
+        geographic level (e.g. nation) sums all the regions.
+
+        Args:
+            index (pd.MultiIndex): groups of the merged dataframe
+            data_slice (Dict[str, Any]): restriction on the dataset (with
+                the age_strat of the groups if not a level)
+
+        Returns:
+            pd.DataFrame: suppressed_cells, deaths_high and deaths_exact
+                of each group, empty if a level is not a dimension of the
+                cells (e.g. ethno_race) or if a group sums overlapping
+                values (e.g. several age_strat)
+        """
+        by = [name for name in index.names if name not in LEVELS or name in self.cells.dims]
+        if any(name not in self.cells.dims for name in by) or any(
+            k not in self.cells.dims for k in data_slice if k not in LEVELS
+        ):
+            return pd.DataFrame(index=index)
+        where = {k: v for k, v in data_slice.items() if k not in by}
+        try:
+            res = self.cells.sum(by, where).set_index(by)
+        except ValueError:
+            return pd.DataFrame(index=index)
+        res = res.reindex(index.droplevel([name for name in index.names if name not in by]))
+        return pd.DataFrame({
+            "suppressed_cells": res.suppressed_cells.to_numpy(),
+            "deaths_high": res.deaths_high.to_numpy(),
+            "deaths_exact": (res.suppressed_cells == 0).to_numpy(),
+        }, index=index)
+
     def merge(
         self,
         x: str = "year",
@@ -133,7 +642,8 @@ class DataPloter(ABC):
             "hhs": slice("HHS1", "HHS4"),
             "age_strat": "20-64",
         },
-        partition: List[str] = ["25-64", "25plus"],
+        partition: List[str] = None,
+        level: str = None,
     ) -> pd.DataFrame:
         """
         Args:
@@ -148,19 +658,46 @@ class DataPloter(ABC):
                              "age_strat": "20-64", }.
                 Can also be contain lists.
                 Example: {"age_strat": ["10-19", "20-64", "20plus"]}
+            partition (List[str], optional): disjoint age strata of the
+                adj_deaths column. Defaults to None (disjoint bands of
+                25plus: ["25-64", "65plus"]).
+            level (str, optional): coarser geographic level (e.g. "nation",
+                then x, color or by can be "nation"), see select_data.
+                Defaults to None.
 
         Returns:
             pd.DataFrame: merged dataframe according to the filtering criteria
+            (cached in processed_data, do not modify it inplace)
         """
 
+        # plots sharing the same inputs (e.g. different y) share the merge
+        key = self.merge_key(x, color, by, data_slice, level)
+        if key in self.processed_data:
+            return self.processed_data[key]
+
+        value_columns = ["deaths", "population", "age_adjusted_rate"]
+        derived_rates = dict()
+        if self.smoothing_region is not None:
+            value_columns.append("eb_deaths")
+            derived_rates["suicide_per_100k_eb"] = (
+                lambda x: 100000.0 * x.eb_deaths / x.population
+            )
+        if self.completeness is not None:
+            value_columns.append("deaths_nowcast")
+            derived_rates["suicide_per_100k_nowcast"] = (
+                lambda x: 100000.0 * x.deaths_nowcast / x.population
+            )
+
         # if nothing about age is specified
         # then we take the Overall and the adjusted
+        # (stratum of every age, also the denominator of suicide_proportion_2)
+        every_age = self.data.total() if hasattr(self.data, "total") else "Overall"
 
-        data_ = self.select_data(data_slice=data_slice)
+        data_ = self.select_data(data_slice=data_slice, level=level)
 
         # also calculate a data_no_slice
         # we need all age groups to calculate the proportion
-        data_no_slice_ = self.select_data()
+        data_no_slice_ = self.select_data(level=level)
 
         # get the list of values by
 
@@ -174,22 +711,28 @@ class DataPloter(ABC):
         ) -> pd.DataFrame:
             if "age_strat" not in [x, color, by, *data_slice.keys()]:
 
-                partition = ["25-64", "25plus"]
+                partition_ = partition
+                if partition_ is None:
+                    partition_ = (self.data.partition("25plus")
+                                  if hasattr(self.data, "partition")
+                                  else ["25-64", "65plus"])
 
                 data_ = (
                     data_.set_index([color, x, by, "age_strat"])[
-                        ["deaths", "population", "age_adjusted_rate"]
+                        value_columns
                     ]
                     .groupby(level=[0, 1, 2, 3])
-                    .sum()
+                    # NaN if every row is missing (e.g. an incomplete rollup)
+                    .sum(min_count=1)
                     .assign(
                         suicide_per_100k=lambda x: 100000.0 * x.deaths / x.population,
+                        **derived_rates,
                     )
                     .reset_index()
                     .set_index([color, x, by, "age_strat"])
                 )
 
-                data_operation = data_.loc[slice(None), slice(None), slice(None), partition]
+                data_operation = data_.loc[slice(None), slice(None), slice(None), partition_]
 
                 prob = (
                     (
@@ -205,7 +748,7 @@ class DataPloter(ABC):
                     .groupby(level=[0, 1, 2])
                     .sum()
                 )
-                data_ = data_.loc[slice(None), slice(None), slice(None), "Overall"].assign(
+                data_ = data_.loc[slice(None), slice(None), slice(None), every_age].assign(
                     adj_deaths=adj_deaths
                 )
 
@@ -218,12 +761,13 @@ class DataPloter(ABC):
                 # add suicide_per_100k, groupby multi-index
                 data_ = (
                     data_.set_index([color, x, by])[
-                        ["deaths", "population", "age_adjusted_rate"]
+                        value_columns
                     ]
                     .groupby(level=[0, 1, 2])
-                    .sum()
+                    .sum(min_count=1)
                     .assign(
                         suicide_per_100k=lambda x: 100000.0 * x.deaths / x.population,
+                        **derived_rates,
                     )
                     .reset_index()
                     .set_index([color, x, by])
@@ -231,6 +775,16 @@ class DataPloter(ABC):
             return data_
         # apply the transformation to data_ and data_no_slice_
         data_ = modify_data_(data_, data_slice)
+        # strata exported without population
+        if self.population is not None:
+            unknown = ~(data_.population > 0)
+            if unknown.any():
+                estimates = self.joined_population(data_.index, data_slice)
+                data_["population"] = data_.population.where(~unknown, estimates)
+                data_ = data_.assign(
+                    suicide_per_100k=lambda x: 100000.0 * x.deaths / x.population,
+                    **derived_rates,
+                )
         # data_no_slice_ is data_ but without any age_group slice
         # this allow us to correctly calculate the proportion 2
         # (proportion occuring among a given age group)
@@ -243,7 +797,7 @@ class DataPloter(ABC):
         data_["suicide_proportion"] = (
             (
                 100
-                * data_.groupby(level=[0, 1, 2]).sum().deaths
+                * data_.groupby(level=[0, 1, 2]).sum(min_count=1).deaths
                 / data_.groupby(level=[1, 2]).sum().deaths
             )
             .reset_index()
@@ -255,16 +809,19 @@ class DataPloter(ABC):
             data_no_slice_["suicide_proportion_2"] = (
                 (
                     100
-                    * data_no_slice_.groupby(level=[0, 1, 2]).sum().deaths
+                    * data_no_slice_.groupby(level=[0, 1, 2]).sum(min_count=1).deaths
                     / data_no_slice_.groupby(level=[0, 1]).sum().deaths
                 )
                 .reset_index()
                 .set_index([color, x, by])
             )
-        else:  # there are overlapping age_strat (20+, 20-64 etc. So just select "Overall")
-            numerator = data_no_slice_.groupby(level=[0, 1, 2]).sum()[["deaths"]]
-            denom = (data_no_slice_.groupby(level=[0, 1, 2]).sum()
-                     .loc[slice(None), slice(None), "Overall"]
+            data_no_slice_["tot_deaths"] = (
+                data_no_slice_.deaths.groupby(level=[0, 1]).transform("sum")
+            )
+        else:  # there are overlapping age_strat (20+, 20-64 etc. So just select the total)
+            numerator = data_no_slice_.groupby(level=[0, 1, 2]).sum(min_count=1)[["deaths"]]
+            denom = (data_no_slice_.groupby(level=[0, 1, 2]).sum(min_count=1)
+                     .loc[slice(None), slice(None), every_age]
                      .reset_index()
                      .set_index([color, x])
                      .drop(columns=[by])[["deaths"]])
@@ -279,8 +836,20 @@ class DataPloter(ABC):
                 .reset_index()
                 .set_index([color, x, by])
             )
+            data_no_slice_["tot_deaths"] = numerator.tot_deaths
+        # confidence interval of suicide_proportion_2
+        alpha = 1 - self.confidence_level
+        proportion_interval = PROPORTION_INTERVALS[self.proportion_interval]
+        low, high = proportion_interval(
+            data_no_slice_.deaths, data_no_slice_.tot_deaths, alpha
+        )
+        data_no_slice_["suicide_proportion_2_low"] = 100 * low
+        data_no_slice_["suicide_proportion_2_high"] = 100 * high
         # select only the column suicide_proportion_2 (to avoid overlap)
-        data_no_slice_ = data_no_slice_[["suicide_proportion_2"]]
+        data_no_slice_ = data_no_slice_[
+            ["suicide_proportion_2", "suicide_proportion_2_low",
+             "suicide_proportion_2_high"]
+        ]
         # keep only the index in data_ among all the index of data_no_slice_
         # this add the column suicide_proportion_2
         data_ = data_.join(data_no_slice_)
@@ -292,10 +861,127 @@ class DataPloter(ABC):
             .set_index([color, x, by])
         )
 
-        return (
+        # confidence intervals, computed on the whole columns at once
+        low, high = rate_interval(data_.deaths, data_.population, alpha=alpha)
+        data_["suicide_per_100k_low"] = low
+        data_["suicide_per_100k_high"] = high
+        for y_, counts, totals in (
+            ("suicide_proportion", data_.deaths,
+             data_.deaths.groupby(level=[1, 2]).transform("sum")),
+            ("pop_share", data_.population,
+             data_.population.groupby(level=[1, 2]).transform("sum")),
+        ):
+            low, high = proportion_interval(counts, totals, alpha)
+            data_[f"{y_}_low"] = 100 * low
+            data_[f"{y_}_high"] = 100 * high
+
+        # share of the deaths of a joined dataset
+        # Example: suicide_share_external, % of the external-cause deaths
+        joined_slice = dict(data_slice)
+        if "age_strat" not in [x, color, by, *data_slice.keys()]:
+            joined_slice["age_strat"] = every_age
+        for name in self.joined:
+            total = self.joined_deaths(name, data_.index, joined_slice)
+            data_[f"{name}_deaths"] = total
+            data_[f"suicide_share_{name}"] = 100 * data_.deaths / total
+            low, high = proportion_interval(data_.deaths, total, alpha)
+            data_[f"suicide_share_{name}_low"] = 100 * low
+            data_[f"suicide_share_{name}_high"] = 100 * high
+
+        # suppressed (hidden) cells of every group
+        # Example: deaths_high, at most 9 deaths in each suppressed cell
+        if self.cells is not None:
+            data_ = data_.join(self.suppression(data_.index, joined_slice))
+
+        self.processed_data[key] = (
             data_,
             by_list,
         )
+        return self.processed_data[key]
+
+    def trends(
+        self,
+        series: List[str] = ["age_strat", "race", "ethnicity"],
+        outcome: str = "rate",
+        family: str = "poisson",
+        data_slice: Dict[str, Any] = dict(),
+        x: str = "year",
+        **kwargs,
+    ) -> pd.DataFrame:
+        """Test the year trend of every series (see trend_tests).
+
+        Example:
+            sd.trends(["age_strat", "hhs", "ethno_race_4_cat"], "proportion",
+                      data_slice={"age_strat": "10-19"})
+            -> in which HHS region does the share of each ethno-race among
+               adolescent suicides significantly increase?
+
+        Args:
+            series (List[str], optional): columns identifying a series,
+                age strata overlap: keep age_strat in the series or in
+                data_slice. Defaults to ["age_strat", "race", "ethnicity"].
+            outcome (str, optional): "count" (deaths), "rate" (deaths
+                over population) or "proportion" (deaths over the deaths
+                of every value of the last series column).
+                Defaults to "rate".
+            family (str, optional): "poisson" or "negative-binomial".
+                Defaults to "poisson".
+            data_slice (Dict[str, Any], optional): restriction on the
+                initial dataset. Defaults to dict().
+            x (str, optional): year column. Defaults to "year".
+            **kwargs: passed to trend_tests (alpha, max_workers ...)
+
+        Returns:
+            pd.DataFrame: one row per series, slopes, CIs and
+                FDR-adjusted p-values
+        """
+        offset = {"count": None, "rate": "population", "proportion": "tot_deaths"}[outcome]
+        data_ = (
+            self.select_data(data_slice=data_slice)
+            .groupby(series + [x])[["deaths", "population"]]
+            .sum(min_count=1)
+            .reset_index()
+        )
+        if outcome == "proportion":
+            data_["tot_deaths"] = (
+                data_.groupby(series[:-1] + [x]).deaths.transform("sum")
+            )
+        return trend_tests(
+            data_, series, x=x, y="deaths", offset=offset, family=family, **kwargs
+        )
+
+    def disparities(
+        self,
+        dimensions: List[str] = ["race", "ethnicity", "ethno_race_4_cat"],
+        strata: List[str] = ["age_strat", "year"],
+        data_slice: Dict[str, Any] = dict(),
+        **kwargs,
+    ) -> pd.DataFrame:
+        """Representation ratios and rate ratios of every group of every
+        dimension, in every stratum (see disparities).
+
+        Example:
+            sd.disparities(strata=["age_strat", "year", "hhs"])
+
+        Args:
+            dimensions (List[str], optional): columns of the groups.
+                Defaults to ["race", "ethnicity", "ethno_race_4_cat"].
+            strata (List[str], optional): columns of the strata, age
+                strata overlap: keep age_strat in the strata or in
+                data_slice. Defaults to ["age_strat", "year"].
+            data_slice (Dict[str, Any], optional): restriction on the
+                initial dataset. Defaults to dict().
+            **kwargs: passed to disparities (reference, alpha ...)
+
+        Returns:
+            pd.DataFrame: long table, one row per dimension, stratum and
+                group
+        """
+        kwargs.setdefault("alpha", 1 - self.confidence_level)
+        kwargs.setdefault("proportion_interval", self.proportion_interval)
+        return disparities(
+            self.select_data(data_slice=data_slice), dimensions, strata, **kwargs
+        )
 
     def s_print(
         self,
@@ -327,7 +1013,7 @@ class DataPloter(ABC):
         save_file: bool = True,
         show_fig: bool=True,
         **kwargs,
-    ) -> None:
+    ) -> go.Figure:
         """
         Args:
             x (str, optional): filter on x-axis. Defaults to "year".
@@ -377,10 +1063,32 @@ class DataPloter(ABC):
                         "plot_filename": "image1"
                     -> Add a text to the subplot titles
                         "additional_subplot_title": str
+                    -> Add the figure to an html report (see HtmlReport)
+                        "report": HtmlReport
+                    -> Write the file in the background, plot returns the
+                       future of the written files too (see
+                       wait_for_exports)
+                        "async_save": True
+                    -> Export several formats and sizes at once, file names
+                       get the format extension (and a suffix, see
+                       export_figure). Defaults to ["png"].
+                        "export_formats": ["png", "svg", {"thumbnail": 320}]
+                    -> Draw the confidence intervals computed by merge
+                       (suicide_per_100k, suicide_proportion,
+                       suicide_proportion_2, pop_share) as error bands
+                        "error_bands": True
+                    -> Plot a coarser geographic level, from the
+                       materialized rollups (see merge)
+                        "level": "nation"
+
+        Returns:
+            Union[go.Figure, Tuple[go.Figure, Future]]: the plotly figure,
+                and the future of the written files with async_save
         """
 
         processed_data, by_list = self.merge(
-            x=x, color=color, by=by, data_slice=data_slice
+            x=x, color=color, by=by, data_slice=data_slice,
+            level=kwargs.get("level"),
         )
 
         # force by_list if provided in kwargs (to force the plots to appear)
@@ -392,66 +1100,81 @@ class DataPloter(ABC):
 
         # add a secondary y-axis to the fig if there is another y-axis
         secondary_y = True if second_y.get("secondary_y") else False
-        specs = (
-            [[{"secondary_y": True} for _ in range(cols)] for _ in range(rows)]
-            if secondary_y
-            else None
-        )
+        secondary_y_label = second_y.get("y")
         subplot_titles = list(map(lambda x: str(x) + kwargs.get("additional_subplot_title", ""), by_list))
-        fig = make_subplots(
+        # copy a cached figure with the subplots and the axis styling
+        skeleton = self.figure_skeleton(
             rows=rows,
             cols=cols,
+            secondary_y=secondary_y,
             subplot_titles=tuple(subplot_titles),
-            specs=specs,
         )
+        fig = go.Figure(skeleton["figure"])
+
+        # same color for a given category in every figure
+        color_map = self.color_map(processed_data.index.get_level_values(0))
 
+        # confidence intervals ({y}_low, {y}_high columns) as error bands
+        error_bands = kwargs.get("error_bands", False)
         # change mode according to the scatter parameter
         mode = "markers" if scatter else "markers+lines"
-        # add the plots
+        # add the plots, all the traces are added at once
+        traces, trace_rows, trace_cols, trace_secondary_ys = [], [], [], []
+        # show each category only once in the legend
+        in_legend = set()
+        y_list = [(y, False, dict())]
+        # if there is a second plot, add it
+        if second_y:
+            y_list.append(
+                (secondary_y_label, secondary_y, second_y.get("line_param", dict()))
+            )
         for i, subpop in enumerate(by_list):
             sub_df = self.selection(subpop, processed_data).sort_values(by=[x])
 
-            showlegend = i == 0
-            for c in np.unique(sub_df[color]):
-                sub_df_c = sub_df[sub_df[color] == c]
-                fig.add_trace(
-                    (
+            for y_, is_secondary, line_param in y_list:
+                with_bands = error_bands and f"{y_}_low" in sub_df
+                for c in np.unique(sub_df[color]):
+                    sub_df_c = sub_df[sub_df[color] == c]
+                    if with_bands:
+                        # confidence interval as a closed filled shape
+                        traces.append(
+                            go.Scatter(
+                                x=np.concatenate([sub_df_c[x], sub_df_c[x][::-1]]),
+                                y=np.concatenate([sub_df_c[f"{y_}_high"],
+                                                  sub_df_c[f"{y_}_low"][::-1]]),
+                                fill="toself",
+                                fillcolor=rgba(color_map[str(c)], 0.2),
+                                line=dict(width=0),
+                                hoverinfo="skip",
+                                showlegend=False,
+                                legendgroup=str(c),
+                            )
+                        )
+                        trace_rows.append(1 + i // cols)
+                        trace_cols.append(1 + i % cols)
+                        trace_secondary_ys.append(is_secondary)
+                    traces.append(
                         go.Scatter(
                             x=sub_df_c[x],
-                            y=sub_df_c[y],
+                            y=sub_df_c[y_],
                             name=c,
-                            showlegend=showlegend,
+                            showlegend=c not in in_legend,
                             mode=mode,
+                            line={"color": color_map[str(c)], **line_param},
+                            **({"legendgroup": str(c)} if with_bands else {}),
                         )
-                    ),
-                    row=(1 + i // cols),
-                    col=(1 + i % cols),
-                    secondary_y=False,
-                )
-
-            # if there is a second plot, add it
-            secondary_y_label = second_y.get("y")
-            if second_y:
-                for c in np.unique(sub_df[color]):
-                    sub_df_c = sub_df[sub_df[color] == c]
-                    fig.add_trace(
-                        (
-                            go.Scatter(
-                                x=sub_df_c[x],
-                                y=sub_df_c[secondary_y_label],
-                                name=c,
-                                showlegend=showlegend,
-                                mode=mode,
-                                line=dict(**second_y.get("line_param", dict())),
-                            )
-                        ),
-                        row=(1 + i // cols),
-                        col=(1 + i % cols),
-                        secondary_y=secondary_y,
                     )
+                    in_legend.add(c)
+                    trace_rows.append(1 + i // cols)
+                    trace_cols.append(1 + i % cols)
+                    trace_secondary_ys.append(is_secondary)
 
-        # relabel to add colors
-        self.relabel_fig(fig)
+        fig.add_traces(
+            traces,
+            rows=trace_rows,
+            cols=trace_cols,
+            secondary_ys=trace_secondary_ys if secondary_y else None,
+        )
 
         # change the text if there are two y-axis
         y_text = "{}{}".format(y, f" and {secondary_y_label}" if second_y else "")
@@ -470,75 +1193,58 @@ class DataPloter(ABC):
             )
         )
         legend_title = kwargs.get("legend_text", color)  # default: color
-        # update layout
-        fig.update_layout(
-            title_text=title_text,
-            xaxis_title=x,
-            legend_title=legend_title,
-            height=500 * rows,
-            width=700 * cols,
-            plot_bgcolor="rgb(255,255,255)",
-            legend={"x": 1.15},
-        )
-        # update range of the different axis if a list of ranges is provided
-        if kwargs.get("range_dic"):
-            ranges = kwargs.get("range_dic")
-            # select yaxis without overlaying keyword (=secondary y-axis)
-            y_axis_list = [
-                key
-                for key in fig["layout"]
-                if ("yaxis" in key) and not (fig["layout"][key]["overlaying"])
-            ]
-            y_axis_list.sort()
-            for key, range_y in zip(y_axis_list, ranges):
-                fig.update_layout({key: {"range": range_y}})
-
-        # update axes
-        fig.update_xaxes(
-            tickangle=-45,
-            showline=True,
-            linewidth=0.1,
-            linecolor="black",
-            gridwidth=0.1,
-            gridcolor="grey",
-        )
         # y-axis name, default to y
         y_title_text = kwargs.get("y_title_text", y)
-        fig.update_yaxes(
-            showline=True,
-            linewidth=0.1,
-            linecolor="black",
-            gridwidth=0.1,
-            gridcolor="grey",
-            secondary_y=False,
-            title_text=y_title_text,
-            ticksuffix=kwargs.get("primary_ticksuffix", ""),
-        )
-
         # second y-axis name, default to secondary_y_label
         second_y_title_text = kwargs.get("second_y_title_text", secondary_y_label)
-        if secondary_y:  # update also the secondary y_axis
-            fig.update_yaxes(
-                showline=True,
-                linewidth=0.1,
-                linecolor="black",
-                gridwidth=0.1,
-                gridcolor="grey",
-                secondary_y=True,
-                title_text=second_y_title_text,
-                range=kwargs.get("secondary_range"),
-                ticksuffix=kwargs.get("secondary_ticksuffix", ""),
-            )
+
+        # figure specific layout, applied in a single update
+        layout = {
+            "title": {"text": title_text},
+            "xaxis": {"title": {"text": x}},
+            "legend": {"title": {"text": legend_title}},
+        }
+        for key in skeleton["primary_axes"]:
+            layout[key] = {
+                "title": {"text": y_title_text},
+                "ticksuffix": kwargs.get("primary_ticksuffix", ""),
+            }
+        for key in skeleton["secondary_axes"]:
+            layout[key] = {
+                "title": {"text": second_y_title_text},
+                "ticksuffix": kwargs.get("secondary_ticksuffix", ""),
+            }
+            if kwargs.get("secondary_range") is not None:
+                layout[key]["range"] = kwargs.get("secondary_range")
+        # update range of the different axis if a list of ranges is provided
+        if kwargs.get("range_dic"):
+            ranges = kwargs.get("range_dic")
+            for key, range_y in zip(skeleton["range_axes"], ranges):
+                layout[key]["range"] = range_y
+        fig.update_layout(layout)
         # name of the file
         # (different text if there are two y-axis)
         y_text = "{}{}".format(y, f"_and_{secondary_y_label}" if second_y else "")
-        # save image
-        filename = "outputs/{}_{}_by_{}_color_{}.png".format(y_text, x, by, color)
+        # save image (extension added by export_figure)
+        basename = "outputs/{}_{}_by_{}_color_{}".format(y_text, x, by, color)
         # if filename forced, change it
         if kwargs.get("plot_filename"):
-            filename = "outputs/" + kwargs.get("plot_filename") + ".png"
+            basename = "outputs/" + kwargs.get("plot_filename")
+        targets = kwargs.get("export_formats", ["png"])
 
-        if save_file:
-            fig.write_image(filename)
+        if save_file and kwargs.get("async_save"):
+            # do not modify the figure before the export is done
+            future = export_executor().submit(
+                export_figure, fig, basename, targets
+            )
+            with EXPORT_LOCK:
+                PENDING_EXPORTS.append(future)
+        elif save_file:
+            export_figure(fig, basename, targets)
         if show_fig:
             fig.show()
+        if kwargs.get("report") is not None:
+            kwargs.get("report").add(fig, os.path.basename(basename))
+        if save_file and kwargs.get("async_save"):
+            return fig, future
+        return fig
@@ -0,0 +1,139 @@
+from typing import Any, Dict, List, Union
+import plotly.graph_objects as go
+import plotly.io as pio
+
+import io
+
+
+RASTER_FORMATS = ("png", "jpg", "jpeg", "webp")
+
+
+def normalize_targets(
+    targets: List[Union[str, Dict[str, Any]]],
+) -> List[Dict[str, Any]]:
+    """Convert export targets into dictionnaries.
+
+    Args:
+        targets (List[Union[str, Dict[str, Any]]]): formats ("png", "svg")
+            or dictionnaries with the keys
+                format (str): image format, defaults to "png"
+                width, height, scale (optional): size of the render
+                thumbnail (int): max width in pixels of a thumbnail
+                    downscaled from the rendered raster (RASTER_FORMATS)
+                suffix (str): added to the file name,
+                    defaults to "_thumb" for thumbnails, "" otherwise
+
+    Raises:
+        ValueError: thumbnail in a vector format (svg, pdf)
+
+    Returns:
+        List[Dict[str, Any]]: normalized targets
+    """
+    res = []
+    for target in targets:
+        if isinstance(target, str):
+            target = {"format": target}
+        target = {"format": "png", **target}
+        if target.get("thumbnail") and target["format"] not in RASTER_FORMATS:
+            raise ValueError(
+                f"a thumbnail is a raster image, not {target['format']}"
+            )
+        target.setdefault("suffix", "_thumb" if target.get("thumbnail") else "")
+        res.append(target)
+    return res
+
+
+def downscale(raster: bytes, max_width: int, format: str) -> bytes:
+    """Downscale a rendered image to a thumbnail.
+
+    Args:
+        raster (bytes): png/jpeg/webp image
+        max_width (int): width of the thumbnail in pixels
+        format (str): format of the thumbnail
+
+    Returns:
+        bytes: thumbnail
+    """
+    from PIL import Image  # optional dependency, only for thumbnails
+
+    img = Image.open(io.BytesIO(raster))
+    height = max(1, round(img.height * max_width / img.width))
+    img = img.resize((max_width, height), Image.LANCZOS)
+    if format in ("jpg", "jpeg"):
+        img = img.convert("RGB")
+    out = io.BytesIO()
+    img.save(out, format="jpeg" if format == "jpg" else format)
+    return out.getvalue()
+
+
+def export_figure(
+    fig: go.Figure,
+    basename: str,
+    targets: List[Union[str, Dict[str, Any]]] = ["png"],
+) -> List[str]:
+    """Write a figure in several formats and sizes.
+
+    The figure is serialized once for every target, each distinct
+    (format, size) is rendered once by the image exporter and thumbnails
+    are downscaled from a rendered raster instead of being rendered again
+    (Pillow is needed for that, otherwise they are rendered at a
+    smaller scale).
+
+    Example:
+        export_figure(fig, "outputs/deaths_year_by_race_color_age_strat",
+                      ["png", "svg", {"thumbnail": 320}])
+        writes outputs/deaths_year_by_race_color_age_strat.png,
+        outputs/deaths_year_by_race_color_age_strat.svg and
+        outputs/deaths_year_by_race_color_age_strat_thumb.png
+
+    Args:
+        fig (go.Figure): plotly figure
+        basename (str): path of the files without extension
+        targets (List[Union[str, Dict[str, Any]]], optional): see
+            normalize_targets. Defaults to ["png"].
+
+    Returns:
+        List[str]: written files, in the order of the targets
+    """
+    targets = normalize_targets(targets)
+    fig_dict = fig.to_dict()
+    renders = dict()
+
+    def render(format: str, **size) -> bytes:
+        key = (format, tuple(sorted(size.items())))
+        if key not in renders:
+            renders[key] = pio.to_image(
+                fig_dict, format=format, validate=False, **size
+            )
+        return renders[key]
+
+    files = []
+    for target in targets:
+        format = target["format"]
+        size = {k: target[k] for k in ("width", "height", "scale") if k in target}
+        if target.get("thumbnail"):
+            # reuse a raster already rendered at the figure size if any
+            source = next(
+                (
+                    raw for (f, s), raw in renders.items()
+                    if f in RASTER_FORMATS and not s
+                ),
+                None,
+            )
+            try:
+                image = downscale(
+                    source if source is not None else render("png"),
+                    target["thumbnail"],
+                    format,
+                )
+            except ImportError:
+                width = fig_dict.get("layout", dict()).get("width") or 700
+                image = render(format, scale=target["thumbnail"] / width)
+        else:
+            image = render(format, **size)
+
+        filename = "{}{}.{}".format(basename, target["suffix"], format)
+        with open(filename, "wb") as f:
+            f.write(image)
+        files.append(filename)
+    return files
@@ -0,0 +1,260 @@
+from typing import Any, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import itertools
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from .blueprint import DataPloter
+
+
+# a string made of a single "{variable}" is replaced by the raw value
+# (keeps lists, numbers, booleans and null)
+WHOLE_VARIABLE = re.compile(r"^\{(\w+)\}$")
+
+
+class PlotPlan:
+    """Declarative description of a matrix of figures.
+
+    A plan (json or yaml) has three sections:
+        defaults: plot keyword arguments shared by every figure
+        axes: named lists of variables, e.g.
+            "age": [{"age_cat": "10-19", "age_cat_name": "adolescents"}, ...]
+        figures: groups of figures, the cartesian product of the
+            listed axes (and of the group "vars") is applied to "params",
+            a template of plot keyword arguments
+            {"product": ["age", "metric"],
+             "vars": {"suffix": ""},
+             "params": {"y": "{y}", "plot_filename": "{age_cat}_{y}{suffix}"}}
+
+    Strings are formatted with the variables (variables can themselves
+    reference other variables). Parameters resolved to null are dropped,
+    and {"slice": [start, stop]} in a data_slice is converted to a slice.
+
+    See plot_plan.json for the plan of the Analysis notebook.
+    """
+
+    def __init__(self, plan: Dict[str, Any]) -> None:
+        self.defaults = plan.get("defaults", dict())
+        self.axes = plan.get("axes", dict())
+        self.groups = plan.get("figures", [])
+
+    @classmethod
+    def from_file(cls, path: str) -> "PlotPlan":
+        """Load a plan from a json or a yaml file.
+
+        Args:
+            path (str): .json, .yaml or .yml file
+
+        Returns:
+            PlotPlan: loaded plan
+        """
+        with open(path, "r") as f:
+            if path.endswith((".yaml", ".yml")):
+                import yaml  # optional dependency, only for yaml plans
+
+                return cls(yaml.safe_load(f))
+            return cls(json.load(f))
+
+    @staticmethod
+    def resolve(template: Any, variables: Dict[str, Any]) -> Any:
+        """Recursively format a template with variables."""
+        if isinstance(template, str):
+            whole = WHOLE_VARIABLE.match(template)
+            if whole and whole.group(1) in variables:
+                return variables[whole.group(1)]
+            return template.format(**variables)
+        if isinstance(template, list):
+            return [PlotPlan.resolve(v, variables) for v in template]
+        if isinstance(template, dict):
+            if set(template.keys()) == {"slice"}:
+                return slice(*PlotPlan.resolve(template["slice"], variables))
+            return {k: PlotPlan.resolve(v, variables)
+                    for k, v in template.items()}
+        return template
+
+    def expand(self) -> List[Dict[str, Any]]:
+        """Expand the plan into the list of plot keyword arguments.
+
+        Returns:
+            List[Dict[str, Any]]: one dictionnary per figure
+        """
+        figures = []
+        for group in self.groups:
+            choices = [self.axes[axis] for axis in group.get("product", [])]
+            for combination in itertools.product(*choices):
+                variables = dict(group.get("vars", dict()))
+                for values in combination:
+                    variables.update(values)
+                # variables may reference each other, e.g. "color": "{cat}"
+                for _ in range(len(variables)):
+                    resolved = self.resolve(variables, variables)
+                    if resolved == variables:
+                        break
+                    variables = resolved
+
+                params = self.resolve(
+                    {**self.defaults, **group.get("params", dict())},
+                    variables,
+                )
+                figures.append(
+                    {k: v for k, v in params.items() if v is not None}
+                )
+        return figures
+
+
+class PlanRunner:
+    """Run a PlotPlan as a DAG of merge and render nodes.
+
+    Identical merge requests are computed once (they are cached by
+    DataPloter.merge), merges and renders are scheduled on a thread pool
+    and every node is timed. Finished renders are recorded in a state
+    file so that a failed run can be restarted where it stopped.
+    """
+
+    def __init__(
+        self,
+        ploter: DataPloter,
+        plan: PlotPlan,
+        state_file: str = "outputs/.plot_plan_state.json",
+        max_workers: int = 4,
+    ) -> None:
+        """
+        Args:
+            ploter (DataPloter): data loader used for the figures
+            plan (PlotPlan): plan to run
+            state_file (str, optional): where finished renders are
+                recorded. Defaults to "outputs/.plot_plan_state.json".
+            max_workers (int, optional): number of threads.
+                Defaults to 4.
+        """
+        self.ploter = ploter
+        self.plan = plan
+        self.state_file = state_file
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def render_id(params: Dict[str, Any]) -> str:
+        """Stable identifier of a render node."""
+        return hashlib.sha1(
+            repr(sorted(params.items(), key=lambda it: it[0])).encode()
+        ).hexdigest()[:16]
+
+    def dag(
+        self,
+    ) -> Tuple[Dict[tuple, Dict[str, Any]], Dict[tuple, List[Dict[str, Any]]]]:
+        """Build the DAG: merge nodes and the render nodes depending
+        on each of them.
+
+        Returns:
+            Tuple[Dict[tuple, Dict[str, Any]], Dict[tuple, List[Dict]]]:
+                merge keyword arguments and render keyword arguments,
+                both indexed by the merge key
+        """
+        merges, renders = dict(), dict()
+        for params in self.plan.expand():
+            merge_params = {
+                "x": params.get("x", "year"),
+                "color": params.get("color", "age_strat"),
+                "by": params.get("by", "race"),
+                "data_slice": params.get("data_slice", dict()),
+            }
+            key = self.ploter.merge_key(**merge_params)
+            merges.setdefault(key, merge_params)
+            renders.setdefault(key, []).append(params)
+        return merges, renders
+
+    def load_state(self) -> Dict[str, Any]:
+        if os.path.exists(self.state_file):
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        return dict()
+
+    def save_state(self, state: Dict[str, Any]) -> None:
+        folder = os.path.dirname(self.state_file)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(self.state_file, "w") as f:
+            json.dump(state, f, indent=1)
+
+    def timed(self, node: str, kind: str, func, *args, **kwargs):
+        """Run a node and return its timing record."""
+        start = time.perf_counter()
+        try:
+            func(*args, **kwargs)
+            status = "done"
+        except Exception as err:  # keep running the other nodes
+            status = f"failed: {err!r}"
+        return {
+            "node": node,
+            "kind": kind,
+            "seconds": time.perf_counter() - start,
+            "status": status,
+        }
+
+    def run(self, restart: bool = True) -> pd.DataFrame:
+        """Run every node of the plan.
+
+        Args:
+            restart (bool, optional): skip the renders recorded as finished
+                in the state file. Defaults to True.
+
+        Returns:
+            pd.DataFrame: one row per node with its kind, duration in
+                seconds and status (done, skipped, cached or failed)
+        """
+        merges, renders = self.dag()
+        state = self.load_state() if restart else dict()
+        timings = []
+
+        def render(params: Dict[str, Any]) -> Dict[str, Any]:
+            node = self.render_id(params)
+            record = self.timed(node, "render", self.ploter.plot, **params)
+            if record["status"] == "done":
+                with self.lock:
+                    state[node] = params.get("plot_filename", node)
+                    self.save_state(state)
+            return record
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            merge_futures = dict()
+            for key, merge_params in merges.items():
+                todo = [p for p in renders[key]
+                        if self.render_id(p) not in state]
+                timings += [
+                    {"node": self.render_id(p), "kind": "render",
+                     "seconds": 0.0, "status": "cached"}
+                    for p in renders[key] if self.render_id(p) in state
+                ]
+                if not todo:
+                    continue
+                future = pool.submit(
+                    self.timed, repr(key), "merge",
+                    self.ploter.merge, **merge_params
+                )
+                merge_futures[future] = todo
+
+            render_futures = []
+            # renders are scheduled as soon as their merge is available
+            for future in as_completed(merge_futures):
+                record = future.result()
+                timings.append(record)
+                todo = merge_futures[future]
+                if record["status"] != "done":
+                    timings += [
+                        {"node": self.render_id(p), "kind": "render",
+                         "seconds": 0.0, "status": "skipped"}
+                        for p in todo
+                    ]
+                    continue
+                render_futures += [pool.submit(render, p) for p in todo]
+
+            timings += [f.result() for f in as_completed(render_futures)]
+
+        return pd.DataFrame(timings, columns=["node", "kind", "seconds", "status"])
@@ -0,0 +1,256 @@
+from typing import Any, Dict, List, Union
+import plotly.graph_objects as go
+import plotly.io as pio
+import plotly.offline
+
+import numpy as np
+import base64
+import html
+import json
+import os
+import urllib.parse
+
+
+# smallest integer dtypes first, typed-array names understood by plotly.js
+INT_DTYPES = [("i1", np.int8), ("u1", np.uint8), ("i2", np.int16),
+              ("u2", np.uint16), ("i4", np.int32), ("u4", np.uint32)]
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{plotlyjs_src}"></script>
+<style>
+body {{font-family: sans-serif; margin: 2em;}}
+.figure {{margin-bottom: 3em;}}
+.placeholder {{background: #f4f4f4;}}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+{body}
+<script>
+var DTYPES = {{i1: Int8Array, u1: Uint8Array, i2: Int16Array,
+               u2: Uint16Array, i4: Int32Array, u4: Uint32Array,
+               f4: Float32Array, f8: Float64Array}};
+// decode {{dtype, bdata}} objects back into typed arrays
+function decode(obj) {{
+  if (Array.isArray(obj)) {{ return obj.map(decode); }}
+  if (obj === null || typeof obj !== "object") {{ return obj; }}
+  if (obj.dtype && obj.bdata !== undefined) {{
+    var raw = atob(obj.bdata), buf = new Uint8Array(raw.length);
+    for (var i = 0; i < raw.length; i++) {{ buf[i] = raw.charCodeAt(i); }}
+    return new DTYPES[obj.dtype](buf.buffer);
+  }}
+  var res = {{}};
+  for (var key in obj) {{ res[key] = decode(obj[key]); }}
+  return res;
+}}
+var TEMPLATE = {template};
+// figure files are small scripts calling this function, so that the
+// report also works when opened from the disk (no fetch on file://)
+window.reportFigure = function(name, fig) {{
+  var div = document.getElementById(name);
+  div.classList.remove("placeholder");
+  div.style.height = "";
+  fig.layout.template = fig.layout.template || TEMPLATE;
+  Plotly.newPlot(div, decode(fig.data), fig.layout, {{responsive: true}});
+}};
+var observer = new IntersectionObserver(function(entries) {{
+  entries.forEach(function(entry) {{
+    if (!entry.isIntersecting) {{ return; }}
+    observer.unobserve(entry.target);
+    var script = document.createElement("script");
+    script.src = entry.target.dataset.src;
+    document.body.appendChild(script);
+  }});
+}}, {{rootMargin: "{root_margin}"}});
+document.querySelectorAll(".placeholder").forEach(function(div) {{
+  observer.observe(div);
+}});
+</script>
+</body>
+</html>
+"""
+
+FIGURE_TEMPLATE = """<div class="figure">
+<h2>{title}</h2>
+<div id="{name}" class="placeholder" data-src="{src}" style="height: {height}px"></div>
+</div>"""
+
+
+class HtmlReport:
+    """Collect figures from a batch of plot calls and write them as a
+    static html site.
+
+    The site is made of one index.html, a single shared plotly.js and
+    one small file per figure, only loaded when the reader scrolls to it.
+    Numerical arrays are stored as base64 typed arrays when it is shorter
+    than their json representation.
+
+    Example:
+        report = HtmlReport("outputs/report")
+        sd.plot(..., save_file=False, show_fig=False, report=report)
+        report.write()
+    """
+
+    def __init__(
+        self,
+        output_folder: str = "outputs/report",
+        title: str = "CDC Wonder analysis",
+        include_plotlyjs: str = "directory",
+        root_margin: str = "400px",
+    ) -> None:
+        """
+        Args:
+            output_folder (str, optional): where the site is written.
+                Defaults to "outputs/report".
+            title (str, optional): title of the index page.
+                Defaults to "CDC Wonder analysis".
+            include_plotlyjs (str, optional): "directory" to write a single
+                plotly.min.js next to index.html, "cdn" to reference the
+                plotly.js CDN, or any other string used as the script src.
+                Defaults to "directory".
+            root_margin (str, optional): distance before the viewport at
+                which figures start loading. Defaults to "400px".
+        """
+        self.output_folder = output_folder
+        self.title = title
+        self.include_plotlyjs = include_plotlyjs
+        self.root_margin = root_margin
+        # name -> (title, figure), insertion order is the page order
+        self.figures: Dict[str, Any] = dict()
+        # default template, shipped once in index.html instead of per figure
+        self.template = json.loads(
+            go.Figure(layout={"template": pio.templates.default}).to_json()
+        )["layout"]["template"]
+
+    def add(self, fig: go.Figure, name: str, title: str = None) -> None:
+        """Add a figure to the report. A figure with the same name
+        replaces the previous one.
+
+        Args:
+            fig (go.Figure): plotly figure
+            name (str): unique name, used for the figure file
+            title (str, optional): section title. Defaults to name.
+        """
+        self.figures[name] = (title or name, fig)
+
+    @staticmethod
+    def encode_array(values: List[Any]) -> Union[List[Any], Dict[str, str]]:
+        """Encode a list of numbers as a plotly.js typed array
+        {"dtype": ..., "bdata": ...} if it is shorter than the json list.
+
+        Args:
+            values (List[Any]): json list
+
+        Returns:
+            Union[List[Any], Dict[str, str]]: typed array spec or the
+                initial list
+        """
+        if len(values) < 2 or not all(
+            isinstance(v, (int, float)) and not isinstance(v, bool)
+            for v in values
+        ):
+            return values
+
+        array = np.asarray(values)
+        if array.dtype.kind == "i":
+            dtype = next(
+                (
+                    (name, t) for name, t in INT_DTYPES
+                    if np.iinfo(t).min <= array.min()
+                    and array.max() <= np.iinfo(t).max
+                ),
+                ("f8", np.float64),
+            )
+        else:
+            dtype = ("f8", np.float64)
+        bdata = base64.b64encode(array.astype(dtype[1]).tobytes()).decode()
+
+        if len(bdata) >= len(json.dumps(values, separators=(",", ":"))):
+            return values
+        return {"dtype": dtype[0], "bdata": bdata}
+
+    def encode(self, obj: Any) -> Any:
+        """Recursively replace numerical lists by typed arrays."""
+        if isinstance(obj, dict):
+            return {k: self.encode(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            encoded = self.encode_array(obj)
+            if encoded is obj:
+                return [self.encode(v) for v in obj]
+            return encoded
+        return obj
+
+    def figure_to_json(self, fig: go.Figure) -> str:
+        """Compact json of a figure with typed-array encoded data.
+
+        Args:
+            fig (go.Figure): plotly figure
+
+        Returns:
+            str: json string
+        """
+        fig_dict = json.loads(fig.to_json())
+        fig_dict["data"] = self.encode(fig_dict.get("data", []))
+        # the default template is already in index.html
+        layout = fig_dict.get("layout", dict())
+        if layout.get("template") == self.template:
+            layout.pop("template")
+        return json.dumps(fig_dict, separators=(",", ":"))
+
+    def plotlyjs_src(self) -> str:
+        """src of the shared plotly.js script, write it if needed."""
+        if self.include_plotlyjs == "cdn":
+            return "https://cdn.plot.ly/plotly-{}.min.js".format(
+                plotly.offline.get_plotlyjs_version()
+            )
+        if self.include_plotlyjs == "directory":
+            path = os.path.join(self.output_folder, "plotly.min.js")
+            # plotly.js is several MB, only write it once
+            if not os.path.exists(path):
+                with open(path, "w") as f:
+                    f.write(plotly.offline.get_plotlyjs())
+            return "plotly.min.js"
+        return self.include_plotlyjs
+
+    def write(self) -> str:
+        """Write the site.
+
+        Returns:
+            str: path of the index.html file
+        """
+        os.makedirs(os.path.join(self.output_folder, "figures"), exist_ok=True)
+
+        sections = []
+        for name, (title, fig) in self.figures.items():
+            src = f"figures/{name}.js"
+            with open(os.path.join(self.output_folder, src), "w") as f:
+                f.write(
+                    "reportFigure({},{});".format(
+                        json.dumps(name), self.figure_to_json(fig)
+                    )
+                )
+            sections.append(
+                FIGURE_TEMPLATE.format(
+                    title=html.escape(title),
+                    name=html.escape(name),
+                    src=urllib.parse.quote(src),
+                    height=fig.layout.height or 500,
+                )
+            )
+
+        index = os.path.join(self.output_folder, "index.html")
+        with open(index, "w") as f:
+            f.write(
+                PAGE_TEMPLATE.format(
+                    title=html.escape(self.title),
+                    plotlyjs_src=self.plotlyjs_src(),
+                    body="\n".join(sections),
+                    root_margin=self.root_margin,
+                    template=json.dumps(self.template, separators=(",", ":")),
+                )
+            )
+        return index
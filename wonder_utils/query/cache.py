@@ -0,0 +1,190 @@
+from typing import Any, Dict, Optional
+import xml.etree.ElementTree as ET
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+# Data/wonder_cache of the repository, whatever the working directory
+CACHE_FOLDER = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "Data", "wonder_cache"
+))
+
+
+def canonical_request(xml_request: str) -> str:
+    """Canonical form of a <request-parameters> document: parameters
+    sorted by name (the values keep their order), whitespace stripped.
+    Two requests only differing by the order of their parameters share
+    the same canonical form.
+
+    Args:
+        xml_request (str): <request-parameters> xml document
+
+    Returns:
+        str: canonical form
+    """
+    root = ET.fromstring(xml_request)
+    parameters = sorted(
+        (
+            (param.findtext("name") or "").strip(),
+            tuple((v.text or "").strip() for v in param.findall("value")),
+        )
+        for param in root.iter("parameter")
+    )
+    return json.dumps(parameters, separators=(",", ":"))
+
+
+def request_key(xml_request: str, dataset: str = "D76") -> str:
+    """Hash of the canonical request, used as the cache key."""
+    return hashlib.sha256(
+        f"{dataset}\n{canonical_request(xml_request)}".encode()
+    ).hexdigest()
+
+
+class ResponseCache:
+    """On-disk cache of CDC Wonder responses.
+
+    Responses are stored gzip compressed ({key}.xml.gz) next to a
+    metadata file ({key}.json: dataset, fetch time, sizes). Entries older
+    than ttl seconds are ignored, and the least recently used entries are
+    evicted when the compressed responses exceed max_size bytes.
+
+    Example:
+        client = WonderClient(cache=ResponseCache())
+    """
+
+    def __init__(
+        self,
+        folder: str = CACHE_FOLDER,
+        ttl: Optional[float] = None,
+        max_size: Optional[int] = 500 * 2 ** 20,
+    ) -> None:
+        """
+        Args:
+            folder (str, optional): where the responses are stored.
+                Defaults to CACHE_FOLDER (Data/wonder_cache of the
+                repository).
+            ttl (Optional[float], optional): time to live in seconds,
+                None to keep the responses forever. Defaults to None.
+            max_size (Optional[int], optional): max size in bytes of the
+                compressed responses, None for no limit. Defaults to 500 MB.
+        """
+        self.folder = folder
+        self.ttl = ttl
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def paths(self, key: str):
+        base = os.path.join(self.folder, key)
+        return base + ".xml.gz", base + ".json"
+
+    def metadata(self, key: str) -> Optional[Dict[str, Any]]:
+        """Metadata of an entry, None if it is not cached."""
+        data_path, meta_path = self.paths(key)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None
+        with open(meta_path, "r") as f:
+            return json.load(f)
+
+    def get(
+        self, xml_request: str, dataset: str = "D76", ignore_ttl: bool = False
+    ) -> Optional[str]:
+        """Cached response of a request.
+
+        Args:
+            xml_request (str): <request-parameters> xml document
+            dataset (str, optional): CDC Wonder dataset ID.
+                Defaults to "D76".
+            ignore_ttl (bool, optional): also return expired responses
+                (offline mode). Defaults to False.
+
+        Returns:
+            Optional[str]: xml response, None if missing or expired
+        """
+        key = request_key(xml_request, dataset)
+        meta = self.metadata(key)
+        if meta is None:
+            return None
+        if (not ignore_ttl and self.ttl is not None
+                and time.time() - meta["fetched_at"] > self.ttl):
+            return None
+        data_path, _ = self.paths(key)
+        with gzip.open(data_path, "rt", encoding="utf-8") as f:
+            response = f.read()
+        # access time, used for the eviction
+        os.utime(data_path)
+        return response
+
+    def put(self, xml_request: str, response: str, dataset: str = "D76") -> str:
+        """Store a response.
+
+        Args:
+            xml_request (str): <request-parameters> xml document
+            response (str): xml response
+            dataset (str, optional): CDC Wonder dataset ID.
+                Defaults to "D76".
+
+        Returns:
+            str: cache key
+        """
+        key = request_key(xml_request, dataset)
+        data_path, meta_path = self.paths(key)
+        raw = response.encode("utf-8")
+        compressed = gzip.compress(raw)
+        with self.lock:
+            # write then rename, a crash never leaves a partial entry
+            with open(data_path + ".tmp", "wb") as f:
+                f.write(compressed)
+            os.replace(data_path + ".tmp", data_path)
+            with open(meta_path, "w") as f:
+                json.dump(
+                    {
+                        "key": key,
+                        "dataset": dataset,
+                        "fetched_at": time.time(),
+                        "size": len(raw),
+                        "compressed_size": len(compressed),
+                        "request": canonical_request(xml_request),
+                    },
+                    f,
+                )
+            self.evict()
+        return key
+
+    def evict(self) -> None:
+        """Remove expired entries, then the least recently used ones
+        until the cache fits in max_size."""
+        entries = []
+        for file in os.listdir(self.folder):
+            if not file.endswith(".xml.gz"):
+                continue
+            key = file[: -len(".xml.gz")]
+            data_path, meta_path = self.paths(key)
+            meta = self.metadata(key)
+            if meta is None or (
+                self.ttl is not None
+                and time.time() - meta["fetched_at"] > self.ttl
+            ):
+                self.remove(key)
+                continue
+            stat = os.stat(data_path)
+            entries.append((stat.st_mtime, stat.st_size, key))
+
+        if self.max_size is None:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total <= self.max_size:
+                break
+            self.remove(key)
+            total -= size
+
+    def remove(self, key: str) -> None:
+        for path in self.paths(key):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,157 @@
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+import threading
+import time
+
+from .cache import ResponseCache
+
+
+class WonderQueryError(RuntimeError):
+    """CDC Wonder did not return a result for a request."""
+
+
+class RateLimiter:
+    """Polite rate limiter: at most one request started every
+    min_interval seconds, whatever the number of threads."""
+
+    def __init__(self, min_interval: float = 1.0) -> None:
+        self.min_interval = min_interval
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until the caller is allowed to send a request."""
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.min_interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class WonderClient:
+    """Client for the CDC Wonder API (https://wonder.cdc.gov/wonder/help/WONDER-API.html).
+
+    Requests are sent through a rate limiter, retried with an exponential
+    back-off on server errors and timeouts, and query_many runs them on a
+    thread pool with at most max_concurrency requests in flight.
+    With a ResponseCache, identical requests are only downloaded once, and
+    offline=True only serves cached responses (e.g. in CI).
+
+    Example:
+        client = WonderClient()
+        xml_results = client.query_many([xml_request_1, xml_request_2])
+    """
+
+    def __init__(
+        self,
+        dataset: str = "D76",
+        url: str = "https://wonder.cdc.gov/controller/datarequest",
+        max_concurrency: int = 4,
+        min_interval: float = 1.0,
+        max_retries: int = 4,
+        backoff: float = 2.0,
+        timeout: float = 300.0,
+        cache: Optional[ResponseCache] = None,
+        offline: bool = False,
+    ) -> None:
+        """
+        Args:
+            dataset (str, optional): CDC Wonder dataset ID. Defaults to "D76".
+            url (str, optional): datarequest endpoint, the dataset ID is
+                appended. Defaults to
+                "https://wonder.cdc.gov/controller/datarequest".
+            max_concurrency (int, optional): max number of requests in
+                flight. Defaults to 4.
+            min_interval (float, optional): min number of seconds between
+                two requests. Defaults to 1.0.
+            max_retries (int, optional): number of retries after a server
+                error or a timeout. Defaults to 4.
+            backoff (float, optional): first waiting time in seconds before
+                a retry, doubled after each retry. Defaults to 2.0.
+            timeout (float, optional): timeout of a request in seconds.
+                Defaults to 300.0.
+            cache (Optional[ResponseCache], optional): on-disk cache of the
+                responses. Defaults to None.
+            offline (bool, optional): never query CDC Wonder, serve cached
+                responses even if expired. Defaults to False.
+        """
+        self.dataset = dataset
+        self.url = f"{url}/{dataset}"
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = RateLimiter(min_interval)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.offline = offline
+
+    def query(self, xml_request: str) -> str:
+        """Send a request and return the xml response.
+
+        Args:
+            xml_request (str): <request-parameters> xml document
+
+        Raises:
+            WonderQueryError: client error, server error after
+                max_retries retries, or not cached in offline mode
+
+        Returns:
+            str: xml response
+        """
+        if self.cache is not None:
+            response = self.cache.get(
+                xml_request, self.dataset, ignore_ttl=self.offline
+            )
+            if response is not None:
+                return response
+        if self.offline:
+            raise WonderQueryError("request not cached and offline=True")
+
+        response = self.fetch(xml_request)
+        if self.cache is not None:
+            self.cache.put(xml_request, response, self.dataset)
+        return response
+
+    def fetch(self, xml_request: str) -> str:
+        """Send a request to CDC Wonder, without the cache."""
+        # only needed to download, the package is usable without it
+        import requests
+
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                response = requests.post(
+                    self.url,
+                    data={
+                        "request_xml": xml_request,
+                        "accept_datause_restrictions": "true",
+                    },
+                    timeout=self.timeout,
+                )
+            except (requests.ConnectionError, requests.Timeout) as err:
+                error = f"{err!r}"
+            else:
+                if response.status_code == 200:
+                    return response.text
+                error = f"status {response.status_code}: {response.text[:500]}"
+                # only server errors and throttling are worth a retry
+                if response.status_code < 500 and response.status_code != 429:
+                    break
+            if attempt < self.max_retries:
+                time.sleep(self.backoff * 2 ** attempt)
+
+        raise WonderQueryError(f"CDC Wonder request failed, {error}")
+
+    def query_many(self, xml_requests: List[str]) -> List[str]:
+        """Send requests concurrently.
+
+        Args:
+            xml_requests (List[str]): <request-parameters> xml documents
+
+        Returns:
+            List[str]: xml responses, in the order of the requests
+        """
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            return list(pool.map(self.query, xml_requests))
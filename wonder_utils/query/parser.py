@@ -0,0 +1,134 @@
+from typing import Dict, Iterable, List, Optional, Union
+from collections import deque
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+import numpy as np
+import array
+
+
+class ColumnBuilder:
+    """Typed storage of a column while parsing.
+
+    Labels are kept as strings, values are written in a float64 array;
+    labels and values which are not numbers (e.g. "Suppressed",
+    "Unreliable") hold a NaN in the array, they are kept aside by row and
+    put back as strings when the column is built (e.g. a "Total" label
+    row in a value column).
+    """
+
+    def __init__(self) -> None:
+        self.labels: Dict[int, str] = dict()
+        self.values = array.array("d")
+        self.texts: Dict[int, str] = dict()
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def append_label(self, label: str) -> None:
+        self.labels[len(self.values)] = label
+        self.values.append(np.nan)
+
+    def append_value(self, value: str) -> None:
+        try:
+            self.values.append(float(value.replace(",", "")))
+        except ValueError:
+            self.texts[len(self.values)] = value
+            self.values.append(np.nan)
+
+    def build(self) -> Union[np.ndarray, List[str]]:
+        if self.labels and len(self.labels) == len(self.values):
+            return list(self.labels.values())
+        values = np.frombuffer(self.values, dtype=np.float64)
+        if not self.texts and not self.labels:
+            return values
+        res = values.astype(object)
+        for i, text in {**self.texts, **self.labels}.items():
+            res[i] = text
+        return res
+
+
+def xml2df(
+    xml_data: Union[str, bytes, Iterable[Union[str, bytes]]],
+    columns: Optional[List[str]] = None,
+    chunk_size: int = 2 ** 16,
+) -> pd.DataFrame:
+    """Stream a CDC Wonder xml response into a dataframe.
+
+    The response is parsed incrementally: each <r> (row) element is
+    converted then discarded. <c> (cell) elements with a 'v' attribute
+    hold a value (written in a float64 column), the ones with an 'l'
+    attribute hold a label, and an additional 'r' (rowspan) attribute
+    repeats that label on the following rows (kept in a small carry
+    buffer of the upcoming rows).
+
+    Args:
+        xml_data (Union[str, bytes, Iterable[Union[str, bytes]]]): xml
+            response, or an iterable of chunks (e.g. a streamed response)
+        columns (Optional[List[str]], optional): column names.
+            Defaults to None (0, 1, ...).
+        chunk_size (int, optional): size of the chunks fed to the parser
+            when xml_data is a string. Defaults to 2 ** 16.
+
+    Returns:
+        pd.DataFrame: labels as strings, values as float64 (object if
+            some values are not numbers), ready for the processor of
+            SuicideData
+    """
+    if isinstance(xml_data, (str, bytes)):
+        chunks = (
+            xml_data[i: i + chunk_size]
+            for i in range(0, len(xml_data), chunk_size)
+        )
+    else:
+        chunks = xml_data
+
+    parser = ET.XMLPullParser(events=("end",))
+    builders: List[ColumnBuilder] = []
+    # labels already added to the upcoming rows by rowspans
+    carry: deque = deque()
+
+    def add_row(row: ET.Element) -> None:
+        cells = carry.popleft() if carry else []
+        for cell in row.iter("c"):
+            if "v" in cell.attrib:
+                cells.append(("v", cell.attrib["v"]))
+            elif "r" not in cell.attrib:
+                cells.append(("l", cell.attrib.get("l", "")))
+            else:
+                label = ("l", cell.attrib.get("l", ""))
+                cells.append(label)
+                for row_index in range(int(cell.attrib["r"]) - 1):
+                    if row_index >= len(carry):
+                        carry.append([])
+                    carry[row_index].append(label)
+
+        while len(builders) < len(cells):
+            builders.append(ColumnBuilder())
+        for builder, (kind, content) in zip(builders, cells):
+            if kind == "v":
+                builder.append_value(content)
+            else:
+                builder.append_label(content)
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _, elem in parser.read_events():
+            if elem.tag == "r":
+                add_row(elem)
+                elem.clear()
+    parser.close()
+    for _, elem in parser.read_events():
+        if elem.tag == "r":
+            add_row(elem)
+
+    if not builders:
+        return pd.DataFrame(columns=columns)
+    if any(len(builder) != len(builders[0]) for builder in builders):
+        raise ValueError("ragged CDC Wonder response, rows have different lengths")
+
+    data = {i: builder.build() for i, builder in enumerate(builders)}
+    res = pd.DataFrame(data)
+    if columns is not None:
+        res.columns = columns
+    return res
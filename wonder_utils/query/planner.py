@@ -0,0 +1,167 @@
+from typing import Any, Dict, List, Tuple, Union
+import copy
+
+import pandas as pd
+
+from .client import WonderClient
+from .parser import xml2df
+from .request import QuerySpec, RequestBuilder, create_xml
+
+
+class QueryPlanner:
+    """Fold per-stratum CDC Wonder requests into a single grouped request.
+
+    Instead of one request per age group (rewriting V_D76.V51 in a loop),
+    the age dimension is added as a group-by (B_ parameter) and limited
+    to the union of the requested strata. The response is split back
+    locally into one dataframe per stratum: one round-trip, and every
+    stratum comes from the same snapshot of the data.
+
+    Example:
+        planner = QueryPlanner(parameters, columns)
+        frames = planner.run(client, {"20-24": ["20-24"],
+                                      "10-19": ["10-14", "15-19"]})
+    """
+
+    def __init__(
+        self,
+        parameters: Union[QuerySpec, Dict[str, Dict[str, Any]]],
+        columns: List[str],
+        dimension: str = "D76.V51",
+        dimension_column: str = "Age Group",
+        additive: List[str] = ["Deaths", "Population"],
+    ) -> None:
+        """
+        Args:
+            parameters (Union[QuerySpec, Dict[str, Dict[str, Any]]]): base
+                request, a QuerySpec or parameters of create_xml (not
+                modified)
+            columns (List[str]): column names of the base request
+                (group-by columns then measures)
+            dimension (str, optional): variable of the strata.
+                Defaults to "D76.V51" (five-year age groups).
+            dimension_column (str, optional): name of its column.
+                Defaults to "Age Group".
+            additive (List[str], optional): columns summed when a stratum
+                is made of several codes. Defaults to ["Deaths", "Population"].
+        """
+        self.parameters = parameters
+        self.columns = columns
+        self.dimension = dimension
+        self.dimension_column = dimension_column
+        self.additive = additive
+        self.builder = RequestBuilder()
+
+    def group_by(self) -> List[str]:
+        """Group-by variables of the base request, in order."""
+        if isinstance(self.parameters, QuerySpec):
+            return list(self.parameters.group_by)
+        b_parameters = self.parameters["b_parameters"]
+        return [b_parameters[key] for key in sorted(b_parameters)
+                if b_parameters[key] != "*None*"]
+
+    def plan(self, strata: Dict[str, List[str]]) -> Tuple[str, List[str]]:
+        """Single request covering every stratum.
+
+        Args:
+            strata (Dict[str, List[str]]): name -> codes of the dimension,
+                e.g. {"10-19": ["10-14", "15-19"]}
+
+        Raises:
+            ValueError: dimension already grouped by, or no free B_
+                parameter to group by the dimension
+
+        Returns:
+            Tuple[str, List[str]]: xml request and its columns
+        """
+        codes = sorted({code for codes in strata.values() for code in codes})
+        # group-by columns are in the order of the B_ parameters
+        columns = list(self.columns)
+
+        if isinstance(self.parameters, QuerySpec):
+            if self.dimension in self.parameters.group_by:
+                raise ValueError(f"{self.dimension} is already a group-by")
+            spec = self.parameters.by(self.dimension).where(self.dimension, codes)
+            columns.insert(len(self.group_by()), self.dimension_column)
+            return self.builder.to_xml(spec), columns
+
+        parameters = copy.deepcopy(self.parameters)
+        b_parameters = parameters["b_parameters"]
+        free = [key for key in sorted(b_parameters)
+                if b_parameters[key] == "*None*"]
+        if self.dimension in b_parameters.values():
+            raise ValueError(f"{self.dimension} is already a group-by")
+        if not free:
+            raise ValueError("no free B_ parameter to group by the strata")
+
+        # the free B_ parameter may come before a used one
+        columns.insert(
+            sum(b_parameters[key] != "*None*" for key in sorted(b_parameters)
+                if key < free[0]),
+            self.dimension_column,
+        )
+        b_parameters[free[0]] = self.dimension
+        parameters["v_parameters"][f"V_{self.dimension}"] = codes
+        if self.dimension in ("D76.V5", "D76.V51", "D76.V52", "D76.V6"):
+            parameters["o_parameters"]["O_age"] = self.dimension
+        return create_xml(parameters), columns
+
+    def code(self, label: str) -> str:
+        """Code of a label of the response, e.g. "20-24 years" -> "20-24"."""
+        return label.replace(" years", "").replace(" year", "").strip()
+
+    def split(
+        self, df: pd.DataFrame, strata: Dict[str, List[str]]
+    ) -> Dict[str, pd.DataFrame]:
+        """Split the grouped response into one dataframe per stratum.
+
+        Args:
+            df (pd.DataFrame): response of the planned request
+            strata (Dict[str, List[str]]): name -> codes of the dimension
+
+        Returns:
+            Dict[str, pd.DataFrame]: name -> dataframe with the columns of
+                the base request
+        """
+        codes = df[self.dimension_column].map(self.code)
+        labels = self.columns[:len(self.group_by())]
+        res = dict()
+        for name, stratum in strata.items():
+            sub_df = df.loc[codes.isin(stratum)].drop(
+                columns=[self.dimension_column]
+            )
+            if len(stratum) > 1:
+                # several codes: sum the additive measures, NaN if a code
+                # is suppressed (or not exported)
+                additive = [col for col in self.additive if col in sub_df]
+                sub_df = (
+                    sub_df.assign(**{
+                        col: pd.to_numeric(sub_df[col], errors="coerce")
+                        for col in additive
+                    })
+                    .groupby(labels, sort=False)[additive]
+                    .sum(min_count=len(stratum))
+                    .reset_index()
+                )
+                if {"Deaths", "Population", "Crude Rate"} <= set(self.columns):
+                    sub_df["Crude Rate"] = (
+                        100_000 * sub_df["Deaths"] / sub_df["Population"]
+                    )
+                sub_df = sub_df.reindex(columns=self.columns)
+            res[name] = sub_df.reset_index(drop=True)
+        return res
+
+    def run(
+        self, client: WonderClient, strata: Dict[str, List[str]]
+    ) -> Dict[str, pd.DataFrame]:
+        """Plan, query and split.
+
+        Args:
+            client (WonderClient): CDC Wonder client
+            strata (Dict[str, List[str]]): name -> codes of the dimension
+
+        Returns:
+            Dict[str, pd.DataFrame]: name -> dataframe
+        """
+        xml_request, columns = self.plan(strata)
+        return self.split(xml2df(client.query(xml_request), columns), strata)
@@ -0,0 +1,329 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+
+# order of the parameter groups in a request
+PARAMETER_GROUPS = [
+    "b_parameters",
+    "m_parameters",
+    "f_parameters",
+    "i_parameters",
+    "o_parameters",
+    "vm_parameters",
+    "v_parameters",
+    "misc_parameters",
+]
+
+# Parameters of the D76 dataset (Underlying Cause of Death, 1999-2020),
+# see https://wonder.cdc.gov/wonder/help/WONDER-API.html
+D76_SCHEMA = {
+    "dataset": "D76",
+    # variables usable as group-by (B_) and filters (F_ or V_)
+    "variables": {
+        "D76.V1": "Year/Month",
+        "D76.V2": "ICD-10 Codes",
+        "D76.V4": "ICD-10 113 Cause List",
+        "D76.V5": "Ten-Year Age Groups",
+        "D76.V51": "Five-Year Age Groups",
+        "D76.V52": "Single-Year Ages",
+        "D76.V6": "Infant Age Groups",
+        "D76.V7": "Gender",
+        "D76.V8": "Race",
+        "D76.V9": "State/County",
+        "D76.V10": "Census Regions",
+        "D76.V11": "2006 Urbanization",
+        "D76.V12": "ICD-10 130 Cause List (Infants)",
+        "D76.V17": "Hispanic Origin",
+        "D76.V19": "2013 Urbanization",
+        "D76.V20": "Autopsy",
+        "D76.V21": "Place of Death",
+        "D76.V22": "Injury Intent",
+        "D76.V23": "Injury Mechanism and All Other Leading Causes",
+        "D76.V24": "Weekday",
+        "D76.V25": "Drug/Alcohol Induced Causes",
+        "D76.V27": "HHS Regions",
+    },
+    # hierarchical variables, filtered with the "Finder" (F_ and I_)
+    "finder": ["D76.V1", "D76.V10", "D76.V2", "D76.V27", "D76.V9"],
+    # at most one of them in a request
+    "age": ["D76.V5", "D76.V51", "D76.V52", "D76.V6"],
+    # location variables, the one used is selected with O_location
+    "location": ["D76.V9", "D76.V10", "D76.V27"],
+    "measures": {
+        "D76.M1": "Deaths",
+        "D76.M2": "Population",
+        "D76.M3": "Crude Rate",
+        "D76.M31": "Crude Rate Standard Error",
+        "D76.M32": "Crude Rate 95% Confidence Interval",
+        "D76.M4": "Age Adjusted Rate",
+        "D76.M41": "Age Adjusted Rate Standard Error",
+        "D76.M42": "Age Adjusted Rate 95% Confidence Interval",
+        "D76.M9": "% of Total Deaths",
+    },
+    "required_measures": ["D76.M1", "D76.M2", "D76.M3"],
+    "age_adjusted_measure": "D76.M4",
+    # default value of the V_ parameters (filters outside the finder)
+    "v_defaults": {"D76.V6": "00"},
+    # values for non-standard age adjusted rates
+    "vm_parameters": {
+        "VM_D76.M6_D76.V10": "",
+        "VM_D76.M6_D76.V17": "*All*",
+        "VM_D76.M6_D76.V1_S": "*All*",
+        "VM_D76.M6_D76.V7": "*All*",
+        "VM_D76.M6_D76.V8": "*All*",
+    },
+    # radio buttons, checkboxes and lists that are not data categories
+    "o_defaults": {
+        "O_javascript": "on",
+        "O_precision": "1",
+        "O_rate_per": "100000",
+        "O_show_totals": "false",
+        "O_timeout": "300",
+        "O_ucd": "D76.V2",
+        "O_urban": "D76.V19",
+    },
+}
+
+
+def write_parameters(
+    parameters: Iterable[Tuple[str, Union[str, Iterable[str]]]],
+) -> str:
+    """Single xml writer of <parameter> elements.
+
+    Args:
+        parameters (Iterable[Tuple[str, Union[str, Iterable[str]]]]):
+            (name, value or values) pairs
+
+    Returns:
+        str: xml, one <parameter> per pair
+    """
+    parts = []
+    for name, values in parameters:
+        parts.append(f"<parameter>\n<name>{escape(name)}</name>\n")
+        for value in ([values] if isinstance(values, str) else values):
+            parts.append(f"<value>{escape(value)}</value>\n")
+        parts.append("</parameter>\n")
+    return "".join(parts)
+
+
+def create_parameter_list(parameter_list: Dict[str, Union[str, List[str]]]) -> str:
+    """Helper function to create a parameter list from a dictionary object"""
+    return write_parameters(parameter_list.items())
+
+
+def create_xml(parameters: Dict[str, Dict[str, Any]]) -> str:
+    """<request-parameters> xml document of a CDC Wonder request.
+
+    Args:
+        parameters (Dict[str, Dict[str, Any]]): b_parameters, m_parameters,
+            f_parameters, i_parameters, o_parameters, vm_parameters,
+            v_parameters and misc_parameters dictionnaries
+
+    Returns:
+        str: xml request
+    """
+    return "<request-parameters>\n{}</request-parameters>".format(
+        write_parameters(
+            item for group in PARAMETER_GROUPS
+            for item in parameters[group].items()
+        )
+    )
+
+
+def variable_of(group_by: str) -> str:
+    """Variable of a group-by, e.g. "D76.V1-level1" -> "D76.V1"."""
+    return group_by.split("-level")[0]
+
+
+@dataclass(frozen=True)
+class QuerySpec:
+    """Immutable, hashable description of a CDC Wonder query.
+
+    Lists and dictionnaries given to the constructor are normalized into
+    (sorted) tuples, so that equal queries are equal specs: they can be
+    used as dictionnary keys to cache or deduplicate requests.
+
+    Example:
+        spec = QuerySpec(
+            group_by=["D76.V1-level1", "D76.V7"],
+            filters={"D76.V1": ["2018", "2019"], "D76.V2": ["X60-X84"]},
+        )
+        spec_20_24 = spec.where("D76.V51", ["20-24"])
+    """
+
+    # group-by variables, e.g. "D76.V1-level1" (year), "D76.V7" (gender)
+    group_by: Tuple[str, ...] = ()
+    measures: Tuple[str, ...] = ("D76.M1", "D76.M2", "D76.M3")
+    # (variable, values), sorted by variable
+    filters: Tuple[Tuple[str, Tuple[str, ...]], ...] = ()
+    age_adjusted: bool = False
+    # standard population of the age-adjusted rates
+    standard_population: str = "0000"
+    title: str = ""
+    # other O_ parameters, (name, value) sorted by name
+    options: Tuple[Tuple[str, str], ...] = ()
+
+    def __post_init__(self) -> None:
+        filters = self.filters
+        if isinstance(filters, dict):
+            filters = filters.items()
+        options = self.options
+        if isinstance(options, dict):
+            options = options.items()
+        object.__setattr__(self, "group_by", tuple(self.group_by))
+        object.__setattr__(self, "measures", tuple(self.measures))
+        object.__setattr__(
+            self,
+            "filters",
+            tuple(sorted(
+                (var, (values,) if isinstance(values, str) else tuple(values))
+                for var, values in filters
+            )),
+        )
+        object.__setattr__(self, "options", tuple(sorted(options)))
+
+    def filter_values(self, variable: str) -> Optional[Tuple[str, ...]]:
+        """Values of the filter of a variable, None if not filtered."""
+        return dict(self.filters).get(variable)
+
+    def where(self, variable: str, values: Iterable[str]) -> "QuerySpec":
+        """New spec with the filter of a variable replaced."""
+        filters = dict(self.filters)
+        filters[variable] = values
+        return replace(self, filters=filters)
+
+    def by(self, *variables: str) -> "QuerySpec":
+        """New spec with more group-by variables."""
+        return replace(self, group_by=self.group_by + variables)
+
+
+class RequestBuilder:
+    """Validate QuerySpec against a dataset schema and serialize them
+    into CDC Wonder xml requests (cached: specs are hashable).
+
+    Example:
+        builder = RequestBuilder()
+        xml_request = builder.to_xml(spec)
+    """
+
+    def __init__(self, schema: Dict[str, Any] = D76_SCHEMA, cache_size: int = 4096) -> None:
+        """
+        Args:
+            schema (Dict[str, Any], optional): dataset schema.
+                Defaults to D76_SCHEMA.
+            cache_size (int, optional): number of serialized requests kept.
+                Defaults to 4096.
+        """
+        self.schema = schema
+        self.dataset = schema["dataset"]
+        self.to_xml = lru_cache(maxsize=cache_size)(self._to_xml)
+
+    def validate(self, spec: QuerySpec) -> None:
+        """Check a spec against the schema.
+
+        Raises:
+            ValueError: unknown variable or measure, too many group-by,
+                missing required measure, several age variables, or
+                age-adjusted rates grouped by age
+        """
+        variables = self.schema["variables"]
+        group_by = [variable_of(by) for by in spec.group_by]
+        if len(group_by) > 5:
+            raise ValueError("at most 5 group-by variables")
+        if len(set(group_by)) != len(group_by):
+            raise ValueError(f"duplicated group-by in {spec.group_by}")
+        for var in group_by + [var for var, _ in spec.filters]:
+            if var not in variables:
+                raise ValueError(f"unknown variable {var} for {self.dataset}")
+        for var, values in spec.filters:
+            if not values:
+                raise ValueError(f"empty filter on {var}")
+        for measure in spec.measures:
+            if measure not in self.schema["measures"]:
+                raise ValueError(f"unknown measure {measure} for {self.dataset}")
+        missing = set(self.schema["required_measures"]) - set(spec.measures)
+        if missing:
+            raise ValueError(f"required measures missing: {sorted(missing)}")
+
+        ages = {var for var in group_by + [var for var, _ in spec.filters]
+                if var in self.schema["age"]}
+        if len(ages) > 1:
+            raise ValueError(f"several age variables: {sorted(ages)}")
+        if spec.age_adjusted and ages & set(group_by):
+            raise ValueError("age-adjusted rates can not be grouped by age")
+
+    def parameters(self, spec: QuerySpec) -> Dict[str, Dict[str, Any]]:
+        """Parameter dictionnaries of a spec (see create_xml).
+
+        Args:
+            spec (QuerySpec): query
+
+        Returns:
+            Dict[str, Dict[str, Any]]: b_parameters, m_parameters, ...
+        """
+        self.validate(spec)
+        schema = self.schema
+        filters = dict(spec.filters)
+        used = [variable_of(by) for by in spec.group_by] + list(filters)
+
+        # by-variables: a row for each category in the output
+        b_parameters = {
+            f"B_{i + 1}": spec.group_by[i] if i < len(spec.group_by) else "*None*"
+            for i in range(5)
+        }
+        # measures to return
+        measures = list(spec.measures)
+        if spec.age_adjusted and schema["age_adjusted_measure"] not in measures:
+            measures.append(schema["age_adjusted_measure"])
+        m_parameters = {
+            "M_" + measure.split(".M")[-1]: measure for measure in measures
+        }
+        # values highlighted in a "Finder" control for hierarchical lists
+        # and contents of the "Currently selected" information areas
+        f_parameters, i_parameters = dict(), dict()
+        for var in schema["finder"]:
+            values = filters.get(var, ("*All*",))
+            f_parameters[f"F_{var}"] = list(values)
+            i_parameters[f"I_{var}"] = " ".join(values)
+        # variable values to limit in the "where" clause of the query
+        v_parameters = {
+            f"V_{var}": (
+                list(filters[var]) if var in filters and var not in schema["finder"]
+                else "" if var in schema["finder"]
+                else schema["v_defaults"].get(var, "*All*")
+            )
+            for var in schema["variables"]
+        }
+
+        ages = [var for var in used if var in schema["age"]]
+        locations = [var for var in used if var in schema["location"]]
+        o_parameters = {
+            **{f"O_{var.split('.')[-1]}_fmode": "freg" for var in schema["finder"]},
+            "O_aar": "aar_std" if spec.age_adjusted else "aar_none",
+            "O_aar_pop": spec.standard_population,
+            "O_age": ages[0] if ages else schema["age"][0],
+            "O_location": locations[0] if locations else schema["location"][0],
+            "O_title": spec.title,
+            **schema["o_defaults"],
+            **dict(spec.options),
+        }
+        misc_parameters = {
+            "action-Send": "Send",
+            **{f"finder-stage-{var}": "codeset" for var in schema["finder"]},
+            "stage": "request",
+        }
+        return {
+            "b_parameters": b_parameters,
+            "m_parameters": m_parameters,
+            "f_parameters": f_parameters,
+            "i_parameters": i_parameters,
+            "o_parameters": o_parameters,
+            "vm_parameters": dict(schema["vm_parameters"]),
+            "v_parameters": v_parameters,
+            "misc_parameters": misc_parameters,
+        }
+
+    def _to_xml(self, spec: QuerySpec) -> str:
+        return create_xml(self.parameters(spec))
@@ -0,0 +1,203 @@
+from typing import Dict, List, Optional, Tuple, Union
+import re
+
+import pandas as pd
+import numpy as np
+
+
+# 2000 U.S. standard population (Census P25-1130), used by NCHS and
+# CDC Wonder for age-adjusted rates,
+# see https://www.cdc.gov/nchs/data/statnt/statnt20.pdf
+STANDARD_POPULATION_2000: Dict[str, int] = {
+    "under 1": 3_794_901,
+    "1-4": 15_191_619,
+    "5-9": 19_919_840,
+    "10-14": 20_056_779,
+    "15-19": 19_819_518,
+    "20-24": 18_257_225,
+    "25-29": 17_722_067,
+    "30-34": 19_511_370,
+    "35-39": 22_179_956,
+    "40-44": 22_479_229,
+    "45-49": 19_805_793,
+    "50-54": 17_224_359,
+    "55-59": 13_307_234,
+    "60-64": 10_654_272,
+    "65-69": 9_409_940,
+    "70-74": 8_725_574,
+    "75-79": 7_414_559,
+    "80-84": 4_900_234,
+    "85+": 4_259_173,
+}
+
+
+def parse_ages(label: str) -> Tuple[float, float]:
+    """Ages covered by a label, bounds included.
+
+    Example:
+        "20-24 years" -> (20, 24), "< 1 year" -> (0, 0),
+        "85+ years" -> (85, inf), "20plus" -> (20, inf),
+        "Overall" -> (0, inf), "37" -> (37, 37)
+
+    Args:
+        label (str): age group of CDC Wonder, or an age_strat
+
+    Raises:
+        ValueError: not an age group
+
+    Returns:
+        Tuple[float, float]: first and last age
+    """
+    text = label.lower().replace("years", "").replace("year", "").strip()
+    if text in ("overall", "all ages", "*all*"):
+        return 0.0, np.inf
+    if text in ("under 1", "< 1", "<1"):
+        return 0.0, 0.0
+    match = re.fullmatch(r"(\d+)\s*(?:\+|plus)", text)
+    if match:
+        return float(match.group(1)), np.inf
+    match = re.fullmatch(r"(\d+)\s*-\s*(\d+)", text)
+    if match:
+        return float(match.group(1)), float(match.group(2))
+    if text.isdigit():
+        return float(text), float(text)
+    raise ValueError(f"can not parse the age group {label!r}")
+
+
+def standard_units(
+    ages: List[Tuple[float, float]],
+    standard: Dict[str, int] = STANDARD_POPULATION_2000,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Match age groups with the bands of a standard population.
+
+    Age groups inside a band (e.g. 85-89, 90-94 ... inside 85+) are
+    pooled in that band, and bands overlapped by a same age group (e.g.
+    10-14 and 15-19 for a ten-year group 15-24 ... ) are merged into a
+    single unit, weighted by the sum of their standard populations.
+
+    Args:
+        ages (List[Tuple[float, float]]): age groups, see parse_ages
+        standard (Dict[str, int], optional): band -> standard population.
+            Defaults to STANDARD_POPULATION_2000.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: unit of each age group, standard
+            population of each unit
+    """
+    bands = np.array([parse_ages(band) for band in standard])
+    order = np.argsort(bands[:, 0])
+    lows = bands[order, 0]
+    populations = np.array(list(standard.values()), dtype=float)[order]
+
+    ages = np.asarray(ages, dtype=float).reshape(-1, 2)
+    first = np.searchsorted(lows, ages[:, 0], side="right") - 1
+    last = np.searchsorted(lows, ages[:, 1], side="right") - 1
+
+    # merge the bands covered by a same age group: a unit starts at every
+    # band which is not covered by an age group started earlier
+    covered = np.zeros(len(lows), dtype=bool)
+    starts = np.zeros(len(lows), dtype=bool)
+    starts[first] = True
+    for lo, hi in zip(first, last):
+        covered[lo + 1: hi + 1] = True
+    used = np.zeros(len(lows), dtype=bool)
+    used[first] = True
+    used |= covered
+    unit_of_band = np.cumsum(starts & ~covered) - 1
+
+    units = unit_of_band[first]
+    weights = np.bincount(
+        unit_of_band[used], weights=populations[used],
+        minlength=units.max() + 1 if len(units) else 0,
+    )
+    return units, weights
+
+
+def age_adjust(
+    df: pd.DataFrame,
+    strata: List[str],
+    age_column: str = "age_group",
+    deaths: str = "deaths",
+    population: str = "population",
+    age_range: Optional[Union[str, Tuple[float, float]]] = None,
+    standard: Dict[str, int] = STANDARD_POPULATION_2000,
+    per: float = 100_000,
+) -> pd.DataFrame:
+    """Directly age-standardized rates of every stratum at once.
+
+    Deaths and populations are pooled by stratum and unit of the
+    standard population (see standard_units), then the rates of the
+    units are averaged with the standard weights, renormalized over the
+    units of the age range. A stratum missing a unit of the age range
+    (or with a missing count) gets a NaN rate.
+
+    Example:
+        age_adjust(df, ["year", "gender", "ethnicity"], age_range="20plus")
+
+    Args:
+        df (pd.DataFrame): deaths and population by fine age group
+        strata (List[str]): columns of the strata
+        age_column (str, optional): column of the age groups
+            ("20-24 years", "85+" ...). Defaults to "age_group".
+        deaths (str, optional): column of the deaths. Defaults to "deaths".
+        population (str, optional): column of the population.
+            Defaults to "population".
+        age_range (Optional[Union[str, Tuple[float, float]]], optional):
+            only keep the age groups inside this range, e.g. "10-19",
+            "20plus", (25, 64). Defaults to None (every age group).
+        standard (Dict[str, int], optional): standard population.
+            Defaults to STANDARD_POPULATION_2000.
+        per (float, optional): rates per this number of persons.
+            Defaults to 100_000.
+
+    Returns:
+        pd.DataFrame: strata, deaths, population, crude_rate and
+            age_adjusted_rate, one row per stratum
+    """
+    labels = df[age_column].astype(str)
+    unique_labels = labels.unique()
+    ages = {label: parse_ages(label) for label in unique_labels}
+    if age_range is not None:
+        lo, hi = parse_ages(age_range) if isinstance(age_range, str) else age_range
+        unique_labels = [
+            label for label in unique_labels
+            if ages[label][0] >= lo and ages[label][1] <= hi
+        ]
+    if not len(unique_labels):
+        raise ValueError(f"no age group in the age range {age_range!r}")
+
+    units, weights = standard_units([ages[label] for label in unique_labels], standard)
+    unit_index = pd.Series(units, index=unique_labels)
+    keep = labels.isin(unit_index.index)
+    sub_df = pd.DataFrame({
+        **{col: df.loc[keep, col] for col in strata},
+        "unit": labels[keep].map(unit_index).to_numpy(),
+        deaths: pd.to_numeric(df.loc[keep, deaths], errors="coerce"),
+        population: pd.to_numeric(df.loc[keep, population], errors="coerce"),
+    })
+
+    # deaths and population of every stratum x unit, missing if a count
+    # of an age group of the unit is missing (e.g. suppressed deaths)
+    grouped = sub_df.groupby(strata + ["unit"], sort=False)[[deaths, population]]
+    complete = grouped.count().eq(grouped.size(), axis=0).all(axis=1)
+    pooled = grouped.sum().where(complete).unstack("unit")
+    unit_deaths, unit_population = (
+        pooled[col].reindex(columns=np.arange(len(weights))).to_numpy(dtype=float)
+        for col in (deaths, population)
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        unit_rates = np.where(unit_population > 0, unit_deaths / unit_population, np.nan)
+        adjusted = unit_rates @ (weights / weights.sum())
+        total_deaths = unit_deaths.sum(axis=1)
+        total_population = unit_population.sum(axis=1)
+        crude = total_deaths / total_population
+
+    return pd.DataFrame(
+        {
+            deaths: total_deaths,
+            population: total_population,
+            "crude_rate": per * crude,
+            "age_adjusted_rate": per * adjusted,
+        },
+        index=pooled.index,
+    ).reset_index()
@@ -0,0 +1,110 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from .intervals import PROPORTION_INTERVALS
+
+
+def disparities(
+    df: pd.DataFrame,
+    dimensions: List[str],
+    strata: List[str],
+    reference: Optional[Dict[str, str]] = None,
+    deaths: str = "deaths",
+    population: str = "population",
+    alpha: float = 0.05,
+    proportion_interval: str = "wilson",
+) -> pd.DataFrame:
+    """Representation ratios and rate ratios of every group, in every
+    stratum, for several dimensions.
+
+    The representation ratio of a group is its share of the deaths over
+    its share of the population (1: in line, > 1: more exacerbated, < 1:
+    less exacerbated); its CI is the interval of the share of deaths
+    divided by the share of the population. The rate ratio compares the
+    rate of a group with the rate of the reference group of the stratum
+    (CI on the log scale, var = 1 / deaths + 1 / reference deaths).
+
+    Example:
+        disparities(df, ["race", "ethnicity"], ["age_strat", "year"])
+        -> White: 87.33% of the deaths vs 77.39% of the population,
+           representation_ratio 1.13, "more exacerbated"
+
+    Args:
+        df (pd.DataFrame): deaths and population, rows sharing a stratum
+            and a group are summed
+        dimensions (List[str]): columns of the groups (race, ethnicity ...)
+        strata (List[str]): columns of the strata (age_strat, year, hhs ...)
+        reference (Optional[Dict[str, str]], optional): reference group of
+            each dimension. Defaults to None (most populous group).
+        deaths (str, optional): deaths column. Defaults to "deaths".
+        population (str, optional): population column.
+            Defaults to "population".
+        alpha (float, optional): 1 - confidence level. Defaults to 0.05.
+        proportion_interval (str, optional): "wilson" or "clopper-pearson".
+            Defaults to "wilson".
+
+    Returns:
+        pd.DataFrame: long table, one row per dimension, stratum and group
+    """
+    reference = reference or dict()
+    interval = PROPORTION_INTERVALS[proportion_interval]
+    z = stats.norm.ppf(1 - alpha / 2)
+    counts = df.assign(**{
+        col: pd.to_numeric(df[col], errors="coerce") for col in (deaths, population)
+    })
+
+    tables = []
+    for dimension in dimensions:
+        res = (
+            counts.groupby(strata + [dimension])[[deaths, population]]
+            .sum(min_count=1)
+            .reset_index()
+            .rename(columns={dimension: "group", deaths: "deaths",
+                             population: "population"})
+        )
+        ref = reference.get(dimension)
+        if ref is None:
+            ref = res.groupby("group").population.sum().idxmax()
+
+        by_stratum = res.groupby(strata)
+        total_deaths = by_stratum.deaths.transform("sum")
+        total_population = by_stratum.population.transform("sum")
+        is_ref = (res.group == ref).to_numpy()
+        ref_deaths = res.deaths.where(is_ref).groupby(
+            [res[col] for col in strata]).transform("max")
+        ref_population = res.population.where(is_ref).groupby(
+            [res[col] for col in strata]).transform("max")
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            res.insert(0, "dimension", dimension)
+            res["death_share"] = res.deaths / total_deaths
+            res["pop_share"] = res.population / total_population
+            res["representation_ratio"] = res.death_share / res.pop_share
+            low, high = interval(res.deaths, total_deaths, alpha)
+            res["representation_ratio_low"] = low / res.pop_share
+            res["representation_ratio_high"] = high / res.pop_share
+
+            res["rate"] = 100_000 * res.deaths / res.population
+            res["reference"] = ref
+            res["rate_ratio"] = (
+                (res.deaths / res.population) / (ref_deaths / ref_population)
+            )
+            log_se = np.sqrt(1 / res.deaths + 1 / ref_deaths)
+            log_se[is_ref] = 0.0
+            res["rate_ratio_low"] = res.rate_ratio * np.exp(-z * log_se)
+            res["rate_ratio_high"] = res.rate_ratio * np.exp(z * log_se)
+        tables.append(res)
+
+    res = pd.concat(tables, ignore_index=True)
+    res["representation"] = np.select(
+        [res.representation_ratio_low > 1, res.representation_ratio_high < 1],
+        ["more exacerbated", "less exacerbated"],
+        "in line",
+    )
+    res.loc[res.representation_ratio.isna(), "representation"] = None
+    res["death_share"] *= 100
+    res["pop_share"] *= 100
+    return res
@@ -0,0 +1,90 @@
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+def seasonal_design(dates: pd.DatetimeIndex, harmonics: int = 2) -> np.ndarray:
+    """Design matrix of a Serfling-like baseline: intercept, linear trend
+    (in years) and harmonics of the month of the year.
+
+    Args:
+        dates (pd.DatetimeIndex): monthly periods
+        harmonics (int, optional): number of sine/cosine pairs.
+            Defaults to 2 (yearly and half-yearly cycles).
+
+    Returns:
+        np.ndarray: (periods, 2 + 2 * harmonics) matrix
+    """
+    t = (dates.year - dates.year[0]) + (dates.month - 1) / 12
+    angle = 2 * np.pi * (dates.month.to_numpy() - 1) / 12
+    columns = [np.ones(len(dates)), np.asarray(t, dtype=float)]
+    for k in range(1, harmonics + 1):
+        columns += [np.sin(k * angle), np.cos(k * angle)]
+    return np.column_stack(columns)
+
+
+def fit_baseline(
+    counts: np.ndarray,
+    dates: pd.DatetimeIndex,
+    baseline_end: Any,
+    harmonics: int = 2,
+    alpha: float = 0.05,
+) -> Dict[str, np.ndarray]:
+    """Expected counts of many monthly series at once.
+
+    Every series is fitted by least squares on the periods up to
+    baseline_end (missing counts are left out with zero weights): the
+    normal equations of all the series are stacked into one
+    (series, p, p) system solved in a single call. Intervals are
+    prediction intervals (residual variance of each series).
+
+    Args:
+        counts (np.ndarray): (series, periods) observed counts
+        dates (pd.DatetimeIndex): monthly periods of the columns
+        baseline_end (Any): last period of the baseline (e.g. "2019-12")
+        harmonics (int, optional): see seasonal_design. Defaults to 2.
+        alpha (float, optional): 1 - confidence level. Defaults to 0.05.
+
+    Returns:
+        Dict[str, np.ndarray]: (series, periods) observed, expected,
+            expected_low, expected_high, excess, excess_low, excess_high
+    """
+    y = np.asarray(counts, dtype=float)
+    X = seasonal_design(dates, harmonics)
+    n_params = X.shape[1]
+    train = (dates <= pd.Timestamp(baseline_end))[None, :] & ~np.isnan(y)
+    w = train.astype(float)
+    y0 = np.where(train, y, 0.0)
+
+    # stacked normal equations: (series, p, p) and (series, p)
+    xtwx = np.einsum("sn,ni,nj->sij", w, X, X, optimize=True)
+    xtwy = np.einsum("sn,ni->si", w * y0, X)
+    n_train = w.sum(axis=1)
+    fitted = n_train >= n_params + 1
+    xtwx[~fitted] = np.eye(n_params)
+    inv = np.linalg.inv(xtwx)
+    beta = np.einsum("sij,sj->si", inv, xtwy)
+
+    expected = beta @ X.T
+    resid = np.where(train, y - expected, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sigma2 = (resid ** 2).sum(axis=1) / (n_train - n_params)
+        # prediction variance: sigma2 * (1 + x' (X'X)^-1 x)
+        leverage = np.einsum("ni,sij,nj->sn", X, inv, X, optimize=True)
+        se = np.sqrt(sigma2[:, None] * (1 + leverage))
+    t_crit = stats.t.ppf(1 - alpha / 2, np.maximum(n_train - n_params, 1))[:, None]
+
+    expected[~fitted] = np.nan
+    low = expected - t_crit * se
+    high = expected + t_crit * se
+    return {
+        "observed": y,
+        "expected": expected,
+        "expected_low": low,
+        "expected_high": high,
+        "excess": y - expected,
+        "excess_low": y - high,
+        "excess_high": y - low,
+    }
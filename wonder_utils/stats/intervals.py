@@ -0,0 +1,111 @@
+from typing import Tuple, Union
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+ArrayLike = Union[np.ndarray, pd.Series, float]
+
+
+def poisson_interval(counts: ArrayLike, alpha: float = 0.05) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact (Garwood) confidence interval of Poisson counts, from the
+    gamma distribution: [G(alpha/2; k), G(1 - alpha/2; k + 1)], with a
+    lower bound of 0 when k = 0.
+
+    Args:
+        counts (ArrayLike): observed counts (e.g. deaths)
+        alpha (float, optional): 1 - confidence level. Defaults to 0.05.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: lower and upper bounds
+    """
+    k = np.asarray(counts, dtype=float)
+    with np.errstate(invalid="ignore"):
+        low = np.where(k > 0, stats.gamma.ppf(alpha / 2, np.where(k > 0, k, 1)), 0.0)
+        high = stats.gamma.ppf(1 - alpha / 2, k + 1)
+    low[np.isnan(k)] = np.nan
+    return low, high
+
+
+def rate_interval(
+    deaths: ArrayLike,
+    population: ArrayLike,
+    per: float = 100_000,
+    alpha: float = 0.05,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Confidence interval of crude rates, deaths being Poisson counts
+    (the method of CDC Wonder for rates based on fewer than 100 deaths).
+
+    Args:
+        deaths (ArrayLike): deaths
+        population (ArrayLike): population
+        per (float, optional): rates per this number of persons.
+            Defaults to 100_000.
+        alpha (float, optional): 1 - confidence level. Defaults to 0.05.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: lower and upper bounds of the rates
+    """
+    low, high = poisson_interval(deaths, alpha)
+    population = np.asarray(population, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return per * low / population, per * high / population
+
+
+def wilson_interval(
+    successes: ArrayLike, trials: ArrayLike, alpha: float = 0.05
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Wilson score interval of binomial proportions.
+
+    Args:
+        successes (ArrayLike): e.g. deaths of a category
+        trials (ArrayLike): e.g. deaths of every category
+        alpha (float, optional): 1 - confidence level. Defaults to 0.05.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: lower and upper bounds, in [0, 1]
+    """
+    x = np.asarray(successes, dtype=float)
+    n = np.asarray(trials, dtype=float)
+    z = stats.norm.ppf(1 - alpha / 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = x / n
+        center = (p + z ** 2 / (2 * n)) / (1 + z ** 2 / n)
+        half = z / (1 + z ** 2 / n) * np.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2))
+        # the interval contains p, also after rounding (e.g. 1 - 1e-16 for
+        # p = 1)
+        low = np.fmin(center - half, p)
+        high = np.fmax(center + half, p)
+    return np.clip(low, 0, 1), np.clip(high, 0, 1)
+
+
+def clopper_pearson_interval(
+    successes: ArrayLike, trials: ArrayLike, alpha: float = 0.05
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact (Clopper-Pearson) interval of binomial proportions, from the
+    beta distribution.
+
+    Args:
+        successes (ArrayLike): e.g. deaths of a category
+        trials (ArrayLike): e.g. deaths of every category
+        alpha (float, optional): 1 - confidence level. Defaults to 0.05.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: lower and upper bounds, in [0, 1]
+    """
+    x = np.asarray(successes, dtype=float)
+    n = np.asarray(trials, dtype=float)
+    with np.errstate(invalid="ignore"):
+        low = np.where(x > 0, stats.beta.ppf(alpha / 2, x, n - x + 1), 0.0)
+        high = np.where(x < n, stats.beta.ppf(1 - alpha / 2, x + 1, n - x), 1.0)
+    missing = np.isnan(x) | np.isnan(n) | (n <= 0)
+    low[missing] = np.nan
+    high[missing] = np.nan
+    return low, high
+
+
+PROPORTION_INTERVALS = {
+    "wilson": wilson_interval,
+    "clopper-pearson": clopper_pearson_interval,
+}
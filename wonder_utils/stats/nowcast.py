@@ -0,0 +1,78 @@
+from typing import List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+def completeness_ratios(
+    provisional_deaths: Union[np.ndarray, pd.Series],
+    final_deaths: Union[np.ndarray, pd.Series],
+    groups: List[Union[np.ndarray, pd.Series]],
+    min_deaths: float = 20,
+) -> Tuple[np.ndarray, float]:
+    """Completeness of the provisional counts, learned from past
+    revisions: in each stratum, the provisional deaths of the cells
+    over their final deaths (summed over the cells, e.g. the years and
+    regions of the stratum).
+
+    Strata with less than min_deaths final deaths get the pooled ratio
+    of all the strata, their own ratio being too noisy.
+
+    Args:
+        provisional_deaths (Union[np.ndarray, pd.Series]): deaths of the
+            cells when their year was provisional
+        final_deaths (Union[np.ndarray, pd.Series]): deaths of the same
+            cells once final
+        groups (List[Union[np.ndarray, pd.Series]]): keys of the stratum
+            of each cell (e.g. gender, race, age_strat)
+        min_deaths (float, optional): final deaths needed to learn the
+            ratio of a stratum. Defaults to 20.
+
+    Returns:
+        Tuple[np.ndarray, float]: ratio of the stratum of every cell and
+            the pooled ratio
+    """
+    prov = np.asarray(provisional_deaths, dtype=float)
+    final = np.asarray(final_deaths, dtype=float)
+    known = ~np.isnan(prov) & ~np.isnan(final)
+    prov = np.where(known, prov, 0.0)
+    final = np.where(known, final, 0.0)
+    # stratum of every cell, as integer codes
+    codes = (
+        pd.DataFrame({i: np.asarray(g) for i, g in enumerate(groups)})
+        .groupby(list(range(len(groups))), sort=False, dropna=False)
+        .ngroup()
+        .to_numpy()
+    )
+    sum_prov = np.bincount(codes, weights=prov)[codes]
+    sum_final = np.bincount(codes, weights=final)[codes]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pooled = prov.sum() / final.sum()
+        ratios = np.where(sum_final >= min_deaths, sum_prov / sum_final, pooled)
+    return ratios, pooled
+
+
+def nowcast(
+    deaths: Union[np.ndarray, pd.Series],
+    provisional: Union[np.ndarray, pd.Series],
+    ratios: Union[np.ndarray, pd.Series],
+) -> np.ndarray:
+    """Expected final deaths: the provisional counts divided by their
+    completeness ratio, the final counts (or a missing ratio) unchanged.
+
+    Args:
+        deaths (Union[np.ndarray, pd.Series]): reported deaths
+        provisional (Union[np.ndarray, pd.Series]): whether the year of
+            each count is provisional
+        ratios (Union[np.ndarray, pd.Series]): completeness ratio of each
+            count, see completeness_ratios
+
+    Returns:
+        np.ndarray: adjusted deaths
+    """
+    d = np.asarray(deaths, dtype=float)
+    r = np.asarray(ratios, dtype=float)
+    scale = np.asarray(provisional, dtype=bool) & (r > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(scale, d / r, d)
@@ -0,0 +1,56 @@
+from typing import List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+def eb_rates(
+    deaths: Union[np.ndarray, pd.Series],
+    population: Union[np.ndarray, pd.Series],
+    groups: List[Union[np.ndarray, pd.Series]],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Poisson-gamma empirical-Bayes rates, shrunk toward the rate of
+    their parent group (Marshall, 1991).
+
+    In each group, the rates of the cells follow a gamma prior whose mean
+    m is the pooled rate of the group and whose variance v is estimated
+    by the method of moments:
+        v = sum(p * (r - m) ** 2) / sum(p) - m / mean(p)
+    then the posterior mean of a cell is w * r + (1 - w) * m, with
+    w = v / (v + m / p): small cells are pulled toward the parent rate,
+    large ones keep their own. Cells with a missing count (e.g.
+    suppressed) get the parent rate.
+
+    Args:
+        deaths (Union[np.ndarray, pd.Series]): deaths of the cells
+        population (Union[np.ndarray, pd.Series]): population of the cells
+        groups (List[Union[np.ndarray, pd.Series]]): keys of the parent
+            group of each cell (e.g. gender, year, race ... but not hhs)
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: smoothed rates (per person) and
+            weights w of the own rates
+    """
+    d = np.asarray(deaths, dtype=float)
+    p = np.asarray(population, dtype=float)
+    known = ~np.isnan(d) & (p > 0)
+    d = np.where(known, d, 0.0)
+    p = np.where(known, p, 0.0)
+    # parent group of every cell, as integer codes
+    codes = (
+        pd.DataFrame({i: np.asarray(g) for i, g in enumerate(groups)})
+        .groupby(list(range(len(groups))), sort=False, dropna=False)
+        .ngroup()
+        .to_numpy()
+    )
+    sum_d = np.bincount(codes, weights=d)[codes]
+    sum_p = np.bincount(codes, weights=p)[codes]
+    n = np.bincount(codes, weights=known)[codes]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        m = sum_d / sum_p
+        r = np.where(known, d / p, m)
+        s2 = np.bincount(codes, weights=p * (r - m) ** 2)[codes] / sum_p
+        v = np.clip(s2 - m / (sum_p / n), 0, None)
+        w = np.nan_to_num(np.where(known, v / (v + m / p), 0.0))
+    return w * r + (1 - w) * m, w
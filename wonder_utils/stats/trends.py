@@ -0,0 +1,235 @@
+from typing import Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+FAMILIES = ("poisson", "negative-binomial")
+# columns of trend_tests, after the series columns
+TREND_COLUMNS = [
+    "n_years", "total", "slope", "slope_low", "slope_high", "apc", "apc_low",
+    "apc_high", "z", "p_value", "p_adjusted", "significant", "direction",
+    "pearson_dispersion", "nb_alpha", "converged",
+]
+
+
+def irls(
+    counts: np.ndarray,
+    log_offset: np.ndarray,
+    t: np.ndarray,
+    dispersion: np.ndarray,
+    max_iter: int = 50,
+    tol: float = 1e-8,
+):
+    """Batched IRLS of log(mu) = log_offset + b0 + b1 * t, one row per
+    series, NaN counts are left out. The 2 x 2 normal equations of every
+    series are solved at once in closed form.
+
+    Returns:
+        b0, b1, var(b1), mu, converged
+    """
+    observed = ~np.isnan(counts)
+    y = np.where(observed, counts, 0.0)
+    offset = np.where(observed, log_offset, 0.0)
+    weight_mask = observed.astype(float)
+
+    # start from the constant rate of each series
+    with np.errstate(divide="ignore", invalid="ignore"):
+        b0 = np.log(np.maximum(y.sum(axis=1), 0.5)) - np.log(
+            (np.exp(offset) * weight_mask).sum(axis=1)
+        )
+    b1 = np.zeros(len(y))
+    converged = np.zeros(len(y), dtype=bool)
+    for _ in range(max_iter):
+        eta = offset + b0[:, None] + b1[:, None] * t
+        mu = np.exp(eta)
+        w = weight_mask * mu / (1 + dispersion[:, None] * mu)
+        z = eta - offset + (y - mu) / mu
+        s0, s1, s2 = w.sum(axis=1), (w * t).sum(axis=1), (w * t * t).sum(axis=1)
+        r0, r1 = (w * z).sum(axis=1), (w * t * z).sum(axis=1)
+        det = s0 * s2 - s1 ** 2
+        with np.errstate(divide="ignore", invalid="ignore"):
+            new_b0 = (s2 * r0 - s1 * r1) / det
+            new_b1 = (s0 * r1 - s1 * r0) / det
+        step = np.abs(new_b1 - b1) + np.abs(new_b0 - b0)
+        converged = step < tol * (1 + np.abs(new_b0))
+        b0, b1 = new_b0, new_b1
+        if np.all(converged | np.isnan(step)):
+            break
+
+    mu = np.exp(offset + b0[:, None] + b1[:, None] * t)
+    w = weight_mask * mu / (1 + dispersion[:, None] * mu)
+    s0, s1, s2 = w.sum(axis=1), (w * t).sum(axis=1), (w * t * t).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var_b1 = s0 / (s0 * s2 - s1 ** 2)
+    return b0, b1, var_b1, np.where(observed, mu, np.nan), converged
+
+
+def fit_trends(
+    counts: np.ndarray,
+    offsets: Optional[np.ndarray],
+    years: np.ndarray,
+    family: str = "poisson",
+    alpha: float = 0.05,
+) -> Dict[str, np.ndarray]:
+    """Log-linear year trends of many series at once.
+
+    Args:
+        counts (np.ndarray): (series, years) counts, NaN if missing
+        offsets (Optional[np.ndarray]): (series, years) exposures (e.g.
+            population), None to model the counts themselves
+        years (np.ndarray): years of the columns
+        family (str, optional): "poisson" or "negative-binomial" (NB2,
+            dispersion estimated by the method of moments on the Poisson
+            fit). Defaults to "poisson".
+        alpha (float, optional): 1 - confidence level. Defaults to 0.05.
+
+    Returns:
+        Dict[str, np.ndarray]: one value per series, see trend_tests
+    """
+    if family not in FAMILIES:
+        raise ValueError(f"family should be one of {FAMILIES}, not {family!r}")
+    counts = np.asarray(counts, dtype=float)
+    if offsets is None:
+        log_offset = np.zeros_like(counts)
+    else:
+        with np.errstate(divide="ignore"):
+            log_offset = np.log(np.asarray(offsets, dtype=float))
+        # no exposure: the year is left out
+        counts = np.where(np.isfinite(log_offset), counts, np.nan)
+    t = np.asarray(years, dtype=float)
+    t = t - t.mean()
+
+    n_obs = (~np.isnan(counts)).sum(axis=1)
+    dispersion = np.zeros(len(counts))
+    b0, b1, var_b1, mu, converged = irls(counts, log_offset, t, dispersion)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df_resid = np.maximum(n_obs - 2, 1)
+        pearson = np.nansum((counts - mu) ** 2 / mu, axis=1) / df_resid
+    if family == "negative-binomial":
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dispersion = np.nansum(((counts - mu) ** 2 - counts) / mu ** 2, axis=1) / df_resid
+        dispersion = np.clip(np.nan_to_num(dispersion), 0, None)
+        b0, b1, var_b1, mu, converged = irls(counts, log_offset, t, dispersion)
+
+    se = np.sqrt(var_b1)
+    z_crit = stats.norm.ppf(1 - alpha / 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = b1 / se
+    # a trend needs at least 3 years
+    enough = n_obs >= 3
+    nan = np.full(len(counts), np.nan)
+    return {
+        "n_years": n_obs,
+        "total": np.nansum(counts, axis=1),
+        "slope": np.where(enough, b1, nan),
+        "slope_low": np.where(enough, b1 - z_crit * se, nan),
+        "slope_high": np.where(enough, b1 + z_crit * se, nan),
+        "z": np.where(enough, z, nan),
+        "p_value": np.where(enough, 2 * stats.norm.sf(np.abs(z)), nan),
+        "pearson_dispersion": np.where(enough, pearson, nan),
+        "nb_alpha": dispersion,
+        "converged": converged & enough,
+    }
+
+
+def fdr_bh(p_values: np.ndarray) -> np.ndarray:
+    """Benjamini-Hochberg adjusted p-values (NaN are ignored)."""
+    p_values = np.asarray(p_values, dtype=float)
+    res = np.full(len(p_values), np.nan)
+    valid = np.flatnonzero(~np.isnan(p_values))
+    if not len(valid):
+        return res
+    order = valid[np.argsort(p_values[valid])]
+    ranked = p_values[order] * len(valid) / np.arange(1, len(valid) + 1)
+    res[order] = np.minimum(1, np.minimum.accumulate(ranked[::-1])[::-1])
+    return res
+
+
+def trend_tests(
+    df: pd.DataFrame,
+    series: List[str],
+    x: str = "year",
+    y: str = "deaths",
+    offset: Optional[str] = "population",
+    family: str = "poisson",
+    alpha: float = 0.05,
+    max_workers: Optional[int] = None,
+    chunk_size: int = 5000,
+) -> pd.DataFrame:
+    """Test the year trend of every series of a long dataframe.
+
+    The series are pivoted into (series, years) matrices and fitted in
+    batches (see fit_trends); batches are sent to a process pool when
+    there are more than one. p-values are adjusted for the false
+    discovery rate over all the series (Benjamini-Hochberg).
+
+    Example:
+        trend_tests(df, ["hhs", "race", "ethnicity"])
+        -> is the suicide rate of each group increasing in each region?
+
+    Args:
+        df (pd.DataFrame): long dataframe, one row per series and year
+            (rows sharing a series and a year are summed)
+        series (List[str]): columns identifying a series
+        x (str, optional): year column. Defaults to "year".
+        y (str, optional): count column. Defaults to "deaths".
+        offset (Optional[str], optional): exposure column, None to test
+            the counts. Defaults to "population".
+        family (str, optional): "poisson" or "negative-binomial".
+            Defaults to "poisson".
+        alpha (float, optional): 1 - confidence level, and level of the
+            adjusted p-values for "significant". Defaults to 0.05.
+        max_workers (Optional[int], optional): processes of the pool.
+            Defaults to None (number of CPUs).
+        chunk_size (int, optional): series per batch. Defaults to 5000.
+
+    Returns:
+        pd.DataFrame: series columns, n_years, total (of y), slope (log
+            scale, per year) with its CI, apc (annual percent change) with
+            its CI, z, p_value, p_adjusted, significant, direction,
+            pearson_dispersion, nb_alpha and converged
+    """
+    columns = [y] + ([offset] if offset else [])
+    data = df.assign(**{
+        x: pd.to_numeric(df[x].astype(str).str.extract(r"(\d+)", expand=False)),
+        **{col: pd.to_numeric(df[col], errors="coerce") for col in columns},
+    })
+    wide = data.groupby(series + [x])[columns].sum(min_count=1).unstack(x)
+    if wide.empty:
+        return pd.DataFrame(columns=series + TREND_COLUMNS)
+    years = wide[y].columns.to_numpy(dtype=float)
+    counts = wide[y].to_numpy(dtype=float)
+    offsets = wide[offset].to_numpy(dtype=float) if offset else None
+
+    chunks = [
+        (counts[i: i + chunk_size],
+         None if offsets is None else offsets[i: i + chunk_size])
+        for i in range(0, len(counts), chunk_size)
+    ]
+    if len(chunks) > 1 and max_workers != 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(fit_trends, c, o, years, family, alpha)
+                for c, o in chunks
+            ]
+            results = [future.result() for future in futures]
+    else:
+        results = [fit_trends(c, o, years, family, alpha) for c, o in chunks]
+    fits = {
+        key: np.concatenate([res[key] for res in results])
+        for key in results[0]
+    } if results else {}
+
+    res = pd.DataFrame(fits, index=wide.index).reset_index()
+    with np.errstate(invalid="ignore", over="ignore"):
+        for col in ("", "_low", "_high"):
+            res[f"apc{col}"] = 100 * np.expm1(res[f"slope{col}"].to_numpy())
+    res["p_adjusted"] = fdr_bh(res.p_value.to_numpy())
+    res["significant"] = res.p_adjusted < alpha
+    res["direction"] = np.where(
+        res.significant, np.where(res.slope > 0, "increase", "decrease"), "none"
+    )
+    return res[series + TREND_COLUMNS]